@@ -16,15 +16,23 @@ logging.getLogger(__name__).addHandler(logging.NullHandler())
 from .dsdparser import *
 from .singleton import (SingletonError, 
                         clear_singletons,
-                        show_singletons)
+                        show_singletons,
+                        registry_scope,
+                        enable_registry_stats,
+                        registry_stats)
 from .base_classes import (ObjectInitError, 
                            DomainS, 
                            ComplexS,
                            MacrostateS,
-                           ReactionS) 
+                           ReactionS,
+                           SlottedDomainS,
+                           SlottedComplexS,
+                           SlottedMacrostateS,
+                           SlottedReactionS) 
 from .iupac_utils import ConstraintError
 from .complex_utils import SecondaryStructureError
-from .objectio import (read_pil, read_pil_line)
+from .objectio import (read_pil, read_pil_line, iter_pil, write_pil)
+from .reaction_network import ReactionNetwork
 
 # Deprecated since v0.8, 
 from .core.deprecated import clear_memory, DSDObjectsError, DSDDuplicationError
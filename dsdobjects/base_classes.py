@@ -1,19 +1,32 @@
 import logging
 log = logging.getLogger(__name__)
 
+from array import array
 from itertools import chain
+from weakref import finalize, ref
 
 from .singleton import Singleton, SingletonError, show_singletons
 from .utils import flint, convert_units
 from .complex_utils import (SecondaryStructureError,
-                            make_pair_table, 
                             make_strand_table,
                             strand_table_to_sequence,
-                            pair_table_to_dot_bracket,
-                            make_loop_index, 
                             wrap,
-                            split_complex_pt,
-                            rotate_complex_once)
+                            flat_strand_components,
+                            canonical_rotation,
+                            compact_complex_key,
+                            complex_fingerprint,
+                            dot_bracket_to_kernel,
+                            kernel_to_dot_bracket,
+                            rotate_complex,
+                            iter_rotations,
+                            make_flat_structure,
+                            flat_index,
+                            flat_locus,
+                            flat_to_pair_table,
+                            flat_to_dot_bracket,
+                            sequence_period,
+                            LoopDecomposition,
+                            ComplexRotation)
 
 class ObjectInitError(Exception):
     pass
@@ -32,11 +45,16 @@ def show_memory():
                    show_singletons(StrandS),
                    show_singletons(ComplexS),
                    show_singletons(MacrostateS),
-                   show_singletons(ReactionS)):
+                   show_singletons(ReactionS),
+                   show_singletons(SlottedDomainS),
+                   show_singletons(SlottedStrandS),
+                   show_singletons(SlottedComplexS),
+                   show_singletons(SlottedMacrostateS),
+                   show_singletons(SlottedReactionS)):
         yield x
 
-class DomainS(metaclass = Singleton):
-    """ Domain object (Singleton).
+class SlottedDomainS(metaclass = Singleton):
+    """ Domain object (Singleton) without a per-instance __dict__.
     
     Each name for the domain will instantiate this class only once.
     Initialization requires a specification of both name and length. Once 
@@ -45,6 +63,7 @@ class DomainS(metaclass = Singleton):
     [a = Domain('a')]. If, however, a wrong length is provided, then 
     this will raise a DSDObjectsError [b = Domain('a*', 10)]
     """
+    __slots__ = ('_name', '_length', '_complement', 'sequence', '__weakref__')
     DTYPE_CUTOFF = 8 
     SHORT_DOM_LEN = 5
     LONG_DOM_LEN = 15
@@ -95,7 +114,12 @@ class DomainS(metaclass = Singleton):
                      self.__class__.LONG_DOM_LEN if dtype == 'long' else None
         self._name = name
         self._length = length
+        self._complement = None # A weak reference, see complement.
         self.sequence = None
+        comp = self.__class__._instanceNames.get(self.cname)
+        if comp is not None and comp.length == length:
+            self._complement = ref(comp)
+            comp._complement = ref(self)
 
     @property
     def name(self):
@@ -132,8 +156,18 @@ class DomainS(metaclass = Singleton):
 
     @property
     def complement(self):
-        """ obj: the complementary domain object. """
-        return self.__class__(self.cname, self.length)
+        """ obj: the complementary domain object. 
+
+        Domains keep a weak reference to their complement, only the first
+        access (or the first after the complement was freed) uses the
+        registry.
+        """
+        comp = None if self._complement is None else self._complement()
+        if comp is None:
+            comp = self.__class__(self.cname, self.length)
+            self._complement = ref(comp)
+            comp._complement = ref(self)
+        return comp
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name}, {self.length})"
@@ -149,9 +183,9 @@ class DomainS(metaclass = Singleton):
 
     def __eq__(self, other):
         """ Test if two domains are equal. """
-        # We use DomainS here, not self.__class__!
+        # We use SlottedDomainS here, not self.__class__!
         # Equality is based on the canonical form, otherwise use "is"
-        if not isinstance(other, DomainS):
+        if not isinstance(other, SlottedDomainS):
             return False
         return (self.name, self.length) == (other.name, other.length)
 
@@ -173,8 +207,31 @@ class DomainS(metaclass = Singleton):
     def __hash__(self):
         return hash(self.name)
 
-class ComplexS(metaclass = Singleton):
-    """ Complex object (Singleton).
+class DomainS(SlottedDomainS):
+    """ Domain object (Singleton), see SlottedDomainS.
+
+    Objects have a __dict__, i.e. subclasses may add arbitrary attributes.
+    """
+    pass
+
+def _drop_rotations(index, hashes):
+    # Callback to remove rotations of a ComplexS object from the hash index.
+    for h in hashes:
+        index.pop(h, None)
+
+def _drop_fingerprint(index, fingerprint, key):
+    # Callback to remove a ComplexS object from the fingerprint index.
+    # Lock-free like _drop_rotations: a race with a new registration can only
+    # drop the entry of a live complex, which disables the prefilter for that
+    # fingerprint, but the canonical form lookup still finds the complex.
+    keys = index.get(fingerprint)
+    if keys is not None:
+        keys.pop(key, None)
+        if not keys:
+            index.pop(fingerprint, None)
+
+class SlottedComplexS(metaclass = Singleton):
+    """ Complex object (Singleton) without a per-instance __dict__.
 
     If the same complex is initialized twice (e.g. in a different rotation),
     then this returns the existing complex.  Sequence and structure should be
@@ -185,8 +242,68 @@ class ComplexS(metaclass = Singleton):
         structure (list): A structure in dot-bracket notation.
         name (str, optional): A name tag unique for this complex.
     """
+    __slots__ = ('_sequence', '_structure', '_name', '_canon', '_key', '_turns',
+                 '_strand_table', '_flat', '_pending', '_pair_table', '_loops',
+                 '_period', '_domain_index', '_exterior_index', '_domains',
+                 '_exterior_domains', '_enclosed_domains', '_kernel', '_concentration',
+                 '__weakref__')
     PREFIX = 'c'
     ID = 1
+    COMPACT_KEY = True # Use compact bytes keys for the singleton registry.
+    # Which rotations are registered for faster lookup of existing complexes:
+    #   'all': every rotation is a key in the singleton registry (default, fast, big).
+    #   'canon': only the canonical form (small, computes it for every lookup).
+    #   'hash': a plain index from rotation hashes to turns (in between).
+    ROTATIONS = 'all'
+    # With ROTATIONS = 'all' or 'hash': skip the rotation lookup for complexes
+    # with an unseen rotation-invariant fingerprint (see complex_fingerprint).
+    # There is no rotation lookup with ROTATIONS = 'canon', so no effect there.
+    # Off by default: the index and a finalizer per complex cost memory.
+    FINGERPRINTS = False
+
+    @classmethod
+    def _registry_key(cls, sequence, structure):
+        """ Returns the registry key for any (sequence, structure) pair. """
+        if cls.COMPACT_KEY:
+            return compact_complex_key(list(map(str, sequence)), structure)
+        return (tuple(map(str, sequence)), tuple(structure))
+
+    @classmethod
+    def _rotation_index(cls):
+        """ dict: The class-specific index for ROTATIONS = 'hash'. """
+        # [hash(rotation key)] = turns
+        return cls._instanceData.setdefault('rotations', dict())
+
+    @classmethod
+    def _fingerprint_index(cls):
+        """ dict: The class-specific index for FINGERPRINTS = True.
+
+        Only used with ROTATIONS = 'all' or 'hash'.
+        """
+        # [fingerprint] = {registry key: None}
+        return cls._instanceData.setdefault('fingerprints', dict())
+
+    @classmethod
+    def _find_rotation(cls, sequence, structure, fingerprint = None):
+        """ Returns an existing complex or None. """
+        if cls.ROTATIONS in ('all', 'hash') and fingerprint is not None:
+            if fingerprint not in cls._fingerprint_index():
+                return None # Unseen, no need to build a key.
+        if cls.ROTATIONS == 'all':
+            key = cls._registry_key(sequence, structure)
+            return cls._instanceCanon.get(key)
+        elif cls.ROTATIONS == 'hash':
+            key = cls._registry_key(sequence, structure)
+            turns = cls._rotation_index().get(hash(key))
+            if turns is None:
+                return None
+            # Hash collisions and stale entries are fine: if the rotated
+            # complex is registered, then it is the canonical form.
+            key = cls._registry_key(*rotate_complex(sequence, structure, turns))
+            return cls._instanceCanon.get(key)
+        elif cls.ROTATIONS != 'canon':
+            raise ValueError(f'Unknown mode {cls.__name__}.ROTATIONS = {cls.ROTATIONS}.')
+        return None
 
     @classmethod
     def identifiers(cls, sequence, structure, name = None, prefix = None, **kwargs):
@@ -202,30 +319,36 @@ class ComplexS(metaclass = Singleton):
             if len(sequence) != len(structure):
                 raise ObjectInitError('Complex initialization error: ' + \
                                      f'{len(sequence)} != {len(structure)}.')
-            cdict = {} # Find canonical form.
-            rseq, rstr = sequence, structure
-            for e in range(len(make_strand_table(sequence))):
-                rcplx = tuple((tuple(map(str, rseq)), tuple(rstr)))
-                if rcplx in cls._instanceCanon:
-                    canon = rcplx
-                    turns = e
-                    break
-                cdict[rcplx] = e # How many rotations to the canonical form
-                rseq, rstr = rotate_complex_once(rseq, rstr)
-            else:
-                canon = sorted(cdict, key = lambda x:(x[0], x[1]))[0]
-                turns = cdict[canon] # How many rotations to the canonical form
+            if kwargs.get('canon') is not None:
+                # Precomputed by a structure move, see ComplexS._derive().
+                return (kwargs['key'], name, {})
+            fingerprint = None
+            if cls.FINGERPRINTS and cls.ROTATIONS != 'canon':
+                fingerprint = complex_fingerprint(sequence, structure)
+            existing = cls._find_rotation(sequence, structure, fingerprint)
+            if existing is not None:
+                # The registry holds weak references only, the new argument
+                # keeps the complex alive until the registry lookup finds it.
+                return (existing._key, name, {'existing': existing})
+            # Find the canonical form and how many rotations lead there.
+            canon, turns = canonical_rotation(sequence, structure)
             tot = len(make_strand_table(sequence))
             turns = wrap(-turns, tot) # How many rotations from the canonical form
-            newargs = {'canon': canon, 'turns': turns, 'rcplxs': cdict.keys()}
+            key = compact_complex_key(*canon) if cls.COMPACT_KEY else canon
+            newargs = {'canon': canon, 'turns': turns, 'key': key, 
+                       'fingerprint': fingerprint}
+            return (key, name, newargs)
         return (canon, name, newargs)
 
     def __init__(self, sequence, structure, name = None, 
-                 prefix = None, canon = None, turns = None, rcplxs = None):
+                 prefix = None, canon = None, turns = None, key = None, 
+                 fingerprint = None, existing = None):
         # This must have been set by the identifiers method.
         cls = self.__class__
+        assert existing is None
         assert canon is not None
         assert turns is not None
+        assert key is not None
         if name is None:
             name = f'{cls.PREFIX}{cls.ID}' if prefix is None else f'{prefix}{cls.ID}'
             self.__class__.ID += 1
@@ -235,21 +358,48 @@ class ComplexS(metaclass = Singleton):
         self._structure = structure
         self._name = name
         self._canon = canon
+        self._key = key
         self._turns = turns
 
         # Initialized on demand:
         self._strand_table = None
+        self._flat = None
+        self._pending = 0 # Rotation not yet applied to the representation.
         self._pair_table = None
-        self._loop_index = None
+        self._loops = None
+        self._period = None
+        self._domain_index = None
+        self._exterior_index = None
         self._domains = None
         self._exterior_domains = None
         self._enclosed_domains = None
-        self._exterior_loops = None
+        self._kernel = None
         self._concentration = None
 
-        # A speedup that uses some memory ...
-        for rcplx in rcplxs:
-            cls._instanceCanon[rcplx] = self
+        if cls.ROTATIONS == 'all':
+            # A speedup that uses some memory ...
+            for rkey, _ in self._rotation_keys():
+                cls._instanceCanon[rkey] = self
+        elif cls.ROTATIONS == 'hash':
+            index = cls._rotation_index()
+            hashes = []
+            for rkey, rturns in self._rotation_keys():
+                index[hash(rkey)] = rturns
+                hashes.append(hash(rkey))
+            finalize(self, _drop_rotations, index, tuple(hashes))
+        if cls.FINGERPRINTS and cls.ROTATIONS != 'canon':
+            if fingerprint is None:
+                fingerprint = complex_fingerprint(*canon)
+            index = cls._fingerprint_index()
+            index.setdefault(fingerprint, dict())[key] = None
+            finalize(self, _drop_fingerprint, index, fingerprint, key)
+
+    def _rotation_keys(self):
+        """ Yields the registry key and the turns to the canonical form for every rotation. """
+        seq, sst = self._canon
+        tot = seq.count('+') + 1
+        for e, (rseq, rsst) in enumerate(iter_rotations(seq, sst)):
+            yield self.__class__._registry_key(rseq, rsst), wrap(-e, tot)
 
     @property
     def name(self):
@@ -269,6 +419,11 @@ class ComplexS(metaclass = Singleton):
     def canonical_form(self, value):
         raise SingletonError(f'{self.__class__.__name__} object canonical_form is immutable!')
 
+    @property
+    def compact_key(self):
+        """ bytes: A compact version of the canonical form (registry key). """
+        return self._key
+
     @property
     def turns(self):
         """ Number of cyclic permutations from canonical form to representation. """
@@ -279,62 +434,113 @@ class ComplexS(metaclass = Singleton):
         # Turns = 0 rotates the object into the canonical form.
         # Turns = 1 rotates the object into canonical form + 1 turn.
         tot = self.size
-        t = wrap(-self._turns + value, tot)
-        for e, (seq, sst) in enumerate(self.rotate()):
-            if e == t:
-                self._sequence = seq
-                self._structure = sst
-                self._turns = wrap(value, tot)
-                break
-        else:
-            raise ObjectInitError('Something went terribly wrong when rotating the complex.')
+        if not self._pending:
+            # Keep the tables of the current representation, they are
+            # rotated on demand, see _materialize().
+            _ = self.strand_table_view
+            _ = self.flat_structure
+        self._pending = wrap(self._pending - self._turns + value, tot)
+        self._turns = wrap(value, tot)
+        # Cached tables refer to the old representation.
+        self._pair_table = None
+        self._loops = None
+        self._domain_index = None
+        self._exterior_index = None
+        self._exterior_domains = None
+        self._enclosed_domains = None
+        self._kernel = None
+
+    def _materialize(self):
+        """ Applies a pending rotation to sequence, structure and tables. """
+        t = self._pending
+        rot = ComplexRotation(self._strand_table, *self._flat, t)
+        self._sequence = rot.sequence()
+        self._structure = rot.structure()
+        self._strand_table = self._strand_table[t:] + self._strand_table[:t]
+        self._flat = rot.flat_structure()
+        self._pending = 0
 
     @property
     def sequence(self):
         """ list: sequence the complex object. """
+        if self._pending:
+            self._materialize()
         return iter(self._sequence)
 
     @property
     def strand_table(self):
-        if not self._strand_table:
-            self._strand_table = make_strand_table(self._sequence)
-        for strand in self._strand_table:
+        """ Yields a copy of every strand in the strand table. """
+        for strand in self.strand_table_view:
             yield list(strand) # Deepcopy
 
     @property
     def structure(self):
         """ list: the complex structure. """
+        if self._pending:
+            self._materialize()
         return iter(self._structure)
 
     @property
     def pair_table(self):
         """ returns a structure in multistranded pair-table format. """
-        if not self._pair_table:
-            self._pair_table = make_pair_table(self._structure)
-        for locs in self._pair_table:
+        for locs in self.pair_table_view:
             yield list(locs) # Deepcopy
 
     @property
-    def __strand_table(self):
-        if not self._strand_table:
-            self._strand_table = make_strand_table(self._sequence)
+    def strand_table_view(self):
+        """ tuple: The strand table (IMMUTABLE, computed once, shared without copy). """
+        if self._pending:
+            self._materialize()
+        if self._strand_table is None:
+            self._strand_table = tuple(map(tuple, make_strand_table(self._sequence)))
         return self._strand_table
 
     @property
-    def __pair_table(self):
-        if not self._pair_table:
-            self._pair_table = make_pair_table(self._structure)
+    def pair_table_view(self):
+        """ tuple: The pair table (IMMUTABLE, computed once, shared without copy). """
+        if self._pair_table is None:
+            self._pair_table = flat_to_pair_table(*self.flat_structure)
         return self._pair_table
 
     @property
-    def __loop_index(self):
-        if not self._loop_index:
-            self._loop_index, self._exterior_loops = make_loop_index(self.pair_table)
-        return self._loop_index
+    def flat_structure(self):
+        """ (array, array): Strand offsets and partner index (IMMUTABLE).
+
+        The compact representation of the structure used for all internal
+        computations, see complex_utils.make_flat_structure(). Use
+        flat_index() and flat_locus() to convert between flat positions and
+        (strand, domain) loci.
+        """
+        if self._pending:
+            self._materialize()
+        if self._flat is None:
+            self._flat = make_flat_structure(self._structure)
+        return self._flat
+
+    def flat_index(self, loc):
+        """ int: The flat position of a (strand, domain) locus. """
+        return flat_index(self.flat_structure[0], loc)
+
+    def flat_locus(self, i):
+        """ tuple: The (strand, domain) locus of a flat position. """
+        return flat_locus(self.flat_structure[0], i)
+
+    @property
+    def loop_decomposition(self):
+        """ LoopDecomposition: All loops of the complex (computed once).
+
+        Raises:
+            SecondaryStructureError: Complexes not connected.
+        """
+        if self._loops is None:
+            self._loops = LoopDecomposition(*self.flat_structure)
+        return self._loops
 
     @property
     def size(self):
-        return len(self.__strand_table)
+        if self._strand_table is None:
+            return len(self.strand_table_view)
+        return len(self._strand_table) # Also with a pending rotation.
 
     @property
     def concentration(self):
@@ -356,42 +562,52 @@ class ComplexS(metaclass = Singleton):
         val = convert_units(val, uni, out)
         return (mod, val, out)
 
+    def rotations(self, turns = None):
+        """ Yields every rotation as a ComplexRotation, starting with the current one.
+
+        All rotations share the tables of this complex, nothing is copied
+        unless a rotation is materialized, e.g. using ComplexRotation.sequence().
+        """
+        if turns is None:
+            turns = self.size
+        stab = self.strand_table_view
+        offsets, partner = self.flat_structure
+        for t in range(turns):
+            yield ComplexRotation(stab, offsets, partner, t)
+
     def rotate(self, turns = None):
         """ Returns every rotation of the sequence, structure pair for the complex.
 
         It starts with the default representation.
         """
-        if turns is None:
-            turns = self.size
-        yield list(self.sequence), list(self.structure)
-        x, y = self._sequence, self._structure
-        for _ in range(turns-1):
-            x, y = rotate_complex_once(x, y)
-            yield x, y
+        for rot in self.rotations(turns):
+            yield rot.sequence(), rot.structure()
 
     def rotate_pt(self, turns = None):
         """ A wrapper for rotate() which returns strand table and pair table. """
-        for (x, y) in self.rotate(turns):
-            yield make_strand_table(x), make_pair_table(y)
+        for rot in self.rotations(turns):
+            yield rot.strand_table(), rot.pair_table()
     
     # ------ can be mutable but must yield the same canonical form!
     def strand_length(self, pos):
-        return len(self.__strand_table[pos])
+        return len(self.strand_table_view[pos])
  
     def get_loop_index(self, loc):
-        return self.__loop_index[loc[0]][loc[1]]
+        return self.loop_decomposition.loop_index[self.flat_index(loc)]
 
     def get_domain(self, loc):
-        return self.__strand_table[loc[0]][loc[1]]
+        return self.strand_table_view[loc[0]][loc[1]]
     
     def get_paired_loc(self, loc):
         """ 
         Returns the paired element in the pair-table. 
         Raises: IndexError if there are negative elements in loc
         """
-        if loc[0] < 0 or loc[1] < 0:
+        offsets, partner = self.flat_structure
+        if loc[0] < 0 or loc[1] < 0 or loc[1] >= offsets[loc[0] + 1] - offsets[loc[0]]:
             raise IndexError
-        return self.__pair_table[loc[0]][loc[1]]
+        p = partner[offsets[loc[0]] + loc[1]]
+        return None if p < 0 else flat_locus(offsets, p)
 
     def rotate_pairtable_loc(self, loc, n):
         """ Maps the locus of a given pair-table to a new rotation.  """
@@ -418,15 +634,184 @@ class ComplexS(metaclass = Singleton):
         if not self._exterior_domains:
             self._exterior_domains = []
             self._enclosed_domains = []
-            for si, strand in enumerate(self.__loop_index):
-                for di, domain in enumerate(strand):
-                    if self._loop_index[si][di] in self._exterior_loops:
-                        if self._pair_table[si][di] is None:
-                            self._exterior_domains.append((si, di))
-                    elif self._pair_table[si][di] is None:
-                            self._enclosed_domains.append((si, di))
+            for loop in self.loop_decomposition:
+                if loop.exterior:
+                    self._exterior_domains.extend(loop.unpaired)
+                else:
+                    self._enclosed_domains.extend(loop.unpaired)
+            self._exterior_domains.sort()
+            self._enclosed_domains.sort()
         return self._exterior_domains
 
+    @property
+    def domain_index(self):
+        """ list: For every loop, a dictionary {domain: [loci]} of unpaired domains.
+
+        Loci are in 5' to 3' order, the list is indexed by loop index (see
+        loop_decomposition).
+        """
+        if self._domain_index is None:
+            stab = self.strand_table_view
+            self._domain_index = []
+            for loop in self.loop_decomposition:
+                index = dict()
+                for loc in loop.unpaired:
+                    index.setdefault(stab[loc[0]][loc[1]], []).append(loc)
+                self._domain_index.append(index)
+        return self._domain_index
+
+    def exterior_domain_index(self):
+        """ dict: {domain: [loci]} of unpaired domains in all exterior loops.
+
+        The index is cached (like domain_index), do not modify it.
+        """
+        if self._exterior_index is None:
+            index = dict()
+            for loop in self.loop_decomposition:
+                if loop.exterior:
+                    for dom, locs in self.domain_index[loop.index].items():
+                        index.setdefault(dom, []).extend(locs)
+            self._exterior_index = index
+        return self._exterior_index
+
+    def bind11_candidates(self):
+        """ Yields all pairs of complementary unpaired domains within the same loop.
+
+        Yields:
+            (loc1, loc2): The loci of the two domains, loc1 < loc2.
+        """
+        for index in self.domain_index:
+            for dom, locs in index.items():
+                if dom.is_complement:
+                    continue
+                clocs = index.get(~dom)
+                if clocs is None:
+                    continue
+                for l1 in locs:
+                    for l2 in clocs:
+                        yield (l1, l2) if l1 < l2 else (l2, l1)
+
+    def bind21_candidates(self, other):
+        """ Yields all pairs of complementary unpaired exterior domains of two complexes.
+
+        Yields:
+            (loc1, loc2): loc1 is a locus of this complex, loc2 of the other.
+        """
+        for _, l1, l2 in self.bind21_batch([other]):
+            yield l1, l2
+
+    def bind21_batch(self, others):
+        """ The same as bind21_candidates() for a batch of complexes.
+
+        The exterior domain indices are cached on every complex, so every other
+        complex costs a lookup per distinct exterior domain of the complex with
+        fewer of them.
+
+        Yields:
+            (other, loc1, loc2): loc1 is a locus of this complex, loc2 of other.
+        """
+        cindex = {~dom: locs for dom, locs in self.exterior_domain_index().items()}
+        for other in others:
+            oindex = other.exterior_domain_index()
+            if len(oindex) < len(cindex):
+                pairs = ((cindex.get(dom), olocs) for dom, olocs in oindex.items())
+            else:
+                pairs = ((slocs, oindex.get(dom)) for dom, slocs in cindex.items())
+            for slocs, olocs in pairs:
+                if slocs is None or olocs is None:
+                    continue
+                for l1 in slocs:
+                    for l2 in olocs:
+                        yield other, l1, l2
+
+    # Structure moves
+    def bind(self, loc1, loc2):
+        """ Returns the complex with an additional base-pair between loc1 and loc2.
+
+        Raises:
+            SecondaryStructureError: The domains are paired, not complementary,
+                or the new base-pair would be pseudoknotted.
+        """
+        return self._derive(opens = (), binds = ((loc1, loc2),))
+
+    def open(self, loc):
+        """ Returns the complex without the base-pair at loc.
+
+        Note that the new complex may not be connected, see split().
+
+        Raises:
+            SecondaryStructureError: The domain at loc is unpaired.
+        """
+        return self._derive(opens = (loc,), binds = ())
+
+    def migrate(self, invader, target):
+        """ Returns the complex after a branch migration step.
+
+        The domain at target changes its partner to the (unpaired) domain at
+        invader, the former partner of target becomes unpaired.
+
+        Raises:
+            SecondaryStructureError: The move is not valid.
+        """
+        return self._derive(opens = (target,), binds = ((invader, target),))
+
+    def _sequence_period(self):
+        """ int: The number of strand rotations that map the sequence onto itself. """
+        if self._period is None:
+            self._period = sequence_period(self._canon[0])
+        return self._period
+
+    def _derive(self, opens, binds):
+        """ Returns the complex with modified base-pairs (same strands, same order).
+
+        The new structure is obtained from the flat structure of this complex.
+        The sequence does not change, hence only the rotations with the least
+        sequence need to be compared to find the new canonical form, and the
+        strand table is shared with the new complex. The new complex is the
+        same object as the one obtained from ComplexS(sequence, structure).
+        """
+        offsets, partner = self.flat_structure # Applies pending rotations.
+        partner = array('i', partner)
+        for loc in opens:
+            p = self.get_paired_loc(loc)
+            if p is None:
+                raise SecondaryStructureError(f'Cannot open unpaired domain at {loc}.')
+            partner[flat_index(offsets, loc)] = -1
+            partner[flat_index(offsets, p)] = -1
+        for l1, l2 in binds:
+            for loc in (l1, l2):
+                self.get_paired_loc(loc) # IndexError for invalid loci.
+            i, j = flat_index(offsets, l1), flat_index(offsets, l2)
+            if i == j or partner[i] >= 0 or partner[j] >= 0:
+                raise SecondaryStructureError(f'Cannot bind domains at {l1} and {l2}.')
+            if self.get_domain(l1) != ~self.get_domain(l2):
+                raise SecondaryStructureError(f'Domains at {l1} and {l2} are not complementary.')
+            partner[i], partner[j] = j, i
+        sequence = self._sequence
+        structure = flat_to_dot_bracket(offsets, partner)
+
+        cls = self.__class__
+        tot = len(offsets) - 1
+        period = self._sequence_period()
+        # Rotations of the representation with the least sequence.
+        candidates = range(wrap(-self._turns, period), tot, period)
+        canon, turns = canonical_rotation(sequence, structure, candidates = candidates)
+        turns = wrap(-turns, tot)
+        key = compact_complex_key(*canon) if cls.COMPACT_KEY else canon
+        try:
+            cplx = cls(sequence, structure, canon = canon, turns = turns, key = key)
+        except SingletonError as err:
+            if err.existing is None:
+                log.warning(f'Automated naming of {cls} object failed. You may have to change {cls}.PREFIX.')
+                raise err
+            return err.existing
+        if cplx._sequence is sequence and cplx._flat is None:
+            # A new complex: share the tables.
+            cplx._strand_table = self.strand_table_view
+            cplx._flat = (offsets, partner)
+            cplx._period = period
+        return cplx
+
     # Sanity Checks
     @property
     def is_domainlevel_complement(self):
@@ -434,29 +819,30 @@ class ComplexS(metaclass = Singleton):
         Determines whether the structure includes pairs only between complementary domains.
         Returns True if all paired domains are complementary, raises an Exception otherwise
         """
-        for si, strand in enumerate(self.pair_table):
-            for di, domain in enumerate(strand):
-                loc = (si,di)
-                cloc = self._pair_table[si][di] 
-                if not (cloc is None or self.get_domain(loc) == ~self.get_domain(cloc)):
-                    return False
+        offsets, partner = self.flat_structure
+        domains = [x for x in self.sequence if x != '+']
+        for i, p in enumerate(partner):
+            if not (p < 0 or domains[i] == ~domains[p]):
+                return False
         return True
 
     @property
     def is_connected(self):
-        if not self._loop_index:
+        if self._loops is None:
             try:
-                _ = self.__loop_index
+                _ = self.loop_decomposition
             except SecondaryStructureError as e:
                 return False
         return True
 
     def split(self):
-        stab = self.__strand_table
-        ptab = self.__pair_table
-        for st, pt in split_complex_pt(stab, ptab):
-            nseq = strand_table_to_sequence(st)
-            nsst = pair_table_to_dot_bracket(pt)
+        offsets = self.flat_structure[0]
+        stab = self.strand_table_view
+        sst = self._structure # Up-to-date after strand_table_view.
+        for comp in flat_strand_components(*self.flat_structure):
+            nseq = strand_table_to_sequence([stab[s] for s in comp])
+            # Positions in the structure are shifted by one '+' per strand.
+            nsst = strand_table_to_sequence([sst[offsets[s]+s:offsets[s+1]+s] for s in comp])
             try:
                 yield self.__class__(nseq, nsst)
             except SingletonError as err:
@@ -468,20 +854,33 @@ class ComplexS(metaclass = Singleton):
 
     @property
     def kernel_string(self):
-        """ str: print sequence and structure in `kernel` notation. """
-        seq = self._sequence
-        sst = self._structure
-        knl = ''
-        for i in range(len(seq)):
-            if sst[i] == '+':
-                knl += str(sst[i]) + ' '
-            elif sst[i] == ')':
-                knl += str(sst[i]) + ' '
-            elif sst[i] == '(':
-                knl += str(seq[i]) + str(sst[i]) + ' '
-            else:
-                knl += str(seq[i]) + ' '
-        return knl[:-1]
+        """ str: print sequence and structure in `kernel` notation. 
+
+        The string of the current representation is computed once.
+        """
+        if self._kernel is None:
+            self._kernel = dot_bracket_to_kernel(self.sequence, self.structure)
+        return self._kernel
+
+    @classmethod
+    def from_kernel_string(cls, knl, domain = None, name = None, prefix = None):
+        """ Returns the complex specified by a kernel string.
+
+        Args:
+            knl (str): The kernel string, e.g. 'a( b + c* )'.
+            domain (callable, optional): Maps domain names to domain objects,
+                e.g. DomainS. Defaults to None: the names are used.
+            name (str, optional): A name tag unique for this complex.
+            prefix (str, optional): A prefix for automatic naming.
+
+        Raises:
+            SecondaryStructureError: The kernel string cannot be parsed.
+            SingletonError: The complex exists and name is None.
+        """
+        seq, sst = kernel_to_dot_bracket(knl)
+        if domain is not None:
+            seq = [x if x == '+' else domain(x) for x in seq]
+        return cls(seq, sst, name = name, prefix = prefix)
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.name}, {self.kernel_string})'
@@ -494,9 +893,9 @@ class ComplexS(metaclass = Singleton):
 
     def __eq__(self, other):
         """ Test if two complexes are equal. """
-        # We use ComplexS here, not self.__class__!
+        # We use SlottedComplexS here, not self.__class__!
         # Equality is based on the canonical form, otherwise use "is"
-        if not isinstance(other, ComplexS):
+        if not isinstance(other, SlottedComplexS):
             return False
         return self.canonical_form == other.canonical_form
 
@@ -504,25 +903,34 @@ class ComplexS(metaclass = Singleton):
         return not (self == other)
 
     def __lt__(self, other):
-        assert isinstance(other, ComplexS)
+        assert isinstance(other, SlottedComplexS)
         return self.canonical_form < other.canonical_form
 
     def __gt__(self, other):
-        assert isinstance(other, ComplexS)
+        assert isinstance(other, SlottedComplexS)
         return self.canonical_form > other.canonical_form
 
     def __le__(self, other):
-        assert isinstance(other, ComplexS)
+        assert isinstance(other, SlottedComplexS)
         return self.canonical_form <= other.canonical_form
 
     def __ge__(self, other):
-        assert isinstance(other, ComplexS)
+        assert isinstance(other, SlottedComplexS)
         return self.canonical_form >= other.canonical_form
 
     def __hash__(self):
         return hash(self.canonical_form)
 
-class StrandS(ComplexS):
+class ComplexS(SlottedComplexS):
+    """ Complex object (Singleton), see SlottedComplexS.
+
+    Objects have a __dict__, i.e. subclasses may add arbitrary attributes.
+    """
+    pass
+
+class SlottedStrandS(SlottedComplexS):
+    """ Strand object (Singleton) without a per-instance __dict__. """
+    __slots__ = ()
     PREFIX = 's'
     ID = 1
     @classmethod
@@ -540,14 +948,18 @@ class StrandS(ComplexS):
                 name = f'{cls.PREFIX}{cls.ID}' if prefix is None else f'{prefix}{cls.ID}'
             sstr = tuple('*' for _ in range(len(sequence)))
             canon = (tuple(map(str, sequence)), sstr)
-            newargs = {'canon': canon, 'turns': 0}
+            key = compact_complex_key(*canon) if cls.COMPACT_KEY else canon
+            newargs = {'canon': canon, 'turns': 0, 'key': key}
+            return (key, name, newargs)
         return (canon, name, newargs)
 
-    def __init__(self, sequence, name = None, prefix = None, canon = None, turns = None):
+    def __init__(self, sequence, name = None, prefix = None, 
+                 canon = None, turns = None, key = None):
         # This must have been set by the identifiers method.
         cls = self.__class__
         assert turns == 0
         assert canon is not None
+        assert key is not None
         if name is None:
             name = f'{cls.PREFIX}{cls.ID}' if prefix is None else f'{prefix}{cls.ID}'
             self.__class__.ID += 1
@@ -557,11 +969,14 @@ class StrandS(ComplexS):
         self._name = name
         self._structure = None
         self._canon = canon
+        self._key = key
         self._turns = turns
 
         # Initialized on demand:
         self._strand_table = None
+        self._pending = 0
         self._domains = None
+        self._kernel = None
         self._concentration = None
 
     @property
@@ -571,32 +986,45 @@ class StrandS(ComplexS):
     def __repr__(self):
         return f'{self.__class__.__name__}({self.name}, {" ".join(map(str, self._sequence))})'
 
-class MacrostateS(metaclass = Singleton):
-    """ A set of complexes (singleton). 
+class StrandS(SlottedStrandS, ComplexS):
+    """ Strand object (Singleton), see SlottedStrandS.
+
+    Objects have a __dict__, i.e. subclasses may add arbitrary attributes.
+    """
+    pass
+
+class SlottedMacrostateS(metaclass = Singleton):
+    """ A set of complexes (singleton) without a per-instance __dict__. 
 
     Macrostates are initialized with a name, where the name points to a
     particular complex. 
     """
+    __slots__ = ('_complexes', '_representative', '_canonical_form', '_key', '__weakref__')
+    COMPACT_KEY = True # Use tuples of compact complex keys for the registry.
+
     @classmethod
     def identifiers(cls, complexes = None, name = None):
         """ tuple: A method that must be accessible without initializing the object. """
         if complexes is None:
             assert name is not None
+            key = None
             nargs = {}
         else:
             complexes = tuple(sorted(complexes, key = lambda x: x.canonical_form))
-            nargs = {'canon': complexes}
+            key = tuple(x.compact_key for x in complexes) if cls.COMPACT_KEY else complexes
+            nargs = {'canon': complexes, 'key': key}
             if name is None:
                 name = complexes[0].name
                 nargs['name'] = name
             else:
                 assert name in [x.name for x in complexes]
-        return (complexes, name, nargs)
+        return (key, name, nargs)
 
-    def __init__(self, complexes, name, canon = None):
+    def __init__(self, complexes, name, canon = None, key = None):
         self._complexes = complexes
         self._representative = next(x for x in complexes if x.name == name)
         self._canonical_form = canon
+        self._key = key
 
     @property
     def complexes(self):
@@ -619,6 +1047,11 @@ class MacrostateS(metaclass = Singleton):
     def canonical_form(self):
         return self._canonical_form
 
+    @property
+    def compact_key(self):
+        """ tuple: A compact version of the canonical form (registry key). """
+        return self._key
+
     @property
     def name(self):
         return self.representative.name
@@ -638,9 +1071,9 @@ class MacrostateS(metaclass = Singleton):
         return len(self._complexes)
 
     def __eq__(self, other):
-        # We use MacrostateS here, not self.__class__!
+        # We use SlottedMacrostateS here, not self.__class__!
         # Equality is based on the canonical form, otherwise use "is"
-        if not isinstance(other, MacrostateS):
+        if not isinstance(other, SlottedMacrostateS):
             return False
         return (self.canonical_form == other.canonical_form)
 
@@ -664,9 +1097,18 @@ class MacrostateS(metaclass = Singleton):
     def __hash__(self):
         return hash(self.canonical_form)
 
-class ReactionS(metaclass = Singleton):
+class MacrostateS(SlottedMacrostateS):
+    """ A set of complexes (singleton), see SlottedMacrostateS.
+
+    Objects have a __dict__, i.e. subclasses may add arbitrary attributes.
+    """
+    pass
+
+class SlottedReactionS(metaclass = Singleton):
     """ A reaction between complexes or macrostates (singleton). 
 
+    Objects do not have a per-instance __dict__, see ReactionS.
+
     Args:
       reactants (list): A list of reactants. Reactants can be 
         :obj:`DSD_Macrostate()` or :obj:`DSD_Complex()` objects.
@@ -675,27 +1117,35 @@ class ReactionS(metaclass = Singleton):
       rtype (str, optional): Reaction type, e.g. bind21, condensed, .. Defaults to None.
       rate (flt, optional): Reaction rate. A reaction rate 
     """
+    __slots__ = ('_reactants', '_products', '_rtype', '_const', '_units', '_name',
+                 '_canonical_form', '_key', '__weakref__')
     RTYPES = set(['condensed', 'open', 'bind11', 'bind21', 'branch-3way', 'branch-4way'])
+    COMPACT_KEY = True # Use the compact keys of reactants and products for the registry.
 
     @classmethod
     def identifiers(cls, reactants, products, rtype, name = None):
         """ tuple: A method that must be accessible without initializing the object. """
         if name is not None and reactants is None and products is None and rtype is None:
             return (None, name, {})
-        react = tuple(sorted([x.canonical_form for x in reactants]))
-        prods = tuple(sorted([x.canonical_form for x in products]))
+        reactants = sorted(reactants, key = lambda y: y.canonical_form)
+        products = sorted(products, key = lambda y: y.canonical_form)
+        react = tuple(x.canonical_form for x in reactants)
+        prods = tuple(x.canonical_form for x in products)
         canon = tuple((react, prods, rtype))
-        newargs = {'canon': canon}
+        if cls.COMPACT_KEY:
+            key = (tuple(x.compact_key for x in reactants), 
+                   tuple(x.compact_key for x in products), rtype)
+        else:
+            key = canon
+        newargs = {'canon': canon, 'key': key}
         if name is None:
             name = "[{}] {} -> {}".format(rtype,
-                    " + ".join([x.name for x in sorted(reactants, 
-                                                       key = lambda y: y.canonical_form)]), 
-                    " + ".join([x.name for x in sorted(products, 
-                                                       key = lambda y: y.canonical_form)]))
+                    " + ".join([x.name for x in reactants]), 
+                    " + ".join([x.name for x in products]))
             newargs['name'] = name
-        return (canon, name, newargs)
+        return (key, name, newargs)
 
-    def __init__(self, reactants, products, rtype, name = None, canon = None):
+    def __init__(self, reactants, products, rtype, name = None, canon = None, key = None):
         self._reactants = sorted(reactants, key = lambda y: y.canonical_form)
         self._products = sorted(products, key = lambda y: y.canonical_form)
         self._rtype = rtype
@@ -708,6 +1158,7 @@ class ReactionS(metaclass = Singleton):
         self._name = name
         assert canon is not None
         self._canonical_form = canon
+        self._key = key
 
     @property
     def reactants(self):
@@ -800,6 +1251,11 @@ class ReactionS(metaclass = Singleton):
     def canonical_form(self):
         return self._canonical_form
 
+    @property
+    def compact_key(self):
+        """ tuple: A compact version of the canonical form (registry key). """
+        return self._key
+
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name})"
 
@@ -807,9 +1263,9 @@ class ReactionS(metaclass = Singleton):
         return f'{self.name}'
 
     def __eq__(self, other):
-        # We use ReactionS here, not self.__class__!
+        # We use SlottedReactionS here, not self.__class__!
         # Equality is based on the canonical form, otherwise use "is"
-        if not isinstance(other, ReactionS):
+        if not isinstance(other, SlottedReactionS):
             return False
         return self.canonical_form == other.canonical_form
 
@@ -831,3 +1287,9 @@ class ReactionS(metaclass = Singleton):
     def __hash__(self):
         return hash(self.canonical_form)
 
+class ReactionS(SlottedReactionS):
+    """ A reaction between complexes or macrostates (singleton), see SlottedReactionS.
+
+    Objects have a __dict__, i.e. subclasses may add arbitrary attributes.
+    """
+    pass
@@ -2,8 +2,12 @@
 # dsdobjects/complex_utils.py
 #   - copy and/or modify together with tests/test_complex_utils.py
 #
+import re
 import warnings
-from functools import reduce
+from array import array
+from functools import lru_cache
+from bisect import bisect_right
+from threading import Lock
 from itertools import chain, groupby
 
 class SecondaryStructureError(Exception):
@@ -105,8 +109,78 @@ def strand_table_to_sequence(st, strand_break = '+', join = False):
     """
     if join:
         return f'{strand_break}'.join(''.join(s) for s in st)
-    else:
-        return reduce(lambda a, b: a + [strand_break] + b, st)
+    out = []
+    for e, strand in enumerate(st):
+        if e:
+            out.append(strand_break)
+        out.extend(strand)
+    return out
+
+def dot_bracket_to_kernel(seq, sst):
+    """ Returns the kernel string of a (sequence, structure) pair.
+
+    Example:
+        ['a', 'b', '+', 'b*', 'a*'], ['(', '(', '+', ')', ')'] -> 'a( b( + ) )'
+    """
+    parts = []
+    for x, c in zip(seq, sst):
+        if c == '.':
+            parts.append(str(x))
+        elif c == '(':
+            parts.append(f'{x}(')
+        else: # '+' and ')'
+            parts.append(c)
+    return ' '.join(parts)
+
+# A domain (optionally opening a loop), a strand break, a closing bracket, or garbage.
+_KERNEL_TOKEN = re.compile(r'([A-Za-z0-9_-]+\^?\*?)(\()?|(\+)|(\))|(\S)')
+
+def kernel_to_dot_bracket(knl):
+    """ Returns the (sequence, structure) pair of a kernel string.
+
+    The inverse of dot_bracket_to_kernel() with the semantics of the PIL
+    grammar and objectio.resolve_kernel_loops(): the domain closing a loop is
+    the complement of the domain opening it. Identical strings are parsed
+    only once, see the cache of _parse_kernel().
+
+    Example:
+        'a( b( + ) )' -> ['a', 'b', '+', 'b*', 'a*'], ['(', '(', '+', ')', ')']
+
+    Raises:
+       SecondaryStructureError: Unbalanced loops or unexpected characters.
+
+    Returns:
+      (list, list): The domain names and the dot-bracket structure.
+    """
+    seq, sst = _parse_kernel(knl)
+    return list(seq), list(sst)
+
+@lru_cache(maxsize = 1 << 12)
+def _parse_kernel(knl):
+    seq, sst, stack = [], [], []
+    for m in _KERNEL_TOKEN.finditer(knl):
+        name, loop, plus, close, other = m.groups()
+        if name:
+            seq.append(name)
+            if loop:
+                stack.append(name)
+                sst.append('(')
+            else:
+                sst.append('.')
+        elif plus:
+            seq.append('+')
+            sst.append('+')
+        elif close:
+            if not stack:
+                raise SecondaryStructureError(f"Too many closing brackets in kernel string: '{knl}'.")
+            name = stack.pop()
+            seq.append(name[:-1] if name[-1] == '*' else name + '*')
+            sst.append(')')
+        else:
+            raise SecondaryStructureError(f"Unexpected character in kernel string: '{other}'.")
+    if stack:
+        raise SecondaryStructureError(f"Too few closing brackets in kernel string: '{knl}'.")
+    return tuple(seq), tuple(sst)
 
 def make_loop_index(pt, components = False):
     """ Return the loop index of a secondary structure.
@@ -159,13 +233,281 @@ def make_loop_index(pt, components = False):
             exterior.add(cl) 
     return (loop_index, exterior) if not components else (loop_index, myext)
 
+def make_flat_structure(ss, strand_break = '+'):
+    """ Return a secondary structure as strand offsets and a flat partner index.
+
+    Positions are numbered consecutively over all strands (without strand
+    breaks). The offsets contain the first position of every strand followed
+    by the total number of positions, the partner index contains the paired
+    position or -1 for unpaired positions.
+
+    Example:
+      "...((+))" -> (array('i', [0, 5, 7]), 
+                     array('i', [-1, -1, -1, 6, 5, 4, 3]))
+
+    Raises:
+       SecondaryStructureError: Too few opening parenthesis '(' in secondary structure.
+       SecondaryStructureError: Too few closing parenthesis ')' in secondary structure.
+       SecondaryStructureError: Unexpected character in sequence: "{}".
+
+    Returns:
+      (array, array): The strand offsets and the partner index.
+    """
+    offsets = array('i', [0])
+    partner = array('i')
+    stack = []
+    for char in ss:
+        if char == strand_break:
+            offsets.append(len(partner))
+        elif char == '.':
+            partner.append(-1)
+        elif char == '(':
+            stack.append(len(partner))
+            partner.append(-1)
+        elif char == ')':
+            try:
+                j = stack.pop()
+            except IndexError:
+                raise SecondaryStructureError("Too few opening parenthesis '(' in secondary structure.")
+            partner[j] = len(partner)
+            partner.append(j)
+        else:
+            raise SecondaryStructureError(f"Unexpected character in sequence: '{char}'.")
+    if stack:
+        raise SecondaryStructureError("Too few closing parenthesis ')' in secondary structure.")
+    offsets.append(len(partner))
+    return offsets, partner
+
+def flat_index(offsets, loc):
+    """ Returns the flat position of a (strand, domain) locus. """
+    return offsets[loc[0]] + loc[1]
+
+def flat_locus(offsets, i):
+    """ Returns the (strand, domain) locus of a flat position. """
+    si = bisect_right(offsets, i, 0, len(offsets) - 1) - 1
+    return (si, i - offsets[si])
+
+def flat_to_pair_table(offsets, partner):
+    """ Returns the pair table (tuple of tuples) of a flat structure. """
+    return tuple(tuple(None if partner[i] < 0 else flat_locus(offsets, partner[i]) 
+                        for i in range(offsets[s], offsets[s+1])) 
+                            for s in range(len(offsets) - 1))
+
+def flat_to_dot_bracket(offsets, partner, strand_break = '+'):
+    """ Returns the dot-bracket structure (list) of a flat structure.
+
+    Raises:
+       SecondaryStructureError: Pseudoknotted (crossing) base-pairs.
+    """
+    sst = []
+    stack = []
+    for s in range(len(offsets) - 1):
+        if s:
+            sst.append(strand_break)
+        for i in range(offsets[s], offsets[s+1]):
+            p = partner[i]
+            if p < 0:
+                sst.append('.')
+            elif p > i:
+                stack.append(i)
+                sst.append('(')
+            else:
+                if stack.pop() != p:
+                    raise SecondaryStructureError('Pseudoknotted secondary structure.')
+                sst.append(')')
+    return sst
+
+def flat_loop_index(offsets, partner, components = False):
+    """ The same as make_loop_index(), but for a flat structure.
+
+    Returns:
+        * An array with the loop index for every position.
+        * A set of loop indices that correspond to exterior loops.
+    """
+    loop_index = array('i', bytes(4 * len(partner)))
+    exterior = set()
+    myext = []
+
+    stack = []
+    (cl, nl) = (0, 0)
+    for s in range(len(offsets) - 1):
+        ext = [cl, None]
+        for i in range(offsets[s], offsets[s+1]):
+            p = partner[i]
+            if p > i: # '('
+                nl += 1
+                cl = nl
+                stack.append(i)
+            loop_index[i] = cl
+            if 0 <= p < i: # ')'
+                stack.pop()
+                cl = loop_index[stack[-1]] if stack else 0
+        ext[1] = cl
+        myext.append(ext)
+        if cl in exterior:
+            if components is False:
+                raise SecondaryStructureError('Complexes not connected.')
+        else:
+            exterior.add(cl) 
+    return (loop_index, exterior) if not components else (loop_index, myext)
+
+class Loop:
+    """ A loop of a secondary structure, see LoopDecomposition.
+
+    Attributes:
+        index (int): The loop index (as in make_loop_index).
+        closing (tuple): The (5', 3') loci of the closing pair, None for the 
+            outermost loop.
+        unpaired (list): The loci of unpaired domains in 5' to 3' order.
+        stems (list): The (5', 3') loci of enclosed (child) pairs in 5' to 3' order.
+        children (list): The loop indices of the enclosed loops.
+        exterior (bool): True if the loop contains a strand break.
+    """
+    __slots__ = ('index', 'closing', 'unpaired', 'stems', 'children', 'exterior')
+
+    def __init__(self, index, closing = None):
+        self.index = index
+        self.closing = closing
+        self.unpaired = []
+        self.stems = []
+        self.children = []
+        self.exterior = False
+
+    @property
+    def kind(self):
+        """ str: 'exterior', 'hairpin', 'interior' (incl. stacks and bulges) or 'multi'. """
+        if self.exterior:
+            return 'exterior'
+        return ('hairpin', 'interior')[len(self.stems)] if len(self.stems) < 2 else 'multi'
+
+    def __repr__(self):
+        return f'Loop({self.index}, {self.kind}, closing = {self.closing}, ' + \
+               f'unpaired = {self.unpaired}, stems = {self.stems})'
+
+class LoopDecomposition:
+    """ All loops of a secondary structure, computed in a single pass.
+
+    Loops are numbered as in make_loop_index(), that is, every unpaired
+    position belongs to the loop it is in, every paired position to the loop
+    closed by its pair.
+
+    Args:
+        offsets (array): The strand offsets of the flat structure.
+        partner (array): The partner index of the flat structure.
+
+    Attributes:
+        loops (list): The Loop objects, indexed by loop index.
+        loop_index (array): The loop index of every flat position.
+        exterior (set): The indices of exterior loops.
+
+    Raises:
+        SecondaryStructureError: Complexes not connected.
+    """
+    __slots__ = ('loops', 'loop_index', 'exterior')
+
+    def __init__(self, offsets, partner):
+        loops = [Loop(0)]
+        loop_index = array('i', bytes(4 * len(partner)))
+        exterior = set()
+        stack = [] # (5' locus, loop index)
+        cl = 0
+        for s in range(len(offsets) - 1):
+            o = offsets[s]
+            for i in range(o, offsets[s+1]):
+                p = partner[i]
+                if p < 0:
+                    loops[cl].unpaired.append((s, i - o))
+                elif p > i: # '('
+                    loops[cl].children.append(len(loops))
+                    stack.append(((s, i - o), cl))
+                    cl = len(loops)
+                    loops.append(Loop(cl))
+                else: # ')'
+                    loc, parent = stack.pop()
+                    loops[cl].closing = (loc, (s, i - o))
+                    loop_index[i] = cl
+                    cl = parent
+                    continue
+                loop_index[i] = cl
+            if cl in exterior:
+                raise SecondaryStructureError('Complexes not connected.')
+            exterior.add(cl)
+        for loop in loops:
+            loop.stems = [loops[c].closing for c in loop.children]
+            loop.exterior = loop.index in exterior
+        self.loops = loops
+        self.loop_index = loop_index
+        self.exterior = exterior
+
+    def __len__(self):
+        return len(self.loops)
+
+    def __iter__(self):
+        return iter(self.loops)
+
+    def __getitem__(self, index):
+        return self.loops[index]
+
+def rotate_flat_structure(offsets, partner, turns = 1):
+    """ Returns the flat structure after turns applications of rotate_complex_once(). """
+    ns = len(offsets) - 1
+    t = wrap(turns, ns)
+    S, L = offsets[t], len(partner)
+    noff = array('i', [o - S for o in offsets[t:ns]])
+    noff.extend([o + L - S for o in offsets[:t]])
+    noff.append(L)
+    npar = array('i', [p if p < 0 else (p - S) % L for p in chain(partner[S:], partner[:S])])
+    return noff, npar
+
+def strand_components(nstrands, pairs):
+    """ Returns the connected components of a complex (union-find over strands).
+
+    Args:
+        nstrands (int): The number of strands.
+        pairs: An iterable of (strand, strand) indices connected by base-pairs.
+
+    Returns:
+        [list]: A list of strand indices for every component. Strands are
+            sorted within each component, components are sorted by their last
+            strand (that is the order of split_complex_pt).
+    """
+    parent = list(range(nstrands))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra < rb:
+            parent[rb] = ra
+        elif rb < ra:
+            parent[ra] = rb
+    components = dict()
+    for s in range(nstrands):
+        components.setdefault(find(s), []).append(s)
+    return sorted(components.values(), key = lambda c: c[-1])
+
+def flat_strand_components(offsets, partner):
+    """ The same as strand_components(), but for a flat structure. """
+    def pairs():
+        opener = dict()
+        for s in range(len(offsets) - 1):
+            for i in range(offsets[s], offsets[s+1]):
+                p = partner[i]
+                if p > i:
+                    opener[i] = s
+                elif p >= 0:
+                    yield opener.pop(p), s
+    return strand_components(len(offsets) - 1, pairs())
+
 def split_complex_db(seq, sst, join = False):
     """Yields connected complexes from dot bracket format. """
     stab = make_strand_table(seq)
-    ptab = make_pair_table(sst)
-    for st, pt in split_complex_pt(stab, ptab):
-        nseq = strand_table_to_sequence(st, join = join)
-        nsst = pair_table_to_dot_bracket(pt, join = join)
+    sstab = make_strand_table(sst)
+    for comp in flat_strand_components(*make_flat_structure(sst)):
+        nseq = strand_table_to_sequence([stab[s] for s in comp], join = join)
+        nsst = strand_table_to_sequence([sstab[s] for s in comp], join = join)
         yield (nseq, nsst)
     return
 
@@ -179,68 +521,331 @@ def split_complex_pt(stab, ptab):
     Yields:
         Unconnected components.
     """
-    def splice(i,j):
-        innerss = stab[i:j+1]
-        innerpt = [list(map(lambda x: (x if x is None else (x[0] - i, 
-                                                            x[1])), st)) for st in ptab[i:j+1]]
-        outerss = stab[0:i] + stab[j+1:]
-        outerpt = [list(map(lambda x: (x if x is None else (x[0] if x[0] < i else x[0] - (j+1-i), 
-                                                            x[1])), st)) for st in ptab[0:i] + ptab[j+1:]]
-        return (innerss, innerpt), (outerss, outerpt)
-
-    li, ext = make_loop_index(ptab, components = True)
-    seen = {0: 0}
-    for j, (fr, to) in enumerate(ext):
-        assert fr in seen
-        assert seen[fr] == j
-        if j == len(ext)-1:
-            assert to in seen
-            yield (stab, ptab)
-            break
-        if to in seen:
-            i = seen[to]
-            (iss, ipt), (oss, opt) = splice(i, j)
-            for (s, p) in chain(split_complex_pt(iss, ipt), 
-                                split_complex_pt(oss, opt)):
-                yield (s, p)
-            break
-        seen[to] = j + 1
+    pairs = ((si, loc[0]) for si, strand in enumerate(ptab) for loc in strand if loc)
+    components = strand_components(len(ptab), pairs)
+    if len(components) == 1:
+        yield (stab, ptab)
+        return
+    for comp in components:
+        index = {s: e for e, s in enumerate(comp)}
+        yield ([stab[s] for s in comp], 
+               [[x if x is None else (index[x[0]], x[1]) for x in ptab[s]] for s in comp])
     return
 
 def wrap(x, m):
     """ Wraps x so that 0 <= wrap(x, m) < m. (x can be negative.) """
     return (x % m + m) % m
 
+def flat_from_pair_table(ptab):
+    """ Returns the flat structure (offsets, partner) of a pair table. """
+    offsets = array('i', [0])
+    for strand in ptab:
+        offsets.append(offsets[-1] + len(strand))
+    partner = array('i', [-1 if x is None else offsets[x[0]] + x[1] 
+                                    for strand in ptab for x in strand])
+    return offsets, partner
+
+class ComplexRotation:
+    """ A rotation of a complex as an offset over shared (unrotated) tables.
+
+    Turns counts applications of rotate_complex_once(), i.e. the first strand
+    of the rotation is stab[turns]. Nothing is copied on initialization, the
+    methods materialize the rotation on demand.
+
+    Args:
+        stab: A sequence in "strand table" format.
+        offsets (array): The strand offsets of the flat structure.
+        partner (array): The partner index of the flat structure.
+        turns (int): The rotation.
+    """
+    __slots__ = ('stab', 'offsets', 'partner', 'turns')
+
+    def __init__(self, stab, offsets, partner, turns = 0):
+        self.stab = stab
+        self.offsets = offsets
+        self.partner = partner
+        self.turns = wrap(turns, len(stab))
+
+    def locus(self, loc):
+        """ Maps a (strand, domain) locus of the unrotated complex to this rotation. """
+        return (wrap(loc[0] - self.turns, len(self.stab)), loc[1])
+
+    def strand_table(self):
+        """ list: The rotated strand table (a new list of lists). """
+        t = self.turns
+        return [list(x) for x in chain(self.stab[t:], self.stab[:t])]
+
+    def pair_table(self):
+        """ list: The rotated pair table (a new list of lists). """
+        offsets, partner = self.offsets, self.partner
+        n, t = len(self.stab), self.turns
+        def rotated(p):
+            if p < 0:
+                return None
+            si, di = flat_locus(offsets, p)
+            return (wrap(si - t, n), di)
+        return [[rotated(partner[i]) for i in range(offsets[s], offsets[s+1])] 
+                                        for s in chain(range(t, n), range(t))]
+
+    def flat_structure(self):
+        """ (array, array): The rotated flat structure. """
+        return rotate_flat_structure(self.offsets, self.partner, self.turns)
+
+    def sequence(self, strand_break = '+', join = False):
+        """ list: The rotated sequence. """
+        t = self.turns
+        return strand_table_to_sequence(chain(self.stab[t:], self.stab[:t]), 
+                                         strand_break = strand_break, join = join)
+
+    def structure(self, strand_break = '+', join = False):
+        """ list: The rotated structure in dot-bracket notation. """
+        offsets, partner = self.offsets, self.partner
+        n, t = len(self.stab), self.turns
+        S, L = offsets[t], len(partner)
+        out = []
+        for s in chain(range(t, n), range(t)):
+            if out:
+                out.append(strand_break)
+            for i in range(offsets[s], offsets[s+1]):
+                p = partner[i]
+                out.append('.' if p < 0 else '(' if (p - S) % L > (i - S) % L else ')')
+        return ''.join(out) if join else out
+
 def rotate_complex_db(seq, sst, turns = None, join = False):
-    # Would this be much faster when using strings?
+    """ The same as rotate_complex_pt(), but for dot-bracket notation. """
     stab = make_strand_table(seq)
-    ptab = make_pair_table(sst)
-    assert all(len(x) == len(y) for x, y in zip(stab, ptab))
-    for (st, pt) in rotate_complex_pt(stab, ptab, turns = turns):
-        nseq = strand_table_to_sequence(st, join = join)
-        nsst = pair_table_to_dot_bracket(pt, join = join)
-        yield (nseq, nsst)
+    offsets, partner = make_flat_structure(sst)
+    assert len(stab) == len(offsets) - 1
+    for t in _rotate_complex_pt_turns(len(stab), turns):
+        rot = ComplexRotation(stab, offsets, partner, t)
+        yield (rot.sequence(join = join), rot.structure(join = join))
     return
 
+def _rotate_complex_pt_turns(n, turns):
+    # The (backward) rotations yielded by rotate_complex_pt, see there.
+    if turns is None:
+        turns = n
+    t = 0
+    for k in range(turns, 0, -1):
+        if n > 1 and k != n:
+            t -= 1
+        yield t
+
 def rotate_complex_pt(stab, ptab, turns = None):
     """ Returns all complex rotations starting with the current one.
     
-    Note, you can set turns = 1 for a single forced rotation.
+    Note, you can set turns = 1 for a single forced rotation. The rotations
+    go backwards, i.e. the last strand becomes the first strand.
     """
-    if turns is None:
-        turns = len(ptab)
+    offsets, partner = flat_from_pair_table(ptab)
+    for t in _rotate_complex_pt_turns(len(ptab), turns):
+        rot = ComplexRotation(stab, offsets, partner, t)
+        yield (rot.strand_table(), rot.pair_table())
+    return
 
-    def rotate_locus(x, n):
-        return x if x is None else (wrap(x[0]+n, len(ptab)), x[1])
+def least_rotation(s):
+    """ Returns the smallest index of the lexicographically least rotation of s.
 
-    if turns > 0:
-        if len(ptab) > 1 and turns != len(ptab):
-            stab = [stab[-1]] + stab[:-1]
-            ptab = [[rotate_locus(x, 1) for x in y] for y in [ptab[-1]] + ptab[:-1]]
-        yield (stab, ptab)
-        for (s, p) in rotate_complex_pt(stab, ptab, turns - 1):
-            yield (s, p)
-    return
+    Duval's Lyndon factorization, O(len(s)) comparisons.
+    """
+    n = len(s)
+    s = list(s) * 2
+    i = ans = 0
+    while i < n:
+        ans = i
+        j, k = i + 1, i
+        while j < 2 * n and s[k] <= s[j]:
+            k = i if s[k] < s[j] else k + 1
+            j += 1
+        while i <= k:
+            i += j - k
+    return ans
+
+def smallest_period(s):
+    """ Returns the smallest p such that s is a repetition of s[:p]. """
+    n = len(s)
+    pi = [0] * n # KMP prefix function
+    for i in range(1, n):
+        k = pi[i-1]
+        while k and s[i] != s[k]:
+            k = pi[k-1]
+        if s[i] == s[k]:
+            k += 1
+        pi[i] = k
+    p = n - pi[-1] if n else 0
+    return p if p and n % p == 0 else n
+
+def sequence_period(seq, strand_break = '+'):
+    """ Returns the smallest number of strand rotations that map seq onto itself. """
+    strands = []
+    strand = []
+    for x in seq:
+        if x == strand_break:
+            strands.append(tuple(strand))
+            strand = []
+        else:
+            strand.append(x)
+    strands.append(tuple(strand))
+    return smallest_period(strands)
+
+def _partner_list(sst):
+    """ Returns the index of the paired position for every position (or None). """
+    partner = [None] * len(sst)
+    stack = []
+    for i, char in enumerate(sst):
+        if char == '(':
+            stack.append(i)
+        elif char == ')':
+            try:
+                j = stack.pop()
+            except IndexError:
+                raise SecondaryStructureError("Too few opening parenthesis '(' in secondary structure.")
+            partner[i], partner[j] = j, i
+    if stack:
+        raise SecondaryStructureError("Too few closing parenthesis ')' in secondary structure.")
+    return partner
+
+def _rotated_structure(sst, partner, S, strand_break = '+'):
+    """ Returns the structure (list) starting with the strand at position S. """
+    L = len(sst)
+    if S == 0:
+        return list(sst)
+    def pos(x):
+        return x - S if x >= S else x + L - S + 1
+    out = []
+    for x in chain(range(S, L), [None], range(0, S - 1)):
+        if x is None:
+            out.append(strand_break)
+        elif partner[x] is None:
+            out.append(sst[x])
+        else:
+            out.append('(' if pos(partner[x]) > pos(x) else ')')
+    return out
+
+def rotate_complex(seq, sst, turns = 1, strand_break = '+'):
+    """ Returns the complex after turns applications of rotate_complex_once().
+
+    Only the final rotation is materialized, in time linear to the length of
+    the complex.
+
+    Returns:
+        (list, list): The rotated sequence and structure.
+    """
+    starts = [0] + [i + 1 for i, x in enumerate(seq) if x == strand_break]
+    S = starts[wrap(turns, len(starts))]
+    if S == 0:
+        return list(seq), list(sst)
+    rseq = list(seq[S:]) + [strand_break] + list(seq[:S-1])
+    return rseq, _rotated_structure(sst, _partner_list(sst), S, strand_break)
+
+def iter_rotations(seq, sst, strand_break = '+'):
+    """ Yields every rotation, as from repeated calls of rotate_complex_once().
+
+    Starts with the unrotated complex, the pair table is computed only once.
+
+    Yields:
+        (list, list): The rotated sequence and structure.
+    """
+    starts = [0] + [i + 1 for i, x in enumerate(seq) if x == strand_break]
+    partner = _partner_list(sst)
+    yield list(seq), list(sst)
+    for S in starts[1:]:
+        rseq = list(seq[S:]) + [strand_break] + list(seq[:S-1])
+        yield rseq, _rotated_structure(sst, partner, S, strand_break)
+
+def canonical_rotation(seq, sst, strand_break = '+', candidates = None):
+    """ Returns the canonical form of a complex and the rotation to reach it.
+
+    The canonical form is the lexicographically smallest tuple 
+    (tuple(map(str, seq)), tuple(sst)) of all strand rotations, as obtained
+    by applying rotate_complex_once(). Strands are ranked by their domain
+    names, the least rotation of the strand ranks is found in linear time,
+    and only rotations with equal sequence (periodic complexes) are compared
+    by their structure. Only the winning rotation is materialized.
+
+    The rotations with the least sequence only depend on the sequence. If
+    they are known (e.g. after a change of the structure only), they can be
+    provided in ascending order as candidates.
+
+    Returns:
+        (tuple, int): The canonical form and the number of times 
+            rotate_complex_once() has to be applied to reach it. For
+            symmetric complexes, the largest such number is returned.
+    """
+    seq = list(map(str, seq))
+    starts = [0] + [i + 1 for i, x in enumerate(seq) if x == strand_break]
+    if len(starts) == 1:
+        return (tuple(seq), tuple(sst)), 0
+
+    if candidates is None:
+        # Rank the strands: comparing strand + '+' tokens sorts like the
+        # concatenated sequence.
+        ends = starts[1:] + [len(seq) + 1]
+        keys = [tuple(seq[a:b-1]) for a, b in zip(starts, ends)]
+        order = {k: e for e, k in enumerate(sorted(set(keys), 
+                                        key = lambda x: x + (strand_break,)))}
+        ranks = [order[k] for k in keys]
+        r0 = least_rotation(ranks)
+        period = smallest_period(ranks)
+        candidates = range(r0 % period, len(ranks), period)
+
+    partner = _partner_list(sst)
+
+    best, bstr = None, None
+    for r in candidates:
+        rstr = tuple(_rotated_structure(sst, partner, starts[r], strand_break))
+        if bstr is None or rstr <= bstr:
+            best, bstr = r, rstr
+    S = starts[best]
+    bseq = tuple(seq[S:] + [strand_break] + seq[:S-1]) if S else tuple(seq)
+    return (bseq, bstr), best
+
+_domain_ids = {} # [name] = int
+_domain_ids_lock = Lock()
+
+def intern_domain(name):
+    """ Returns a small integer that identifies a domain name in this process.
+
+    The table is process-wide and only grows, the same name always maps to
+    the same integer.
+    """
+    try:
+        return _domain_ids[name]
+    except KeyError:
+        with _domain_ids_lock:
+            return _domain_ids.setdefault(name, len(_domain_ids))
+
+def compact_complex_key(seq, sst):
+    """ Returns a compact bytes key for a (sequence, structure) pair.
+
+    The interned domain names (see intern_domain) are packed as unsigned
+    integers, followed by the (single character) structure symbols. Two pairs
+    of equal length have the same key if and only if they are equal.
+    """
+    try:
+        ids = array('I', [_domain_ids[x] for x in seq])
+    except KeyError:
+        ids = array('I', [intern_domain(x) for x in seq])
+    return ids.tobytes() + ''.join(sst).encode()
+
+def complex_fingerprint(seq, sst, strand_break = '+'):
+    """ Returns a rotation-invariant fingerprint (int) of a complex.
+
+    Every strand is hashed together with the paired/unpaired status of its
+    domains (brackets may flip under rotation, the status does not), and the
+    strand hashes are summed up (mod 2**64), independent of the strand order.
+    Rotations of a complex have the same fingerprint, different complexes may
+    collide. Hash values of strings are only stable within one process.
+    """
+    fp = 0
+    strand = []
+    for x, c in zip(seq, sst):
+        if c == strand_break:
+            fp += hash(tuple(strand))
+            strand = []
+        else:
+            strand.append((str(x), c == '.'))
+    return (fp + hash(tuple(strand))) & 0xFFFFFFFFFFFFFFFF
 
 def rotate_complex_once(seq, sst, turns = None):
     # This function turns out to be much faster than the other two...
@@ -0,0 +1,66 @@
+#
+# dsdobjects.dsdparser.grammar_cache.py
+#   - copy and/or modify together with tests/dsdparser/test_pil_parser.py
+#
+import threading
+from contextlib import contextmanager
+from pyparsing import ParseElementEnhance
+
+# One lock for all grammars: they share the global pyparsing whitespace.
+_lock = threading.RLock()
+
+@contextmanager
+def default_whitespace(chars):
+    """ Temporarily set the default whitespace characters of pyparsing.
+
+    Grammar elements copy the default whitespace characters when they are
+    constructed, so the previous default can be restored as soon as the
+    grammar is built. Other pyparsing users in the same process are therefore
+    not affected.
+    """
+    with _lock:
+        default = ParseElementEnhance.DEFAULT_WHITE_CHARS
+        ParseElementEnhance.setDefaultWhitespaceChars(chars)
+        try:
+            yield
+        finally:
+            ParseElementEnhance.setDefaultWhitespaceChars(default)
+
+def detached(func, *args):
+    """ Returns func(*args), called without a permanent link to the caller's frame.
+
+    pyparsing leaves reference cycles between caught ParseExceptions and the
+    frames that raised them. Frames keep their callers alive, so without this
+    wrapper the locals of whoever called the parser (e.g. a freshly created
+    singleton object) would survive until the next garbage collection. That
+    used to happen implicitly, because rebuilding the grammar for every call
+    triggered the garbage collector. A suspended generator frame has no
+    permanent f_back, which breaks the chain.
+    """
+    def generator():
+        yield func(*args)
+    return next(generator())
+
+class GrammarCache:
+    """ A lazily built, thread-safe, process-wide cache for a pyparsing grammar.
+
+    Args:
+        setup (function): Returns the pyparsing document when called.
+    """
+    def __init__(self, setup):
+        self._setup = setup
+        self._document = None
+
+    def __call__(self):
+        document = self._document
+        if document is None:
+            with _lock:
+                if self._document is None:
+                    self._document = self._setup()
+                document = self._document
+        return document
+
+    def clear(self):
+        """ Forget the cached grammar, it will be rebuilt on the next call. """
+        with _lock:
+            self._document = None
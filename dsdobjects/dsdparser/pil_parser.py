@@ -8,11 +8,23 @@ from pyparsing import (Word, Literal, Group, Suppress, Optional, ZeroOrMore,
         StringStart, StringEnd, Forward, LineEnd, pythonStyleComment,
         ParseElementEnhance)
 
+from .grammar_cache import default_whitespace, detached, GrammarCache
+from .pil_scanner import PilScanError, scan_pil_string
+
+BACKENDS = ('pyparsing', 'fast')
+
 def pil_document_setup():
+    """ Returns a new pyparsing document for the PIL file format.
+
+    Building the grammar is expensive, use pil_document() to get the cached
+    instance instead.
+    """
     crn_DWC = "".join(
         [x for x in ParseElementEnhance.DEFAULT_WHITE_CHARS if x != "\n"])
-    ParseElementEnhance.setDefaultWhitespaceChars(crn_DWC)
+    with default_whitespace(crn_DWC):
+        return _pil_document_setup()
 
+def _pil_document_setup():
     def T(x, tag):
         def TPA(tag):
             return lambda s, l, t: [tag] + t.asList()
@@ -94,11 +106,37 @@ def pil_document_setup():
 
     return document
 
-def parse_pil_file(data):
-    document = pil_document_setup()
-    return document.parseFile(data).asList()
-
-def parse_pil_string(data):
-    document = pil_document_setup()
-    return document.parseString(data).asList()
+pil_document = GrammarCache(pil_document_setup)
+
+def parse_pil_file(data, backend = 'pyparsing'):
+    """ Parse a PIL file (path or file object), see parse_pil_string(). """
+    if backend == 'fast':
+        if hasattr(data, 'read'):
+            return parse_pil_string(data.read(), backend)
+        with open(data, 'r', encoding = 'utf-8') as f:
+            return parse_pil_string(f.read(), backend)
+    elif backend not in BACKENDS:
+        raise ValueError(f'Unknown PIL parser backend: {backend}')
+    document = pil_document()
+    return detached(document.parseFile, data).asList()
+
+def parse_pil_string(data, backend = 'pyparsing'):
+    """ Parse a PIL document into nested lists.
+
+    Args:
+        data (str): The PIL document.
+        backend (str, optional): Either 'pyparsing' or 'fast'. The fast
+            backend is a hand-written scanner that returns the same output, it
+            falls back to pyparsing for everything it cannot handle (including
+            syntax errors). Defaults to 'pyparsing'.
+    """
+    if backend == 'fast':
+        try:
+            return scan_pil_string(data)
+        except PilScanError:
+            pass
+    elif backend not in BACKENDS:
+        raise ValueError(f'Unknown PIL parser backend: {backend}')
+    document = pil_document()
+    return detached(document.parseString, data).asList()
 
@@ -0,0 +1,361 @@
+#
+# A hand-written scanner for the PIL "Pepper Internal Language" specification.
+# dsdobjects.dsdparser.pil_scanner.py
+#   - copy and/or modify together with tests/dsdparser/test_pil_scanner.py
+#
+# This is a fast-path alternative to the pyparsing grammar in pil_parser.py.
+# Statements are dispatched on their leading keyword and then matched with the
+# same (greedy, non-backtracking) semantics as the pyparsing elements, in the
+# same order as the MatchFirst alternatives of the grammar. The scanner must
+# return exactly the same nested lists as parse_pil_string(). Whenever it
+# cannot be sure about that, it raises a PilScanError and the caller falls back
+# to pyparsing, which also produces the error messages for broken inputs.
+#
+import re
+
+class PilScanError(Exception):
+    pass
+
+class _NoMatch(Exception):
+    pass
+
+# Whitespace (no newlines) and comments, as skipped before every element.
+_SKIP = re.compile(r'(?:[ \t\r]*#[^\n]*)*[ \t\r]*')
+_WHITE = re.compile(r'[ \t\r\n]*')
+_IDENTIFIER = re.compile(r'[A-Za-z0-9_-]+')
+_DOMAIN = re.compile(r'[A-Za-z0-9_-]+\*?')
+_SENSE = re.compile(r'[A-Za-z0-9_-]+\^?\*?')
+_NUMBER = re.compile(r'[0-9]+')
+_CONSTRAINT = re.compile(r'[A-Za-z]+')
+_DOTBRACKET = re.compile(r'[(.)+ ]+')
+_NUM_SCI = re.compile(r'[0-9]+(?:\.[0-9]+)?e[-+]?[0-9]+')
+_NUM_FLT = re.compile(r'[0-9]+(?:\.[0-9]+)?')
+
+_CUNITS = ('M', 'mM', 'uM', 'nM', 'pM')
+_TUNITS = ('s', 'm', 'h')
+
+class _Scanner:
+    """ A cursor over a PIL document that emulates the pyparsing elements. """
+    def __init__(self, data):
+        # pyparsing expands tabs before parsing (see ParserElement.parseString)
+        self.s = data.expandtabs()
+        self.n = len(self.s)
+        self.pos = 0
+
+    # Elements
+    def skip(self):
+        if self.pos > self.n:
+            raise _NoMatch
+        self.pos = _SKIP.match(self.s, self.pos).end()
+
+    def regex(self, pattern):
+        self.skip()
+        m = pattern.match(self.s, self.pos)
+        if m is None:
+            raise _NoMatch
+        self.pos = m.end()
+        return m.group()
+
+    def literal(self, lit):
+        self.skip()
+        if not self.s.startswith(lit, self.pos):
+            raise _NoMatch
+        self.pos += len(lit)
+        return lit
+
+    def first_literal(self, lits):
+        self.skip()
+        for lit in lits:
+            if self.s.startswith(lit, self.pos):
+                self.pos += len(lit)
+                return lit
+        raise _NoMatch
+
+    def assign(self):
+        return self.first_literal(('=', ':'))
+
+    def line_end(self):
+        self.skip()
+        if self.pos < self.n and self.s[self.pos] == '\n':
+            self.pos += 1
+        elif self.pos == self.n:
+            self.pos += 1
+        else:
+            raise _NoMatch
+
+    def line_ends(self):
+        self.line_end()
+        self.zero_or_more(self.line_end)
+
+    # Combinators
+    def optional(self, element):
+        pos = self.pos
+        try:
+            return element()
+        except _NoMatch:
+            self.pos = pos
+            return None
+
+    def zero_or_more(self, element):
+        out = []
+        while True:
+            pos = self.pos
+            try:
+                out.append(element())
+            except _NoMatch:
+                self.pos = pos
+                return out
+
+    def one_or_more(self, element):
+        return [element()] + self.zero_or_more(element)
+
+    def delimited(self, element, delim):
+        def next_element():
+            self.literal(delim)
+            return element()
+        return [element()] + self.zero_or_more(next_element)
+
+    def first(self, *alternatives):
+        pos = self.pos
+        for alt in alternatives:
+            try:
+                return alt()
+            except _NoMatch:
+                self.pos = pos
+        raise _NoMatch
+
+    # Composite tokens
+    def identifier(self):
+        return self.regex(_IDENTIFIER)
+
+    def domain(self):
+        return self.regex(_DOMAIN)
+
+    def number(self):
+        return self.regex(_NUMBER)
+
+    def gorf(self):
+        return self.first(lambda: self.regex(_NUM_SCI),
+                          lambda: self.regex(_NUM_FLT))
+
+    def ginf(self):
+        return self.first(self.gorf, lambda: self.literal('inf'))
+
+    def cunit(self):
+        return self.first_literal(_CUNITS)
+
+    def runit(self):
+        self.skip()
+        s, start = self.s, self.pos
+        def adjacent_cunit():
+            if not s.startswith('/', self.pos):
+                raise _NoMatch
+            self.pos += 1
+            for u in _CUNITS:
+                if s.startswith(u, self.pos):
+                    self.pos += len(u)
+                    return u
+            raise _NoMatch
+        self.zero_or_more(adjacent_cunit)
+        if not s.startswith('/', self.pos):
+            raise _NoMatch
+        self.pos += 1
+        for u in _TUNITS:
+            if s.startswith(u, self.pos):
+                self.pos += len(u)
+                return s[start:self.pos]
+        raise _NoMatch
+
+    # Statements (after the leading keyword)
+    def sl_domain(self):
+        out = ['sl-domain', self.domain()]
+        self.assign()
+        out.append(self.regex(_CONSTRAINT))
+        def length():
+            self.assign()
+            return self.number()
+        num = self.optional(length)
+        if num is not None:
+            out.append(num)
+        self.line_ends()
+        return out
+
+    def dl_domain(self):
+        out = ['dl-domain', self.domain()]
+        self.assign()
+        out.append(self.first(self.number,
+                              lambda: self.literal('short'),
+                              lambda: self.literal('long')))
+        self.line_ends()
+        return out
+
+    def composite_domain(self):
+        out = ['composite-domain', self.identifier()]
+        self.assign()
+        out.append(self.one_or_more(self.domain))
+        def length():
+            self.assign()
+            return self.number()
+        num = self.optional(length)
+        if num is not None:
+            out.append(num)
+        self.line_ends()
+        return out
+
+    def complex_strands(self):
+        out = ['strand-complex', self.identifier()]
+        self.assign()
+        self.optional(self.line_end)
+        out.append(self.one_or_more(self.domain))
+        self.optional(self.line_end)
+        out.append(self.regex(_DOTBRACKET))
+        self.line_ends()
+        return out
+
+    def structure_strands(self):
+        out = ['strand-complex', self.identifier()]
+        self.assign()
+        strands = self.one_or_more(lambda: self.first(self.domain,
+                                                      lambda: self.literal('+')))
+        out.append([x for x in strands if x != '+'])
+        self.assign()
+        out.append(self.regex(_DOTBRACKET))
+        self.line_ends()
+        return out
+
+    def reaction(self):
+        def infobox():
+            self.literal('[')
+            def rtype():
+                name = self.identifier()
+                self.assign()
+                return [name]
+            rtype = self.optional(rtype) or []
+            rate = [self.gorf()]
+            def error():
+                self.literal('+/-')
+                return self.ginf()
+            err = self.optional(error)
+            if err is not None:
+                rate.append(err)
+            units = [self.runit()]
+            self.literal(']')
+            return [rtype, rate, units]
+        out = ['reaction', self.optional(infobox) or []]
+        out.append(self.delimited(self.identifier, '+'))
+        self.literal('->')
+        out.append(self.delimited(self.identifier, '+'))
+        self.line_ends()
+        return out
+
+    def resting_macrostate(self):
+        out = ['resting-macrostate', self.identifier()]
+        self.literal('=')
+        self.literal('[')
+        out.append(self.delimited(self.identifier, ','))
+        self.literal(']')
+        self.line_ends()
+        return out
+
+    def kernel_complex(self):
+        out = ['kernel-complex', self.identifier()]
+        self.literal('=')
+        out.extend(self.one_or_more(self.pattern))
+        def conc(modes):
+            self.literal('@')
+            return [self.first_literal(modes), self.gorf(), self.cunit()]
+        c = self.optional(lambda: self.first(lambda: conc(('initial', 'i')),
+                                             lambda: conc(('constant', 'c'))))
+        if c is not None:
+            out.append(c)
+        self.line_ends()
+        return out
+
+    def pattern(self):
+        items = self.one_or_more(lambda: self.first(self.loop,
+                                                    lambda: [self.literal('+')],
+                                                    lambda: [self.regex(_SENSE)]))
+        return [token for item in items for token in item]
+
+    def loop(self):
+        sense = self.regex(_SENSE)
+        if not self.s.startswith('(', self.pos):
+            raise _NoMatch
+        self.pos += 1
+        inner = self.optional(self.pattern)
+        if inner is None:
+            self.white()
+            inner = []
+        self.literal(')')
+        return [sense, inner]
+
+    def white(self):
+        # The optional S(White()) alternative inside an empty loop. It may
+        # consume newlines and comments, which is not supported here.
+        if self.pos > self.n:
+            raise _NoMatch
+        if '#' in _SKIP.match(self.s, self.pos).group():
+            raise PilScanError('comment in empty loop')
+        if '\n' in _WHITE.match(self.s, self.pos).group():
+            raise PilScanError('newline in empty loop')
+
+_KEYWORDS = {
+    'sequence':     ('sl_domain', 'dl_domain', 'kernel_complex'),
+    'length':       ('dl_domain', 'kernel_complex'),
+    'domain':       ('dl_domain', 'kernel_complex'),
+    'sup-sequence': ('composite_domain', 'kernel_complex'),
+    'strand':       ('composite_domain', 'kernel_complex'),
+    'complex':      ('complex_strands', 'kernel_complex'),
+    'structure':    ('structure_strands', 'kernel_complex'),
+    'kinetic':      ('reaction', 'kernel_complex'),
+    'reaction':     ('reaction', 'kernel_complex'),
+    'state':        ('kernel_complex', 'resting_macrostate'),
+    'macrostate':   ('kernel_complex', 'resting_macrostate')}
+
+def _statement(scanner):
+    """ Returns the next statement, dispatched on the leading keyword. """
+    scanner.skip()
+    start = scanner.pos
+    m = _IDENTIFIER.match(scanner.s, start)
+    if m is None:
+        raise _NoMatch
+    word = m.group()
+    if word in _KEYWORDS:
+        alternatives = _KEYWORDS[word]
+    elif any(word.startswith(k) for k in _KEYWORDS):
+        # pyparsing Literals match prefixes, e.g. "lengtha = 5"
+        raise PilScanError(f'ambiguous keyword: {word}')
+    else:
+        alternatives = ('kernel_complex',)
+
+    for alt in alternatives:
+        scanner.pos = start
+        if alt != 'kernel_complex':
+            scanner.pos += len(word)
+        try:
+            return getattr(scanner, alt)()
+        except _NoMatch:
+            pass
+    raise _NoMatch
+
+def scan_pil_string(data):
+    """ Parse a PIL document without pyparsing.
+
+    Returns:
+        list: The same nested lists as dsdparser.parse_pil_string().
+
+    Raises:
+        PilScanError: If the input must be handled by the pyparsing backend.
+    """
+    scanner = _Scanner(data)
+    try:
+        scanner.zero_or_more(scanner.line_end)
+        out = [_statement(scanner)]
+        while scanner.pos <= scanner.n:
+            out.append(_statement(scanner))
+    except _NoMatch:
+        raise PilScanError(f'cannot scan input at position {scanner.pos}.')
+    except RecursionError:
+        raise PilScanError('input is nested too deeply.')
+    return out
+
@@ -9,11 +9,20 @@ from pyparsing import (Word, Literal, Group, Suppress, Optional, ZeroOrMore, Com
     OneOrMore, alphas, alphanums, nums, delimitedList, StringStart, StringEnd, 
     LineEnd, pythonStyleComment, ParseElementEnhance)
 
+from .grammar_cache import default_whitespace, detached, GrammarCache
+
 def ssw_document_setup():
+  """ Returns a new pyparsing document for the seesaw file format.
+
+  Building the grammar is expensive, use ssw_document() to get the cached
+  instance instead.
+  """
   crn_DWC = "".join(
       [x for x in ParseElementEnhance.DEFAULT_WHITE_CHARS if x != "\n"])
-  ParseElementEnhance.setDefaultWhitespaceChars(crn_DWC)
- 
+  with default_whitespace(crn_DWC):
+    return _ssw_document_setup()
+
+def _ssw_document_setup():
   def T(x, tag):
     def TPA(tag):
       return lambda s, l, t: [tag] + t.asList()
@@ -69,10 +78,12 @@ def ssw_document_setup():
 
   return document
 
+ssw_document = GrammarCache(ssw_document_setup)
+
 def parse_seesaw_file(data):
-  document = ssw_document_setup()
-  return document.parseFile(data).asList()
+  document = ssw_document()
+  return detached(document.parseFile, data).asList()
 
 def parse_seesaw_string(data):
-  document = ssw_document_setup()
-  return document.parseString(data).asList()
+  document = ssw_document()
+  return detached(document.parseString, data).asList()
@@ -6,12 +6,15 @@ import logging
 log = logging.getLogger(__name__)
 
 import gc
-from .singleton import SingletonError
+from io import StringIO
+from itertools import chain
 from .iupac_utils import reverse_wc_complement
 from .complex_utils import strand_table_to_sequence
 from .dsdparser import (parse_seesaw_string, parse_seesaw_file,
-                        parse_pil_string, parse_pil_file)
-from .base_classes import DomainS, StrandS, ComplexS, MacrostateS, ReactionS
+                        parse_pil_string)
+from .base_classes import (DomainS, StrandS, ComplexS, MacrostateS, ReactionS,
+                           SlottedDomainS, SlottedStrandS, SlottedComplexS, 
+                           SlottedMacrostateS, SlottedReactionS)
 
 Domain = None
 Strand = None
@@ -72,35 +75,170 @@ def read_reaction(line):
 
 def resolve_kernel_loops(loop):
     """ Return a sequence, structure pair from kernel format.
+
+    Nested loops are resolved with an explicit stack, i.e. there is no limit
+    on the nesting depth.
     """
     sequen = []
     struct = []
-    for dom in loop :
-        if isinstance(dom, str):
-            sequen.append(dom)
-            if dom == '+' :
-                struct.append('+')
-            else :
-                struct.append('.')
-        elif isinstance(dom, list):
-            struct[-1] = '('
-            old = sequen[-1]
-            se, ss = resolve_kernel_loops(dom)
-            sequen.extend(se)
-            struct.extend(ss)
+    stack = [] # The enclosing loops: (remaining elements, opening domain)
+    doms = iter(loop)
+    while True:
+        for dom in doms:
+            if isinstance(dom, str):
+                sequen.append(dom)
+                if dom == '+' :
+                    struct.append('+')
+                else :
+                    struct.append('.')
+            elif isinstance(dom, list):
+                struct[-1] = '('
+                stack.append((doms, sequen[-1]))
+                doms = iter(dom)
+                break
+        else:
+            if not stack:
+                return sequen, struct
+            doms, old = stack.pop()
             sequen.append(old + '*' if old[-1] != '*' else old[:-1])
             struct.append(')')
-    return sequen, struct
 
-def read_pil(data, is_file = False, ignore = None):
+def resolve_domain_names(names):
+    """ Returns an index from the names in a kernel sequence to domain lists.
+
+    The PIL language allows shortcuts to specify composite domains and then a
+    kernel string using those composite domains. A name refers to (in this
+    order): a domain, the complement of a domain (names ending with '*'), the
+    domains of a strand, or the complements of the domains of a strand in
+    reverse order. Every name is looked up only once in the registries.
+
+    Raises:
+        PilFormatError: Cannot find domain.
+    """
+    def comp(name):
+        return name[:-1] if name[-1] == '*' else name + '*'
+
+    dnames = Domain._instanceNames
+    snames = Strand._instanceNames if Strand is not None else {}
+    index = {}
+    for name in names:
+        if name == '+' or name in index:
+            continue
+        dom = dnames.get(name)
+        if dom is None and name[-1] == '*':
+            dom = dnames.get(comp(name))
+            dom = None if dom is None else ~dom
+        if dom is not None:
+            index[name] = [dom]
+            continue
+        # The name refers to a composite domain or its complement.
+        strand = snames.get(name)
+        if strand is not None:
+            index[name] = list(strand.sequence)
+            continue
+        strand = snames.get(comp(name))
+        if strand is None:
+            raise PilFormatError(f"Cannot find domain: {name}.")
+        index[name] = [~d for d in reversed(list(strand.sequence))]
+    return index
+
+def resolve_kernel_complex(loop):
+    """ Return a sequence (of domain objects), structure pair from kernel format.
+
+    Composite domains are expanded, see resolve_domain_names().
+    """
+    names, struct = resolve_kernel_loops(loop)
+    index = resolve_domain_names(names)
+    sequence, structure = [], []
+    for x, s in zip(names, struct):
+        if x == '+':
+            sequence.append(x)
+            structure.append(s)
+        else:
+            doms = index[x]
+            sequence.extend(doms)
+            structure.extend(s for _ in doms)
+    return sequence, structure
+
+def _pil_statements(fileobj, chunksize = 1 << 16):
+    """ Yields the text of every PIL statement, reading the input in chunks.
+
+    Statements end with a newline, except for two multi-line forms of the
+    grammar: "complex" statements with sequence and structure on separate
+    lines, and empty kernel loops that are closed on the next line.
+    Comment-only and empty lines are skipped.
+    """
+    def incomplete(stmt, code):
+        if code.rstrip().endswith('('):
+            return True
+        return code.split(maxsplit = 1)[0] == 'complex' and len(stmt) < 3 and \
+                not any(c in code for c in '(.)')
+
+    stmt, pending = [], ''
+    for chunk in iter(lambda: fileobj.read(chunksize), ''):
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            code = line.split('#', 1)[0]
+            if not stmt and not code.strip():
+                continue
+            stmt.append(line)
+            if incomplete(stmt, '\n'.join(l.split('#', 1)[0] for l in stmt)):
+                continue
+            yield '\n'.join(stmt)
+            stmt = []
+    if pending.split('#', 1)[0].strip():
+        stmt.append(pending)
+    if stmt:
+        yield '\n'.join(stmt)
+
+def iter_pil(path_or_fileobj, ignore = None, backend = 'pyparsing', chunksize = 1 << 16):
+    """ Yields objects from PIL file format as soon as they are resolved.
+
+    The input is read in chunks and parsed statement by statement, so neither
+    the whole document nor its parse tree is held in memory. Domains,
+    strands, complexes and macrostates stay referenced by the generator,
+    because later statements may refer to them by name. Reactions are
+    yielded and forgotten. Lines that cannot be interpreted are yielded as
+    they come from the parser.
+
+    Args:
+        path_or_fileobj (str or file): The path to a PIL file or a file object.
+        ignore (list, optional): A list of identifiers that should be ignored.
+        backend (str, optional): The parser backend, see parse_pil_string().
+        chunksize (int, optional): Number of characters read at once.
+    """
+    if not hasattr(path_or_fileobj, 'read'):
+        with open(path_or_fileobj, 'r') as fileobj:
+            yield from iter_pil(fileobj, ignore, backend, chunksize)
+        return
+
+    names = {}
+    for stmt in _pil_statements(path_or_fileobj, chunksize):
+        for line in parse_pil_string(stmt, backend = backend):
+            if ignore and line[0] in ignore:
+                continue
+            obj = read_pil_line(line)
+            if isinstance(obj, Domain):
+                comp = ~obj
+                if obj.sequence is not None and comp.sequence is None:
+                    comp.sequence = reverse_wc_complement(obj.sequence, material = 'DNA')
+                names[(Domain, comp.name)] = comp
+                names[(Domain, obj.name)] = obj
+                del comp # so important
+            elif not isinstance(obj, (Reaction, list)):
+                names[(type(obj), obj.name)] = obj
+            yield obj
+            del obj # so important
+
+def read_pil(data, is_file = False, ignore = None, backend = 'pyparsing'):
     """ Read PIL file format.
     Args:
         data (str): Is either the PIL file in string format or the path to a file.
         is_file (bool, optional): True if data is a path to a file, False otherwise
         ignore (list, optional): A list of identifiers that should be ignored.
+        backend (str, optional): The parser backend, see parse_pil_string().
     """
-    parsed_file = parse_pil_file(data) if is_file else parse_pil_string(data)
-
     out = {'domains': dict(),
            'strands': dict(),
            'complexes': dict(),
@@ -109,15 +247,10 @@ def read_pil(data, is_file = False, ignore = None):
            'con_reactions': set(),
            'other': []}
 
-    for line in parsed_file :
-        if ignore and line[0] in ignore:
-            continue
-        obj = read_pil_line(line)
+    for obj in iter_pil(data if is_file else StringIO(data), ignore, backend):
         if isinstance(obj, Domain):
             out['domains'][obj.name] = obj
             comp = ~obj
-            if obj.sequence is not None and comp.sequence is None:
-                comp.sequence = reverse_wc_complement(obj.sequence, material = 'DNA')
             out['domains'][comp.name] = comp
             del comp # so important
         elif isinstance(obj, Strand):
@@ -171,42 +304,7 @@ def read_pil_line(raw):
         return anon
 
     elif line[0] == 'kernel-complex' and Complex is not None:
-        sequence, structure = resolve_kernel_loops(line[2])
-        try: # to replace names with domain objects.
-            sequence = [Domain(x) if x != '+' else '+' for x in sequence]
-        except SingletonError as err:
-            # The PIL language allows shortcuts to specify composite domains
-            # and then a kernel string using those composite domains. 
-            # The below code tries all sorts of possibilties on what the
-            # character in a sequence could actually refer to before it
-            # finally throws an exception.
-            def comp(name):
-                return name[:-1] if name[-1] == '*' else name + '*'
-            for e, d in enumerate(sequence):
-                if isinstance(d, Domain) or d == '+':
-                    # Happens with composite domains, see next statement e+1
-                    continue
-                try:
-                    sequence[e] = Domain(d) # The default case.
-                except SingletonError:
-                    try:
-                        # The character refers to a composite domain.
-                        subseq = list(Strand(None, name = d).sequence)
-                    except SingletonError:
-                        try:
-                            # The character refers to the complement of a composite domain.
-                            complement = list(Strand(None, name = comp(d)).sequence)
-                            subseq = [~d for d in reversed(complement)]
-                        except SingletonError:
-                            raise PilFormatError(f"Cannot find domain: {d}.")
-                    for i, sd in enumerate(subseq):
-                        assert isinstance(sd, Domain)
-                        if i == 0:
-                            sequence[e] = sd
-                        else:
-                            sequence.insert(e+i, sd)
-                            structure.insert(e+i, structure[e])
-
+        sequence, structure = resolve_kernel_complex(line[2])
         cplx = Complex(sequence, structure, name = name)
         if len(line) > 3 :
             assert len(line[3]) == 3
@@ -245,3 +343,131 @@ def read_pil_line(raw):
         log.warning(f'Cannot interpret line starting with {line[0]}')
         return line
 
+
+class PilWriter:
+    """ Writes objects in PIL file format through a single buffered writer.
+
+    Every object is written at most once. Objects that are needed to read an
+    object back in (the domains of a complex, the complexes of a macrostate,
+    the species of a reaction) are written before it, on first sight. Only
+    those declarations are remembered, reactions are streamed.
+
+    Args:
+        fileobj (file): A writable text file object.
+        buffersize (int, optional): Number of lines buffered before writing.
+    """
+    def __init__(self, fileobj, buffersize = 1 << 12):
+        self.fileobj = fileobj
+        self.buffersize = buffersize
+        self._buffer = []
+        self._written = set()
+
+    def flush(self):
+        if self._buffer:
+            self.fileobj.write(''.join(self._buffer))
+            self._buffer.clear()
+
+    def _line(self, line):
+        self._buffer.append(line + '\n')
+        if len(self._buffer) >= self.buffersize:
+            self.flush()
+
+    def write(self, obj):
+        """ Write a single object (and its dependencies). """
+        if isinstance(obj, SlottedDomainS):
+            self.write_domain(obj)
+        elif isinstance(obj, SlottedStrandS):
+            self.write_strand(obj)
+        elif isinstance(obj, SlottedComplexS):
+            self.write_complex(obj)
+        elif isinstance(obj, SlottedMacrostateS):
+            self.write_macrostate(obj)
+        elif isinstance(obj, SlottedReactionS):
+            self.write_reaction(obj)
+        else:
+            raise PilFormatError(f'Cannot write object of type {type(obj)}.')
+
+    def write_domain(self, dom):
+        if dom.is_complement:
+            dom = ~dom
+        if dom in self._written:
+            return
+        self._written.add(dom)
+        comp = ~dom
+        if dom.sequence is not None:
+            self._line(f'sequence {dom.name} = {dom.sequence}')
+        elif comp.sequence is not None:
+            self._line(f'sequence {comp.name} = {comp.sequence}')
+        else:
+            self._line(f'length {dom.name} = {dom.length}')
+
+    def write_strand(self, strand):
+        if strand in self._written:
+            return
+        self._written.add(strand)
+        for dom in strand.sequence:
+            self.write_domain(dom)
+        self._line(f'strand {strand.name} = {" ".join(str(d) for d in strand.sequence)}')
+
+    def write_complex(self, cplx):
+        if cplx in self._written:
+            return
+        self._written.add(cplx)
+        for dom in cplx.sequence:
+            if isinstance(dom, SlottedDomainS):
+                self.write_domain(dom)
+        if cplx.concentration is None:
+            self._line(f'{cplx.name} = {cplx.kernel_string}')
+        else:
+            (mode, value, unit) = cplx.concentration
+            self._line(f'{cplx.name} = {cplx.kernel_string} @{mode} {value!r} {unit}')
+
+    def write_macrostate(self, mstate):
+        if mstate in self._written:
+            return
+        self._written.add(mstate)
+        for cplx in mstate.complexes:
+            self.write_complex(cplx)
+        names = ', '.join(c.name for c in mstate.complexes)
+        self._line(f'macrostate {mstate.name} = [{names}]')
+
+    def write_reaction(self, rxn):
+        rate, units = rxn.rate_constant
+        if rate is None or units is None:
+            log.warning(f'Cannot write reaction without rate constant and units: {rxn}')
+            return
+        species = list(rxn.reactants) + list(rxn.products)
+        for sp in species:
+            self.write(sp)
+        self._line('reaction [{} = {!r} {}] {} -> {}'.format(rxn.rtype, rate, units,
+            ' + '.join(r.name for r in rxn.reactants),
+            ' + '.join(p.name for p in rxn.products)))
+
+def write_pil(objects, fileobj):
+    """ Write objects in PIL file format.
+
+    Objects can be provided as the dictionary returned by read_pil(), or as
+    any iterable of DomainS, StrandS, ComplexS, MacrostateS and ReactionS
+    objects (e.g. iter_pil()). The output can be read with read_pil().
+
+    Args:
+        objects (dict or iterable): The objects to write.
+        fileobj (str or file): A path or a writable text file object.
+    """
+    if not hasattr(fileobj, 'write'):
+        with open(fileobj, 'w') as f:
+            return write_pil(objects, f)
+
+    if isinstance(objects, dict):
+        objects = chain(objects.get('domains', {}).values(),
+                        objects.get('strands', {}).values(),
+                        objects.get('complexes', {}).values(),
+                        objects.get('macrostates', {}).values(),
+                        # reactions are stored in sets, sort them by name.
+                        sorted(objects.get('det_reactions', ()), key = lambda r: r.name),
+                        sorted(objects.get('con_reactions', ()), key = lambda r: r.name))
+    writer = PilWriter(fileobj)
+    for obj in objects:
+        writer.write(obj)
+    writer.flush()
+    return
@@ -0,0 +1,313 @@
+#
+# dsdobjects/reaction_network.py
+#   - copy and/or modify together with tests/test_reaction_network.py
+#
+import sys
+from array import array
+from itertools import chain
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, see ReactionNetwork.to_arrays().
+    np = None
+
+from .utils import convert_units
+from .base_classes import SlottedMacrostateS, SlottedReactionS, ObjectInitError
+
+def _dict_sizeof(index):
+    """ Returns the memory (in bytes) of a dict of dicts, keys and values excluded. """
+    return sys.getsizeof(index) + sum(sys.getsizeof(v) for v in index.values())
+
+class ReactionNetwork:
+    """ A set of reactions with indices from species to reactions.
+
+    Species are the reactants and products of reactions, i.e. complexes
+    (detailed reactions) or macrostates (condensed reactions). The indices are
+    updated with every added or removed reaction, all queries are lookups.
+    Reactions and species are reported in the order they were added. A species
+    is dropped with the last reaction that uses it, and added again at the end.
+
+    Args:
+        reactions (iterable, optional): ReactionS objects.
+        macrostates (iterable, optional): MacrostateS objects.
+
+    Example:
+        net = ReactionNetwork.from_pil(read_pil(data))
+        for rxn in net.consumers(cplx):
+            ...
+    """
+    def __init__(self, reactions = None, macrostates = None):
+        # All indices use dicts as insertion-ordered sets.
+        self._reactions = dict() # [reaction] = None
+        self._species = dict() # [species] = number of reactions
+        self._consumers = dict() # [species] = {reaction: None}
+        self._producers = dict() # [species] = {reaction: None}
+        self._rtypes = dict() # [rtype] = {reaction: None}
+        self._macrostates = dict() # [macrostate] = {complex: None}
+        self._cplx_macrostates = dict() # [complex] = {macrostate: None}
+        for mstate in (macrostates or ()):
+            self.add_macrostate(mstate)
+        for rxn in (reactions or ()):
+            self.add_reaction(rxn)
+
+    @classmethod
+    def from_pil(cls, pil):
+        """ Returns the network of a read_pil() output dictionary.
+
+        Includes detailed and condensed reactions as well as all macrostates.
+        """
+        return cls(reactions = list(pil['det_reactions']) + list(pil['con_reactions']),
+                   macrostates = pil['macrostates'].values())
+
+    # ------ Add/remove
+    def add_reaction(self, rxn):
+        """ Adds a reaction (nothing happens if it is part of the network).
+
+        Macrostates among the species are added to the macrostate index.
+
+        Returns:
+            bool: True if the reaction was added.
+        """
+        if not isinstance(rxn, SlottedReactionS):
+            raise TypeError(f'Cannot add object of type {type(rxn)} to {self.__class__.__name__}.')
+        if rxn in self._reactions:
+            return False
+        self._reactions[rxn] = None
+        for sp in dict.fromkeys(chain(rxn.reactants, rxn.products)):
+            self._species[sp] = self._species.get(sp, 0) + 1
+        for sp in rxn.reactants:
+            self._consumers.setdefault(sp, dict())[rxn] = None
+            if isinstance(sp, SlottedMacrostateS):
+                self.add_macrostate(sp)
+        for sp in rxn.products:
+            self._producers.setdefault(sp, dict())[rxn] = None
+            if isinstance(sp, SlottedMacrostateS):
+                self.add_macrostate(sp)
+        self._rtypes.setdefault(rxn.rtype, dict())[rxn] = None
+        return True
+
+    def remove_reaction(self, rxn):
+        """ Removes a reaction.
+
+        Species without reactions are dropped from the species indices,
+        macrostates remain in the network (see remove_macrostate()).
+
+        Raises:
+            KeyError: The reaction is not part of the network.
+        """
+        del self._reactions[rxn]
+        for sp in dict.fromkeys(chain(rxn.reactants, rxn.products)):
+            if self._species[sp] > 1:
+                self._species[sp] -= 1
+            else:
+                del self._species[sp]
+        for index, keys in ((self._consumers, rxn.reactants),
+                            (self._producers, rxn.products),
+                            (self._rtypes, [rxn.rtype])):
+            for key in keys:
+                rxns = index.get(key)
+                if rxns is None: # Species listed twice, e.g. A + A -> B.
+                    continue
+                rxns.pop(rxn, None)
+                if not rxns:
+                    del index[key]
+
+    def add_macrostate(self, mstate):
+        """ Adds a macrostate and indexes its complexes.
+
+        Returns:
+            bool: True if the macrostate was added.
+        """
+        if mstate in self._macrostates:
+            return False
+        self._macrostates[mstate] = dict.fromkeys(mstate.complexes)
+        for cplx in mstate.complexes:
+            self._cplx_macrostates.setdefault(cplx, dict())[mstate] = None
+        return True
+
+    def remove_macrostate(self, mstate):
+        """ Removes a macrostate (but not the reactions that use it).
+
+        Raises:
+            KeyError: The macrostate is not part of the network.
+        """
+        for cplx in self._macrostates.pop(mstate):
+            mstates = self._cplx_macrostates[cplx]
+            del mstates[mstate]
+            if not mstates:
+                del self._cplx_macrostates[cplx]
+
+    # ------ Queries
+    @property
+    def reactions(self):
+        """ Yields all reactions. """
+        return iter(self._reactions)
+
+    @property
+    def species(self):
+        """ Yields all reactants and products. """
+        return iter(self._species)
+
+    @property
+    def rtypes(self):
+        """ Yields all reaction types. """
+        return iter(self._rtypes)
+
+    @property
+    def macrostates(self):
+        """ Yields all macrostates. """
+        return iter(self._macrostates)
+
+    def consumers(self, species):
+        """ Yields the reactions with species as reactant. """
+        return iter(self._consumers.get(species, ()))
+
+    def producers(self, species):
+        """ Yields the reactions with species as product. """
+        return iter(self._producers.get(species, ()))
+
+    def degree(self, species):
+        """ (int, int): The number of consuming and producing reactions. """
+        return (len(self._consumers.get(species, ())),
+                len(self._producers.get(species, ())))
+
+    def reactions_of_type(self, rtype):
+        """ Yields the reactions of a reaction type, e.g. 'bind21'. """
+        return iter(self._rtypes.get(rtype, ()))
+
+    def complexes(self, mstate):
+        """ Yields the complexes of a macrostate in the network.
+
+        Raises:
+            KeyError: The macrostate is not part of the network.
+        """
+        return iter(self._macrostates[mstate])
+
+    def macrostates_of(self, cplx):
+        """ Yields the macrostates containing a complex. """
+        return iter(self._cplx_macrostates.get(cplx, ()))
+
+    def species_index(self):
+        """ dict: The index of every species, in the order they were added.
+
+        Removing the last reaction of a species shifts all later indices.
+        """
+        return {sp: i for i, sp in enumerate(self.species)}
+
+    # ------ Export
+    def to_arrays(self, fmt = 'csr', units = None, use_numpy = None):
+        """ Returns the network as sparse matrices and a rate constant vector.
+
+        Rows are reactions, columns are species, both in the order they were
+        added to the network (see species_index()). The stoichiometry matrix
+        contains the net change of every species, the orders matrix the
+        reactant-order exponents (e.g. 2 for A + A -> B). Matrices are
+        (data, indices, indptr) for fmt = 'csr' and (data, (row, col)) for
+        fmt = 'coo', as in the scipy.sparse constructors. Missing rate
+        constants are NaN.
+
+        Args:
+            fmt (str, optional): 'csr' or 'coo'. Defaults to 'csr'.
+            units (tuple, optional): Concentration and time units for the rate
+                constants, e.g. ('nM', 's'). Defaults to None: no conversion.
+            use_numpy (bool, optional): Return NumPy arrays instead of arrays
+                from the array module. Defaults to None: if NumPy is installed.
+
+        Returns:
+            dict: 'species', 'reactions', 'shape', 'stoichiometry', 'orders', 'rates'.
+        """
+        if fmt not in ('csr', 'coo'):
+            raise ValueError(f'Unknown sparse matrix format: {fmt}.')
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError('NumPy is not installed.')
+        sindex = self.species_index()
+        reactions = list(self._reactions)
+
+        sdata, sidx, sptr = array('q'), array('q'), array('q', [0])
+        odata, oidx, optr = array('q'), array('q'), array('q', [0])
+        consts, rkeys = array('d'), []
+        for rxn in reactions:
+            orders, change = dict(), dict()
+            for sp in rxn.reactants:
+                i = sindex[sp]
+                orders[i] = orders.get(i, 0) + 1
+                change[i] = change.get(i, 0) - 1
+            for sp in rxn.products:
+                i = sindex[sp]
+                change[i] = change.get(i, 0) + 1
+            for i in sorted(orders):
+                oidx.append(i)
+                odata.append(orders[i])
+            for i in sorted(change):
+                if change[i]: # Catalysts have no net change.
+                    sidx.append(i)
+                    sdata.append(change[i])
+            optr.append(len(oidx))
+            sptr.append(len(sidx))
+            const, unit = rxn.rate_constant
+            consts.append(float('nan') if const is None else const)
+            rkeys.append(None if const is None else (unit, sum(orders.values())))
+
+        # One conversion factor per distinct unit and reaction order.
+        factors = dict.fromkeys(rkeys, 1)
+        if units is not None:
+            conc, time = units
+            for key in factors:
+                if key is None:
+                    continue
+                (unit, order) = key
+                if unit is None:
+                    raise ObjectInitError(f'Cannot change the units of the rate constant: {unit}.')
+                old = unit.split('/')[1:]
+                if len(old) != order:
+                    raise NotImplementedError(f'Cannot interpret the format of units: {unit}')
+                for i, o in zip(old, [conc] * (order - 1) + [time]):
+                    factors[key] *= convert_units(1, o, i)
+        factors = array('d', (factors[key] for key in rkeys))
+
+        if use_numpy:
+            sdata, sidx, sptr, odata, oidx, optr = (np.frombuffer(a, dtype = np.int64)
+                    for a in (sdata, sidx, sptr, odata, oidx, optr))
+            rates = np.frombuffer(consts) * np.frombuffer(factors)
+        else:
+            rates = array('d', map(float.__mul__, consts, factors))
+
+        def sparse(data, idx, ptr):
+            if fmt == 'csr':
+                return (data, idx, ptr)
+            if use_numpy:
+                rows = np.repeat(np.arange(len(ptr) - 1, dtype = np.int64), np.diff(ptr))
+            else:
+                rows = array('q', (r for r in range(len(ptr) - 1) 
+                                     for _ in range(ptr[r], ptr[r+1])))
+            return (data, (rows, idx))
+
+        return {'species': list(sindex),
+                'reactions': reactions,
+                'shape': (len(reactions), len(sindex)),
+                'stoichiometry': sparse(sdata, sidx, sptr),
+                'orders': sparse(odata, oidx, optr),
+                'rates': rates}
+
+    def index_memory(self):
+        """ dict: The memory (in bytes) of every index, without the indexed objects. """
+        return {'reactions': sys.getsizeof(self._reactions),
+                'species': sys.getsizeof(self._species),
+                'consumers': _dict_sizeof(self._consumers),
+                'producers': _dict_sizeof(self._producers),
+                'rtypes': _dict_sizeof(self._rtypes),
+                'macrostates': _dict_sizeof(self._macrostates) + \
+                               _dict_sizeof(self._cplx_macrostates)}
+
+    def __len__(self):
+        return len(self._reactions)
+
+    def __iter__(self):
+        return iter(self._reactions)
+
+    def __contains__(self, rxn):
+        return rxn in self._reactions
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({len(self._reactions)} reactions)'
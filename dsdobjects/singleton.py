@@ -2,7 +2,11 @@ import logging
 log = logging.getLogger(__name__)
 
 import sys
+from time import perf_counter
+from threading import Lock, RLock
 from weakref import WeakValueDictionary
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 class SingletonError(Exception):
     def __init__(self, message, existing = None):
@@ -15,10 +19,106 @@ def clear_singletons(cls):
     This metod is for debugging only, using this in production 
     might cause unexpected behavior or segfaults... well, well.
     """
-    cls._instanceNames.clear()
-    cls._instanceCanon.clear()
-    cls._instanceNames = WeakValueDictionary() # [name] = canon
-    cls._instanceCanon = WeakValueDictionary() # [canon] = obj
+    with cls._instanceLock:
+        cls._instanceNames.clear()
+        cls._instanceCanon.clear()
+        cls._instanceNames = WeakValueDictionary() # [name] = canon
+        cls._instanceCanon = WeakValueDictionary() # [canon] = obj
+
+class Registry:
+    """ The name/canon/ID registry of one Singleton class. """
+    __slots__ = ('names', 'canon', 'ID', 'lock', 'data')
+
+    def __init__(self, ID = None):
+        self.names = WeakValueDictionary() # [name] = canon
+        self.canon = WeakValueDictionary() # [canon] = obj
+        self.ID = ID # The next automatically assigned name.
+        self.lock = RLock() # Reentrant: identifiers() may call cls().
+        self.data = dict() # Class-specific caches, e.g. ComplexS rotations.
+
+_scope = ContextVar('dsdobjects_registry_scope', default = None)
+
+@contextmanager
+def registry_scope():
+    """ A context in which all Singleton classes use fresh registries.
+
+    Objects created within the scope are invisible outside of it, and vice
+    versa. When the scope is left, the registries are dropped (no need to call
+    clear_singletons or gc.collect), objects are freed as soon as there are
+    no more references. The scope is stored in a contextvars.ContextVar, so
+    concurrent asyncio tasks may use their own scopes. Note that new threads
+    do not inherit the context of the thread that started them.
+
+    Example:
+        with registry_scope():
+            a = DomainS('a', 10)
+        with registry_scope():
+            a = DomainS('a', 15)
+    """
+    token = _scope.set(dict()) # [cls] = Registry
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+class RegistryStats:
+    """ Counters and timings of Singleton construction for one class. """
+    __slots__ = ('calls', 'name_hits', 'canon_hits', 'constructed', 'errors',
+                 'failures', 'identifiers_time', 'init_time', 'lock')
+
+    def __init__(self):
+        self.calls = 0
+        self.name_hits = 0 # Existing object found by name only.
+        self.canon_hits = 0 # Existing object found by canonical form.
+        self.constructed = 0
+        self.errors = 0 # SingletonErrors raised.
+        self.failures = 0 # Other exceptions, e.g. from argument validation.
+        self.identifiers_time = 0. # Including nested Singleton calls.
+        self.init_time = 0.
+        self.lock = Lock() # Registries of different scopes share the stats.
+
+    def record(self, hit, tid, tin):
+        with self.lock:
+            self.calls += 1
+            if hit == 'name':
+                self.name_hits += 1
+            elif hit == 'canon':
+                self.canon_hits += 1
+            elif hit == 'new':
+                self.constructed += 1
+            elif hit == 'error':
+                self.errors += 1
+            else:
+                self.failures += 1
+            self.identifiers_time += tid
+            self.init_time += tin
+
+    def asdict(self):
+        with self.lock:
+            return {s: getattr(self, s) for s in self.__slots__ if s != 'lock'}
+
+def enable_registry_stats(cls, enable = True):
+    """ Turns the instrumentation of Singleton construction on or off.
+
+    Enabling resets all counters. The stats are collected for the given class
+    only (not for subclasses), and across all registry scopes. Disabled
+    instrumentation has no runtime cost.
+    """
+    cls._registryStats = RegistryStats() if enable else None
+
+def registry_stats(cls):
+    """ Returns the instrumentation data of a Singleton class.
+
+    Returns:
+        dict: The class name, the number of calls, name_hits, canon_hits,
+            constructed objects, SingletonErrors and other exceptions, as well
+            as the time (in seconds) spent in identifiers() and __init__().
+            None if the instrumentation is disabled.
+    """
+    stats = cls._registryStats
+    if stats is None:
+        return None
+    return dict({'class': cls.__name__}, **stats.asdict())
 
 def show_singletons(cls):
     """ Yields data of all registered singleton objects of the given class.
@@ -40,6 +140,14 @@ class Singleton(type):
     unique for each canonical form. The objects using the singleton type 
     should ensure that both name and canonical form are IMMUTABLE. 
 
+    The registry of names, canonical forms and the ID counter (cls.ID) depends
+    on the current registry_scope(), by default a global registry is used.
+    Object construction is thread-safe: every registry has its own reentrant
+    lock, which is held while the identifiers are derived, the registry is
+    searched and a new object is initialized and registered. Hence, the same
+    canonical form always results in the same object, and automatically
+    assigned names (class-level ID counters) are unique.
+
     Examples for Domains:
         a = Domain('a', 10)
         assert a is Domain('a')
@@ -51,8 +159,58 @@ class Singleton(type):
     """
     def __init__(cls, name, bases, dict):
         super(Singleton, cls).__init__(cls, bases, dict)
-        cls._instanceNames = WeakValueDictionary() # [name] = canon
-        cls._instanceCanon = WeakValueDictionary() # [canon] = obj
+        # The class-level ID is only the initial value for every registry.
+        ID = next((c.__dict__['ID'] for c in cls.__mro__ if 'ID' in c.__dict__), None)
+        cls._globalRegistry = Registry(ID)
+        cls._initialID = ID
+        cls._registryStats = None # See enable_registry_stats()
+
+    @property
+    def _registry(cls):
+        """ Registry: The registry of the current registry_scope. """
+        scope = _scope.get()
+        if scope is None:
+            return cls.__dict__['_globalRegistry']
+        reg = scope.get(cls)
+        if reg is None:
+            reg = scope.setdefault(cls, Registry(cls._initialID))
+        return reg
+
+    @property
+    def _instanceNames(cls):
+        return cls._registry.names
+
+    @_instanceNames.setter
+    def _instanceNames(cls, value):
+        cls._registry.names = value
+
+    @property
+    def _instanceCanon(cls):
+        return cls._registry.canon
+
+    @_instanceCanon.setter
+    def _instanceCanon(cls, value):
+        cls._registry.canon = value
+
+    @property
+    def _instanceLock(cls):
+        return cls._registry.lock
+
+    @property
+    def _instanceData(cls):
+        return cls._registry.data
+
+    @property
+    def ID(cls):
+        """ int: The ID counter for automatic names in the current scope. """
+        ID = cls._registry.ID
+        if ID is None:
+            raise AttributeError(f"type object '{cls.__name__}' has no attribute 'ID'")
+        return ID
+
+    @ID.setter
+    def ID(cls, value):
+        cls._registry.ID = value
 
     def __call__(cls, *args, **kwargs):
         """ Returns the object as defined by the agruments. 
@@ -66,19 +224,66 @@ class Singleton(type):
             SingletonError: If aruments are insufficient. 
             SingletonError: If name and canonical form point to different objects.
         """
-        # Note that cls.identifiers() may return extra arguments that should be
-        # passed on the object initialization. That may look odd, but sometimes
-        # finding the canonical form is expensive and one would like to provide
-        # a new object with the aquired data. 
-        canon, name, kwadd = cls.identifiers(*args, **kwargs)
-        assert not any((arg in kwargs and kwargs[arg] is not None) for arg in kwadd.keys())
-        kwargs.update(kwadd)
-
-        Sobj = None
+        if cls._registryStats is not None:
+            return cls._singleton_call_stats(args, kwargs)
+        reg = cls._registry
+        with reg.lock:
+            # Note that cls.identifiers() may return extra arguments that should be
+            # passed on the object initialization. That may look odd, but sometimes
+            # finding the canonical form is expensive and one would like to provide
+            # a new object with the aquired data. 
+            canon, name, kwadd = cls.identifiers(*args, **kwargs)
+            assert not any((arg in kwargs and kwargs[arg] is not None) for arg in kwadd.keys())
+            kwargs.update(kwadd)
+            Sobj, _ = cls._singleton_lookup(reg, canon, name)
+            if Sobj is None:
+                Sobj = super(Singleton, cls).__call__(*args, **kwargs)
+                reg.names[name] = Sobj
+                reg.canon[canon] = Sobj
+            return Sobj
+
+    def _singleton_call_stats(cls, args, kwargs):
+        """ The same as __call__, but records hits and timings. """
+        stats = cls._registryStats
+        reg = cls._registry
+        hit, tid, tin = 'failure', 0., 0.
+        with reg.lock:
+            try:
+                t0 = perf_counter()
+                try:
+                    canon, name, kwadd = cls.identifiers(*args, **kwargs)
+                finally:
+                    tid = perf_counter() - t0
+                assert not any((arg in kwargs and kwargs[arg] is not None) for arg in kwadd.keys())
+                kwargs.update(kwadd)
+                Sobj, hit = cls._singleton_lookup(reg, canon, name)
+                if Sobj is None:
+                    t0 = perf_counter()
+                    try:
+                        Sobj = super(Singleton, cls).__call__(*args, **kwargs)
+                    finally:
+                        tin = perf_counter() - t0
+                    reg.names[name] = Sobj
+                    reg.canon[canon] = Sobj
+                    hit = 'new'
+                return Sobj
+            except SingletonError:
+                hit = 'error'
+                raise
+            finally:
+                stats.record(hit, tid, tin)
+
+    def _singleton_lookup(cls, reg, canon, name):
+        """ Returns the existing object (or None) and how it was found.
+
+        Raises:
+            SingletonError: If aruments are insufficient. 
+            SingletonError: If name and canonical form point to different objects.
+        """
         if name and canon:
-            if name in cls._instanceNames or canon in cls._instanceCanon:
-                objN = cls._instanceNames.get(name, None)
-                objC = cls._instanceCanon.get(canon, None)
+            if name in reg.names or canon in reg.canon:
+                objN = reg.names.get(name, None)
+                objC = reg.canon.get(canon, None)
                 if objN is None:
                     raise SingletonError(f'Duplicate Singleton {cls.__name__}({name} vs. {objC.name}).', existing = objC)
                 elif objC is None:
@@ -90,21 +295,13 @@ class Singleton(type):
                     raise SingletonError(f'Duplicate Singleton {cls.__name__}({name}).')
                 if not (objN is objC):
                     raise SingletonError(f'Duplicate Singleton {cls.__name__}: name ({name}) and canonical form match different objects!')
-                Sobj = objN
+                return objN, 'canon'
+            return None, None
         elif name:
-            if name not in cls._instanceNames:
+            if name not in reg.names:
                 raise SingletonError(f'Cannot instantiate Singleton {cls.__name__} from: name {name} only.')
-            Sobj = cls._instanceNames[name]
+            return reg.names[name], 'name'
         else:
-            if canon not in cls._instanceCanon:
+            if canon not in reg.canon:
                 raise SingletonError(f'Cannot instantiate Singleton {cls.__name__} from: canonical form only.')
-            Sobj = cls._instanceCanon[canon]
-
-        if Sobj is None:
-            Sobj = super(Singleton, cls).__call__(*args, **kwargs)
-            cls._instanceNames[name] = Sobj
-            cls._instanceCanon[canon] = Sobj
-        else:
-            log.debug(f'Returning exisiting Singleton {cls.__name__} with name {name}: {canon}!')
-        return Sobj
-
+            return reg.canon[canon], 'canon'
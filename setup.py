@@ -25,6 +25,7 @@ setup(
         ],
     python_requires = '>=3.7',
     install_requires = ['pyparsing'],
+    extras_require = {'numpy': ['numpy']},
     packages = find_packages(),
     test_suite = 'tests',
 )
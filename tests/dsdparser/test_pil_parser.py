@@ -2,9 +2,11 @@
 # tests for dsdobjects.dsdparser.pil_parser.py
 #
 import unittest
-from pyparsing import ParseException
+from threading import Thread
+from pyparsing import ParseException, ParserElement
 
 from dsdobjects.dsdparser import parse_pil_file, parse_pil_string
+from dsdobjects.dsdparser.pil_parser import pil_document
 
 SKIP = False
 
@@ -146,5 +148,35 @@ class TestPILparser(unittest.TestCase):
         out = parse_pil_string("cplx = a( b( c( + ) ) d ) @ initial 1e5 pM")
         self.assertEqual(out, [['kernel-complex', 'cplx', ['a', ['b', ['c', ['+']], 'd']], ['initial', '1e5', 'pM']]])
 
+@unittest.skipIf(SKIP, "skipping tests")
+class TestPILgrammarCache(unittest.TestCase):
+    def test_grammar_is_cached(self):
+        assert pil_document() is pil_document()
+        parse_pil_string(" length a = 15 ")
+        assert pil_document() is pil_document()
+
+    def test_default_whitespace(self):
+        default = ParserElement.DEFAULT_WHITE_CHARS
+        pil_document.clear()
+        out = parse_pil_string("""
+            length a = 15
+            length b = 15""")
+        self.assertEqual(out, [['dl-domain', 'a', '15'], ['dl-domain', 'b', '15']])
+        assert ParserElement.DEFAULT_WHITE_CHARS == default
+
+    def test_threads(self):
+        pil_document.clear()
+        results = []
+        def parse():
+            results.append(parse_pil_string(" e4 = a( b + ) c @ initial 1 nM "))
+        threads = [Thread(target = parse) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 8
+        for out in results:
+            self.assertEqual(out, [['kernel-complex', 'e4', ['a', ['b', '+'], 'c'], ['initial', '1', 'nM']]])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,133 @@
+#
+# tests for dsdobjects.dsdparser.pil_scanner.py
+#
+import os
+import ast
+import unittest
+from pyparsing import ParseException
+
+from dsdobjects.dsdparser import parse_pil_string
+from dsdobjects.dsdparser.pil_scanner import PilScanError, scan_pil_string
+
+SKIP = False
+
+# Python 3.7 parses string literals as ast.Str, later versions as ast.Constant.
+STRING_NODES = tuple(getattr(ast, n) for n in ('Constant', 'Str') if hasattr(ast, n))
+
+def parser_corpus():
+    """ All string literals passed to parse_pil_string in the other tests. """
+    here = os.path.dirname(os.path.abspath(__file__))
+    corpus = []
+    for fname in sorted(os.listdir(here)):
+        if not fname.startswith('test_') or not fname.endswith('.py'):
+            continue
+        if fname == os.path.basename(__file__):
+            continue
+        with open(os.path.join(here, fname)) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and \
+                    getattr(node.func, 'id', None) == 'parse_pil_string' and \
+                    node.args and isinstance(node.args[0], STRING_NODES):
+                arg = node.args[0]
+                value = arg.s if type(arg).__name__ == 'Str' else arg.value
+                if isinstance(value, str):
+                    corpus.append(value)
+    return corpus
+
+EDGE_CASES = [
+    # documents
+    """
+    # Domains (12) 
+    sequence a = NNNNNN
+    sequence b = NNNNNN # comment
+
+    strand A = a x b y z* c* y* b* x*
+    sup-sequence xby = x b y
+
+    structure A = A : .(((..)))
+    B = a xby( + ) b
+    A = a x( b( y( z* c* ) ) ) @i 1e-08 M
+    macrostate A = [A]
+    reaction [condensed      =  1.66666e+06 /M/s ] A + I -> IA
+    reaction [condensed      =    0.0261637 /s   ] IABC -> ABC + I""",
+    "\n\n  # only a comment\n length a = 5 \n\n",
+    "length a = 5\r\nlength b = 6\r\n",
+    "length a = 5 length b = 6",
+    " complex I : I ....\t  .. ",
+    # prefix matches of pyparsing Literals
+    "lengtha = 15",
+    "strand1 = a b",
+    "length = a b",
+    "state = a b",
+    "state x = [a,b]",
+    "macrostate x = [a]",
+    "sequence a = short",
+    "sequence a = 15 : 6",
+    "sequence a* = ACGT : 4",
+    # kernel notation corner cases
+    "C = a(\n)",
+    "C = a( # comment\n)",
+    "C = a(b",
+    "C = a^* b*( + ) c",
+    "C = a( b( c( d( e( f( g( h( + ) ) ) ) ) ) ) )",
+    "cplx = a @ i 5 nM",
+    "cplx = a @ c 5.5e-3 M",
+    "cplx = a @ inf 5 nM",
+    "cplx = a @ initial 5 nMx",
+    # reaction units
+    "reaction [bind21 = 1 /mM/s] a + b -> c",
+    "reaction [bind21 = 1 /m/s] a + b -> c",
+    "reaction [bind21 = 1 /mM] a + b -> c",
+    "reaction [1.e5 /s] a -> c",
+    "reaction [ 5 /s] a->c",
+    "reaction [ 5 /s] a -> c + -> d",
+    "kinetic a -> b",
+    # broken inputs
+    "",
+    "   ",
+    "= a",
+    "complex AB : A + B ..(+)",
+]
+
+@unittest.skipIf(SKIP, "skipping tests")
+class TestPILscanner(unittest.TestCase):
+    def compare(self, data):
+        try:
+            exp = parse_pil_string(data)
+        except ParseException:
+            with self.assertRaises(ParseException):
+                parse_pil_string(data, backend = 'fast')
+            return
+        self.assertEqual(parse_pil_string(data, backend = 'fast'), exp, repr(data))
+
+    def test_differential_corpus(self):
+        corpus = parser_corpus()
+        assert len(corpus) > 30
+        for data in corpus:
+            self.compare(data)
+
+    def test_differential_edge_cases(self):
+        for data in EDGE_CASES:
+            self.compare(data)
+
+    def test_no_fallback(self):
+        # The common statements must not need pyparsing.
+        for data in parser_corpus():
+            try:
+                exp = parse_pil_string(data)
+            except ParseException:
+                continue
+            self.assertEqual(scan_pil_string(data), exp)
+
+    def test_fallback(self):
+        with self.assertRaises(PilScanError):
+            scan_pil_string("lengtha = 15")
+        assert parse_pil_string("lengtha = 15", backend = 'fast') == [['dl-domain', 'a', '15']]
+        with self.assertRaises(PilScanError):
+            scan_pil_string("C = a(\n)")
+        with self.assertRaises(ValueError):
+            parse_pil_string("length a = 5", backend = 'foo')
+
+if __name__ == '__main__':
+    unittest.main()
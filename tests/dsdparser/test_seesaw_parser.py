@@ -4,6 +4,7 @@
 import unittest
 from pyparsing import ParseException
 from dsdobjects.dsdparser import parse_seesaw_string, parse_seesaw_file
+from dsdobjects.dsdparser.seesaw_parser import ssw_document
 
 class TestSeeSawParser(unittest.TestCase):
     def setUp(self):
@@ -12,6 +13,9 @@ class TestSeeSawParser(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def test_grammar_is_cached(self):
+        assert ssw_document() is ssw_document()
+
     def test_io(self):
         out = parse_seesaw_string("INPUT(1) = w[44, 31]")
         self.assertEqual(out, [['INPUT', ['1'], ['w', ['44', '31']]]])
@@ -7,11 +7,28 @@ logger = logging.getLogger('dsdobjects')
 logger.setLevel(logging.INFO)
 import unittest
 
+import gc
+import sys
+import asyncio
+from weakref import ref
+from threading import Barrier
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
 from dsdobjects import (SecondaryStructureError,
+                        ObjectInitError,
                         SingletonError,
                         show_singletons,
-                        clear_singletons)
-from dsdobjects.base_classes import DomainS, StrandS, ComplexS
+                        clear_singletons,
+                        registry_scope,
+                        enable_registry_stats,
+                        registry_stats)
+from dsdobjects.singleton import Singleton
+from dsdobjects.base_classes import (DomainS, StrandS, ComplexS, MacrostateS, ReactionS,
+                                     SlottedDomainS, SlottedStrandS, SlottedComplexS, 
+                                     SlottedMacrostateS, SlottedReactionS)
+from dsdobjects.complex_utils import (rotate_complex_once, rotate_complex, make_pair_table, 
+                                      make_flat_structure, complex_fingerprint)
 
 SKIP = False
 SKIP_TOXIC = True
@@ -97,6 +114,36 @@ class TestSingletonDomain(unittest.TestCase):
         with self.assertRaises(SingletonError):
             a = DomainS('b', 10)
 
+    def test_complement_pointers(self):
+        a = DomainS('a', 10)
+        enable_registry_stats(DomainS)
+        ac = ~a
+        assert registry_stats(DomainS)['calls'] > 0
+        enable_registry_stats(DomainS)
+        for _ in range(10):
+            assert ~a is ac
+            assert ~ac is a
+            assert ~~a is a
+        assert registry_stats(DomainS)['calls'] == 0
+        enable_registry_stats(DomainS, False)
+
+        # Paired on initialization of either domain.
+        b = DomainS('b*', 5)
+        bc = DomainS('b', 5)
+        assert b._complement() is bc
+        assert bc._complement() is b
+
+        # Complements are weak references.
+        del ac
+        assert len(DomainS._instanceNames) == 3
+        assert (~a).name == 'a*'
+        del a
+        ac = DomainS('a*', 12)
+        with self.assertRaises(SingletonError):
+            DomainS('a', 10)
+        assert len(~ac) == 12
+        assert ~DomainS('a', 12) is ac
+
 @unittest.skipIf(SKIP, "skipping tests.")
 class TestAutomaticDomain(unittest.TestCase):
     def tearDown(self):
@@ -298,6 +345,197 @@ class TestSingletonComplex(unittest.TestCase):
         pt[1][0] = None
         self.assertFalse(list(foo.pair_table) == pt)
 
+    def test_table_views(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        foo = ComplexS(sequence = [d1, d2, d3, '+', d1, '+', d1c, d3c, d1c, d2], 
+                       structure = list('..(+(+))..'), name = 'foo')
+        ptv = foo.pair_table_view
+        assert ptv is foo.pair_table_view
+        assert ptv == ((None, None, (2, 1)), ((2, 0),), ((1, 0), (0, 2), None, None))
+        assert list(map(list, ptv)) == list(foo.pair_table)
+        stv = foo.strand_table_view
+        assert stv is foo.strand_table_view
+        assert stv == ((d1, d2, d3), (d1,), (d1c, d3c, d1c, d2))
+        with self.assertRaises(TypeError):
+            ptv[1][0] = None
+        assert foo.is_domainlevel_complement
+        # A new representation has new tables.
+        foo.turns = foo.turns + 1
+        assert foo.strand_table_view == ((d1,), (d1c, d3c, d1c, d2), (d1, d2, d3))
+        assert foo.pair_table_view == (((1, 0),), ((0, 0), (2, 2), None, None), (None, None, (1, 1)))
+
+    def test_rotations(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        foo = ComplexS(sequence = [d1, d2, d3, '+', d1, '+', d1c, d3c, d1c, d2], 
+                       structure = list('..(+(+))..'), name = 'foo')
+        rots = list(foo.rotations())
+        assert len(rots) == 3
+        assert all(r.stab is foo.strand_table_view for r in rots)
+        assert [(r.sequence(), r.structure()) for r in rots] == list(foo.rotate())
+        assert [(r.strand_table(), r.pair_table()) for r in rots] == list(foo.rotate_pt())
+        assert len(list(foo.rotate(turns = 5))) == 5
+        seq, sst = rots[2].sequence(), rots[2].structure()
+        foo.turns = foo.turns + 2
+        assert (list(foo.sequence), list(foo.structure)) == (seq, sst)
+
+    def test_set_turns(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        seq = [d1, d2, d3, '+', d1, '+', d1c, d3c, d1c, d2, '+', d2c]
+        sst = list('..(+(+)).(+)')
+        foo = ComplexS(seq, sst, name = 'foo')
+        cseq, csst = map(list, foo.canonical_form)
+        reps = {t: rotate_complex(cseq, csst, t) for t in range(4)}
+        for value in [3, 1, 2, 2, 0, 7, 1, -1, 0, 5, 2]:
+            foo.turns = value
+            assert foo.turns == value % 4
+            # Every accessor sees the new representation.
+            rseq, rsst = reps[value % 4]
+            assert foo.size == 4
+            assert [str(x) for x in foo.sequence] == rseq
+            assert list(foo.structure) == rsst
+            foo.turns = value + 1 # Nothing materialized
+            foo.turns = value
+            assert foo.pair_table_view == tuple(map(tuple, make_pair_table(rsst)))
+            foo.turns = value + 3
+            foo.turns = value
+            assert foo.kernel_string.split() == \
+                    [f'{x}{y}' if y == '(' else y if y in ')+' else x for x, y in zip(rseq, rsst)]
+
+    def test_bind_candidates(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        foo = ComplexS(sequence = [d1, d2, d1c, d3, d2c, d1c, d2, '+', d1, d3c, d2], 
+                       structure = list('.(.....+..)'), name = 'foo')
+        bar = ComplexS([d2c, d1c, d3], list('...'), name = 'bar')
+        baz = ComplexS([d3, d2, '+', d2c], list('.(+)'), name = 'baz')
+
+        def brute_force_11(cplx):
+            out = []
+            for loop in cplx.loop_decomposition:
+                for i, l1 in enumerate(loop.unpaired):
+                    for l2 in loop.unpaired[i+1:]:
+                        if cplx.get_domain(l1) == ~cplx.get_domain(l2):
+                            out.append((l1, l2))
+            return sorted(out)
+
+        def brute_force_21(c1, c2):
+            return sorted((l1, l2) for l1 in c1.exterior_domains for l2 in c2.exterior_domains
+                            if c1.get_domain(l1) == ~c2.get_domain(l2))
+
+        assert sorted(foo.bind11_candidates()) == brute_force_11(foo)
+        assert sorted(foo.bind11_candidates()) == [((0, 2), (1, 0)), ((0, 3), (1, 1)), 
+                                                   ((0, 4), (0, 6)), ((0, 5), (1, 0))]
+        assert sorted(bar.bind11_candidates()) == []
+        for c1 in (foo, bar, baz):
+            for c2 in (foo, bar, baz):
+                assert sorted(c1.bind21_candidates(c2)) == brute_force_21(c1, c2)
+        batch = list(foo.bind21_batch([bar, baz, foo]))
+        assert sorted((l1, l2) for (c, l1, l2) in batch if c is baz) == brute_force_21(foo, baz)
+        assert len(batch) == sum(len(brute_force_21(foo, c)) for c in (bar, baz, foo))
+
+        # The exterior index is cached and reset with the representation.
+        index = foo.exterior_domain_index()
+        assert foo.exterior_domain_index() is index
+        turns = foo.turns
+        foo.turns = turns + 1
+        assert foo.exterior_domain_index() is not index
+        assert sorted(foo.bind21_candidates(baz)) == brute_force_21(foo, baz)
+        assert sorted(baz.bind21_candidates(foo)) == brute_force_21(baz, foo)
+        foo.turns = turns
+
+    def test_structure_moves(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        def existing(seq, sst):
+            with self.assertRaises(SingletonError) as err:
+                ComplexS(seq, sst)
+            return err.exception.existing
+
+        foo = ComplexS([d1, d2, d3, '+', d3c, d2c, d1c], list('.((+)).'), name = 'foo')
+        bar = foo.bind((0, 0), (1, 2))
+        assert bar is existing([d1, d2, d3, '+', d3c, d2c, d1c], list('(((+)))'))
+        assert bar.flat_structure == make_flat_structure('(((+)))')
+        assert bar.strand_table_view is foo.strand_table_view
+        assert bar.open((0, 0)) is foo
+        assert foo.bind((0, 0), (1, 2)) is bar
+        assert list(foo.open((0, 1)).structure) == list('..(+)..')
+
+        # Periodic sequence, the canonical form depends on the structure only.
+        x = ComplexS([d1, d1c, '+', d1, d1c], list('..+..'), name = 'x')
+        x.turns = 1
+        y = x.bind((0, 0), (1, 1))
+        z = x.bind((0, 1), (1, 0))
+        assert y is z
+        assert y.canonical_form == (('d1', 'd1*', '+', 'd1', 'd1*'), ('(', '.', '+', '.', ')'))
+        assert y is existing([d1, d1c, '+', d1, d1c], list('.(+).'))
+
+        # Branch migration: d1 on strand 1 replaces d1 on strand 0.
+        mig = ComplexS([d1, '+', d1c, '+', d1], list('(+)+.'), name = 'mig')
+        assert list(mig.migrate((2, 0), (1, 0)).structure) == list('.+(+)')
+
+        with self.assertRaises(SecondaryStructureError):
+            foo.bind((0, 0), (1, 1)) # paired
+        with self.assertRaises(SecondaryStructureError):
+            foo.bind((0, 0), (0, 1)) # not complementary
+        with self.assertRaises(SecondaryStructureError):
+            foo.open((0, 0)) # unpaired
+        with self.assertRaises(SecondaryStructureError):
+            ComplexS([d1, d2, d1c, d2c], list('....'), name = 'pk').bind((0, 1), (0, 3)).bind((0, 0), (0, 2))
+        with self.assertRaises(IndexError):
+            foo.bind((0, 0), (1, 3))
+
+    def test_kernel_strings(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        foo = ComplexS.from_kernel_string('d1( d2 + ) d3*', domain = DomainS, name = 'foo')
+        assert list(foo.sequence) == [d1, d2, '+', ~d1, ~d3]
+        assert foo.kernel_string == 'd1( d2 + ) d3*'
+        assert foo.kernel_string is foo.kernel_string
+        foo.turns = 1
+        assert foo.kernel_string == 'd1*( d3* + ) d2'
+        assert ComplexS.from_kernel_string(foo.kernel_string, domain = DomainS, name = 'foo') is foo
+        with self.assertRaises(SingletonError) as err:
+            ComplexS.from_kernel_string('d1*( d3* + ) d2', domain = DomainS)
+        assert err.exception.existing is foo
+        bar = ComplexS.from_kernel_string('a( b + )', name = 'bar')
+        assert list(bar.sequence) == ['a', 'b', '+', 'a*']
+
+    def test_flat_structure(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        foo = ComplexS(sequence = [d1, d2, d3, '+', d1, '+', d1c, d3c, d1c, d2], 
+                       structure = list('..(+(+))..'), name = 'foo')
+        offsets, partner = foo.flat_structure
+        assert list(offsets) == [0, 3, 4, 8]
+        assert list(partner) == [-1, -1, 5, 4, 3, 2, -1, -1]
+        assert foo.flat_index((2, 1)) == 5
+        assert foo.flat_locus(5) == (2, 1)
+        assert foo.get_loop_index((0, 2)) == 1
+        assert foo.get_loop_index((2, 3)) == 0
+        foo.turns = foo.turns + 1
+        offsets, partner = foo.flat_structure
+        assert list(offsets) == [0, 1, 5, 8]
+        assert list(partner) == [1, 0, 7, -1, -1, -1, -1, 2]
+        assert foo.get_paired_loc((0, 0)) == (1, 0)
+        assert foo.exterior_domains == [(1, 2), (1, 3), (2, 0), (2, 1)]
+
+    def test_loop_decomposition(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        d1c, d2c, d3c = self.d1c, self.d2c, self.d3c
+        foo = ComplexS(sequence = [d1, d2, d3, '+', d1, '+', d1c, d3c, d1c, d2], 
+                       structure = list('..(+(+))..'), name = 'foo')
+        loops = foo.loop_decomposition
+        assert loops is foo.loop_decomposition
+        assert [l.kind for l in loops] == ['exterior', 'exterior', 'exterior']
+        assert loops[0].unpaired == foo.exterior_domains
+        assert loops[1].closing == ((0, 2), (2, 1))
+        assert loops[1].stems == [((1, 0), (2, 0))]
+        assert foo.get_loop_index((1, 0)) == 2
+        foo.turns = foo.turns + 1
+        assert foo.loop_decomposition is not loops
+
 @unittest.skipIf(SKIP, "skipping tests.")
 class TestAutomaticComplex(unittest.TestCase):
     def setUp(self):
@@ -396,6 +634,387 @@ class TestStrandS(unittest.TestCase):
         assert list(foo.sequence) == [d1, d2, ~d3]
         assert foo.structure is None
 
+class CanonComplexS(ComplexS):
+    COMPACT_KEY = False
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestCompactKeys(unittest.TestCase):
+    def setUp(self):
+        self.d1 = DomainS('d1', 5)
+        self.d2 = DomainS('d2', 5)
+
+    def tearDown(self):
+        clear_singletons(DomainS)
+        clear_singletons(ComplexS)
+        clear_singletons(CanonComplexS)
+        clear_singletons(MacrostateS)
+        clear_singletons(ReactionS)
+
+    def test_complex_keys(self):
+        d1, d2 = self.d1, self.d2
+        foo = ComplexS([d1, d2, '+', ~d2], list('.(+)'), name = 'foo')
+        with self.assertRaises(SingletonError) as err:
+            ComplexS([~d2, '+', d1, d2], list('(+.)'))
+        assert err.exception.existing is foo
+        assert ComplexS([~d2, '+', d1, d2], list('(+.)'), name = 'foo') is foo
+        assert isinstance(foo.compact_key, bytes)
+        assert foo.canonical_form == (('d1', 'd2', '+', 'd2*'), tuple('.(+)'))
+        assert ComplexS._instanceCanon[foo.compact_key] is foo
+        assert foo.canonical_form not in ComplexS._instanceCanon
+
+        baz = ComplexS([d1, d2, '+', ~d2], list('..+.'))
+        assert baz.compact_key != foo.compact_key
+        assert len(set(ComplexS._instanceCanon.values())) == 2
+
+        # The registry of this class uses the canonical form.
+        foo = CanonComplexS([d1, d2, '+', ~d2], list('.(+)'), name = 'foo')
+        assert foo.compact_key == foo.canonical_form
+        assert CanonComplexS._instanceCanon[foo.canonical_form] is foo
+
+    def test_macrostate_and_reaction_keys(self):
+        d1, d2 = self.d1, self.d2
+        A = ComplexS([d1, d2], list('..'), name = 'A')
+        B = ComplexS([~d2], list('.'), name = 'B')
+        C = ComplexS([d1, d2, '+', ~d2], list('.(+)'), name = 'C')
+        M = MacrostateS([B, A])
+        assert M.compact_key == (A.compact_key, B.compact_key)
+        assert M.canonical_form == (A, B)
+        assert MacrostateS([A, B]) is M
+
+        R = ReactionS([B, A], [C], 'bind21')
+        assert R.name == '[bind21] A + B -> C'
+        assert R.canonical_form == ((A.canonical_form, B.canonical_form), 
+                                    (C.canonical_form,), 'bind21')
+        assert R.compact_key == ((A.compact_key, B.compact_key), 
+                                 (C.compact_key,), 'bind21')
+        assert ReactionS([A, B], [C], 'bind21') is R
+
+class CanonRotationsComplexS(ComplexS):
+    ROTATIONS = 'canon'
+
+class HashRotationsComplexS(ComplexS):
+    ROTATIONS = 'hash'
+
+class FingerprintComplexS(ComplexS):
+    FINGERPRINTS = True
+
+class HashFingerprintComplexS(ComplexS):
+    ROTATIONS = 'hash'
+    FINGERPRINTS = True
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestRotationModes(unittest.TestCase):
+    def setUp(self):
+        self.d1 = DomainS('d1', 5)
+        self.d2 = DomainS('d2', 5)
+        self.d3 = DomainS('d3', 5)
+
+    def tearDown(self):
+        clear_singletons(DomainS)
+        clear_singletons(ComplexS)
+        clear_singletons(CanonRotationsComplexS)
+        clear_singletons(HashRotationsComplexS)
+        clear_singletons(FingerprintComplexS)
+        clear_singletons(HashFingerprintComplexS)
+
+    def test_lookup_rotations(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        seq = [d1, d2, d3, '+', d1, '+', ~d1, ~d3, ~d1, d2]
+        sst = list('..(+(+))..')
+        keep = []
+        for cls in (ComplexS, CanonRotationsComplexS, HashRotationsComplexS):
+            foo = cls(seq, sst, name = 'foo')
+            for (rseq, rsst) in foo.rotate():
+                assert cls(rseq, rsst, name = 'foo') is foo
+                with self.assertRaises(SingletonError) as err:
+                    cls(rseq, rsst)
+                assert err.exception.existing is foo
+            bar = cls(seq, list('...+.+....'), name = 'bar')
+            assert bar is not foo
+            keep.extend([foo, bar])
+
+        assert len(ComplexS._instanceCanon) == 6
+        assert len(HashRotationsComplexS._instanceCanon) == 2
+        assert len(HashRotationsComplexS._rotation_index()) == 6
+        assert len(CanonRotationsComplexS._instanceCanon) == 2
+
+    def test_garbage_collection(self):
+        d1, d2 = self.d1, self.d2
+        foo = HashRotationsComplexS([d1, '+', d2], list('.+.'), name = 'foo')
+        assert len(HashRotationsComplexS._rotation_index()) == 2
+        del foo
+        assert len(HashRotationsComplexS._rotation_index()) == 0
+        foo = ComplexS([d1, '+', d2], list('.+.'), name = 'foo')
+        assert len(ComplexS._instanceCanon) == 2
+        del foo
+        assert len(ComplexS._instanceCanon) == 0
+
+    def test_lookup_during_garbage_collection(self):
+        d1, d2 = self.d1, self.d2
+        lookup = Singleton._singleton_lookup
+        def collect_first(cls, *args):
+            gc.collect()
+            return lookup(cls, *args)
+        for cls in (ComplexS, HashRotationsComplexS, FingerprintComplexS):
+            gc.disable()
+            try:
+                foo = cls([d1, d2, '+', ~d1], list('(.+)'))
+                foo.cycle = foo # Only the cycle collector can free it.
+                del foo
+                with patch.object(Singleton, '_singleton_lookup', collect_first):
+                    with self.assertRaises(SingletonError) as err:
+                        cls([~d1, '+', d1, d2], list('(+).'))
+                foo = err.exception.existing
+                assert foo.canonical_form == (('d1', 'd2', '+', 'd1*'), tuple('(.+)'))
+                del foo.cycle, foo, err
+            finally:
+                gc.enable()
+
+    def test_fingerprint_collisions(self):
+        d1, d2, d3 = self.d1, self.d2, self.d3
+        foo = ComplexS([d1, '+', d2], list('.+.'), name = 'foo')
+        assert len(ComplexS._fingerprint_index()) == 0 # Off by default.
+        del foo
+        for cls in (FingerprintComplexS, HashFingerprintComplexS):
+            # Same strands (and paired domains) in a different order.
+            foo = cls([d1, '+', d2, '+', d3], list('.+.+.'), name = 'foo')
+            bar = cls([d1, '+', d3, '+', d2], list('.+.+.'), name = 'bar')
+            assert foo is not bar
+            assert len(cls._fingerprint_index()) == 1
+            assert cls([d2, '+', d3, '+', d1], list('.+.+.'), name = 'foo') is foo
+            assert cls([d3, '+', d2, '+', d1], list('.+.+.'), name = 'bar') is bar
+            del foo
+            assert cls._fingerprint_index() == {complex_fingerprint(*bar.canonical_form): 
+                                                    {bar.compact_key: None}}
+            del bar
+            assert len(cls._fingerprint_index()) == 0
+
+        # Every complex collides: lookups must still be correct.
+        with patch('dsdobjects.base_classes.complex_fingerprint', lambda seq, sst: 0):
+            for cls in (FingerprintComplexS, HashFingerprintComplexS):
+                foo = cls([d1, '+', d2], list('(+)'), name = 'foo')
+                bar = cls([d1, '+', d2], list('.+.'), name = 'bar')
+                assert list(cls._fingerprint_index()) == [0]
+                assert list(cls._fingerprint_index()[0]) == [foo.compact_key, bar.compact_key]
+                assert cls([d2, '+', d1], list('.+.'), name = 'bar') is bar
+                assert cls([d2, '+', d1], list('(+)'), name = 'foo') is foo
+                with self.assertRaises(SingletonError) as err:
+                    cls([d2, '+', d1, '+', d1], list('.+.+.'), name = 'foo')
+                assert err.exception.existing is None
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestThreadSafety(unittest.TestCase):
+    def setUp(self):
+        self.interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # Force frequent thread switches.
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+        clear_singletons(DomainS)
+        clear_singletons(ComplexS)
+        clear_singletons(HashRotationsComplexS)
+
+    def run_threads(self, func, nthreads = 8):
+        barrier = Barrier(nthreads)
+        def job(i):
+            barrier.wait()
+            return func(i)
+        with ThreadPoolExecutor(max_workers = nthreads) as ex:
+            return list(ex.map(job, range(nthreads)))
+
+    def test_same_domains(self):
+        def build(i):
+            return [DomainS(f'x{j}', 5 + j % 3) for j in range(200)]
+        results = self.run_threads(build)
+        for doms in results[1:]:
+            assert all(a is b for a, b in zip(doms, results[0]))
+        assert all(~d is DomainS(f'{d.name}*') for d in results[0])
+
+    def test_same_complexes(self):
+        doms = [DomainS(f'x{j}', 5) for j in range(50)]
+        cplxs = []
+        for j in range(50):
+            seq = [doms[j], '+', doms[(j + 1) % 50], ~doms[j]]
+            cplxs.append((seq, list('(+.)'), f'cx{j}'))
+        for cls in (ComplexS, HashRotationsComplexS):
+            def build(i):
+                out = []
+                for (seq, sst, name) in cplxs:
+                    # Half of the threads use a different rotation.
+                    for _ in range(i % 2):
+                        seq, sst = rotate_complex_once(seq, sst)
+                    out.append(cls(seq, sst, name = name))
+                return out
+            results = self.run_threads(build)
+            for objs in results[1:]:
+                assert all(a is b for a, b in zip(objs, results[0]))
+            assert len(set(cls._instanceCanon.values())) == 50
+
+    def test_unique_automatic_names(self):
+        doms = [DomainS(f'x{j}', 5) for j in range(10)]
+        def build(i):
+            out = []
+            for j in range(10):
+                seq = [doms[i], doms[j], '+', ~doms[j]]
+                out.append(ComplexS(seq, list('.(+)')))
+            return out
+        results = self.run_threads(build)
+        names = [c.name for objs in results for c in objs]
+        assert len(set(names)) == len(names) == 80
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestRegistryScope(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(DomainS)
+        clear_singletons(ComplexS)
+
+    def test_isolation(self):
+        a = DomainS('a', 10)
+        with registry_scope():
+            b = DomainS('a', 15)
+            assert b is not a
+            c = DomainS('a*')
+            assert c is ~b
+            assert len(DomainS._instanceNames) == 2
+            with registry_scope():
+                with self.assertRaises(SingletonError):
+                    DomainS('a')
+            assert DomainS('a') is b
+        assert DomainS('a') is a
+        assert len(DomainS._instanceNames) == 1
+
+    def test_automatic_names(self):
+        ComplexS.ID = 1
+        d = DomainS('d', 5)
+        foo = ComplexS([d], list('.'))
+        assert foo.name == 'c1'
+        for _ in range(2):
+            with registry_scope():
+                e = DomainS('d', 5)
+                bar = ComplexS([e, e], list('..'))
+                assert bar.name == 'c1'
+                assert ComplexS.ID == 2
+        assert ComplexS.ID == 2
+        assert ComplexS([d, d], list('..')).name == 'c2'
+
+    def test_teardown(self):
+        with registry_scope():
+            d = DomainS('d', 5)
+            foo = ComplexS([d, '+', ~d], list('(+)'), name = 'foo')
+            wd, wfoo = ref(d), ref(foo)
+            del d, foo
+        assert wd() is None
+        assert wfoo() is None
+        assert len(DomainS._instanceNames) == 0
+
+    def test_asyncio_tasks(self):
+        async def job(length):
+            with registry_scope():
+                a = DomainS('a', length)
+                await asyncio.sleep(0)
+                assert DomainS('a') is a
+                assert len(DomainS('a*')) == length
+                return a
+
+        async def main():
+            return await asyncio.gather(*[job(l) for l in range(5, 15)])
+
+        doms = asyncio.run(main())
+        assert [len(a) for a in doms] == list(range(5, 15))
+        assert len(DomainS._instanceNames) == 0
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestRegistryStats(unittest.TestCase):
+    def tearDown(self):
+        enable_registry_stats(DomainS, False)
+        enable_registry_stats(ComplexS, False)
+        clear_singletons(DomainS)
+        clear_singletons(ComplexS)
+
+    def test_counters(self):
+        assert registry_stats(ComplexS) is None
+        d = DomainS('d', 5)
+        enable_registry_stats(ComplexS)
+        foo = ComplexS([d, '+', ~d], list('(+)'), name = 'foo')
+        assert ComplexS([~d, '+', d], list('(+)'), name = 'foo') is foo
+        assert ComplexS(None, None, name = 'foo') is foo
+        with self.assertRaises(SingletonError):
+            ComplexS([d, '+', ~d], list('(+)'))
+        with self.assertRaises(SingletonError):
+            ComplexS(None, None, name = 'bar')
+        with registry_scope():
+            bar = ComplexS([d, d], list('..'), name = 'bar')
+        tid = registry_stats(ComplexS)['identifiers_time']
+        with self.assertRaises(ObjectInitError):
+            ComplexS([d], list('..'))
+        stats = registry_stats(ComplexS)
+        assert stats['class'] == 'ComplexS'
+        assert stats['calls'] == 7
+        assert stats['name_hits'] == 1
+        assert stats['canon_hits'] == 1
+        assert stats['constructed'] == 2
+        assert stats['errors'] == 2
+        assert stats['failures'] == 1
+        assert stats['identifiers_time'] > tid > 0
+        assert stats['init_time'] > 0
+        assert registry_stats(DomainS) is None
+
+        enable_registry_stats(ComplexS)
+        assert registry_stats(ComplexS)['calls'] == 0
+        enable_registry_stats(ComplexS, False)
+        ComplexS(None, None, name = 'foo')
+        assert registry_stats(ComplexS) is None
+
+class MySlottedComplexS(SlottedComplexS):
+    __slots__ = ('tag',)
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestSlottedClasses(unittest.TestCase):
+    def tearDown(self):
+        for cls in (SlottedDomainS, SlottedStrandS, SlottedComplexS, SlottedMacrostateS, 
+                    SlottedReactionS, MySlottedComplexS, DomainS, ComplexS):
+            clear_singletons(cls)
+
+    def test_slotted_objects(self):
+        a = SlottedDomainS('a', 10)
+        assert a is ~SlottedDomainS('a*')
+        assert isinstance(~a, SlottedDomainS)
+        s = SlottedStrandS([a, ~a], name = 's')
+        c = SlottedComplexS([a, '+', ~a], list('(+)'), name = 'c')
+        m = SlottedMacrostateS([c], name = 'c')
+        r = SlottedReactionS([c], [c, c], 'open')
+        for obj in (a, s, c, m, r):
+            assert not hasattr(obj, '__dict__')
+            assert ref(obj)() is obj
+            with self.assertRaises(AttributeError):
+                obj.foo = 1
+        assert c.kernel_string == 'a( + )'
+        assert list(c.split()) == [c]
+        assert c.open((0, 0)).bind((0, 0), (1, 0)) is c
+        assert c.open((0, 0)).is_connected is False
+        a.sequence = 'NNNNNNNNNN'
+        del s, c, m, r, obj
+        assert len(SlottedComplexS._instanceCanon) == 0
+
+    def test_slotted_inheritance(self):
+        # Slotted and regular classes have separate registries.
+        a = SlottedDomainS('a', 10)
+        b = DomainS('a', 10)
+        assert a is not b
+        assert a == b
+        assert not isinstance(a, DomainS)
+        assert isinstance(b, SlottedDomainS)
+        assert isinstance(StrandS([b], name = 's'), ComplexS)
+        assert isinstance(StrandS([b], name = 's'), SlottedStrandS)
+        assert hasattr(b, '__dict__')
+
+        foo = MySlottedComplexS([a, '+', ~a], list('(+)'), name = 'foo')
+        foo.tag = 'x'
+        assert not hasattr(foo, '__dict__')
+        assert MySlottedComplexS([~a, '+', a], list('(+)'), name = 'foo') is foo
+        assert foo == ComplexS([b, '+', ~b], list('(+)'), name = 'foo')
+        with self.assertRaises(AttributeError):
+            foo.bar = 1
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,693 @@
+#
+# tests/test_benchmarks.py
+#   - timings for performance critical code paths, run with:
+#     DSDOBJECTS_BENCHMARK=1 python -m pytest -s tests/test_benchmarks.py
+#
+import logging
+logger = logging.getLogger('dsdobjects')
+logger.setLevel(logging.INFO)
+import unittest
+
+import os
+import sys
+import random
+import tracemalloc
+from time import perf_counter
+
+from dsdobjects import (DomainS, ComplexS, ReactionS, SingletonError, clear_singletons,
+                        SlottedDomainS, SlottedComplexS, SlottedReactionS, ReactionNetwork)
+
+from dsdobjects.dsdparser import parse_pil_string
+from dsdobjects.objectio import (resolve_kernel_loops, resolve_kernel_complex,
+                                 set_io_objects, clear_io_objects)
+from dsdobjects.base_classes import StrandS
+from dsdobjects.complex_utils import (split_complex_db,
+                                      dot_bracket_to_kernel,
+                                      kernel_to_dot_bracket,
+                                      make_pair_table,
+                                      make_flat_structure,
+                                      rotate_complex_once,
+                                      rotate_complex,
+                                      canonical_rotation,
+                                      compact_complex_key)
+
+SKIP = 'DSDOBJECTS_BENCHMARK' not in os.environ
+
+def timeit(func, *args, repeat = 3):
+    """ Returns the best of repeat timings (in seconds) and the result. """
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        out = func(*args)
+        t = perf_counter() - start
+        best = t if best is None else min(best, t)
+    return best, out
+
+def random_complex(nstrands, rng, domains = 'abcdefgh', maxlen = 6):
+    """ Returns a random (sequence, structure) pair with nstrands. """
+    seq, sst, stack = [], [], []
+    for s in range(nstrands):
+        if s:
+            seq.append('+')
+            sst.append('+')
+        for _ in range(rng.randint(1, maxlen)):
+            seq.append(rng.choice(domains))
+            r = rng.random()
+            if r < 0.4:
+                stack.append(len(sst))
+                sst.append('(')
+            elif r < 0.8 and stack:
+                stack.pop()
+                sst.append(')')
+            else:
+                sst.append('.')
+    for i in stack:
+        sst[i] = '.'
+    return seq, sst
+
+def deep_sizeof(obj):
+    """ Returns the memory (in bytes) of nested tuples, shared strings excluded. """
+    if isinstance(obj, tuple):
+        return sys.getsizeof(obj) + sum(deep_sizeof(x) for x in obj)
+    return 0 if isinstance(obj, str) else sys.getsizeof(obj)
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkCanonicalForm(unittest.TestCase):
+    def test_canonical_rotation(self):
+        def rotation_canon(seq, sst):
+            # The canonical form as it was derived by ComplexS.identifiers.
+            cdict = {}
+            for e in range(seq.count('+') + 1):
+                cdict[(tuple(map(str, seq)), tuple(sst))] = e
+                seq, sst = rotate_complex_once(seq, sst)
+            canon = sorted(cdict)[0]
+            return canon, cdict[canon]
+
+        rng = random.Random(1)
+        print()
+        for n in (4, 16, 64, 256):
+            seq, sst = random_complex(n, rng)
+            t1, out1 = timeit(rotation_canon, seq, sst)
+            t2, out2 = timeit(canonical_rotation, seq, sst)
+            assert out1 == out2
+            print(f'canonical form {n:4d} strands: rotations {t1*1e3:8.2f} ms, ' + \
+                  f'least rotation {t2*1e3:8.2f} ms ({t1/t2:6.1f}x)')
+
+    def test_compact_keys(self):
+        def lookups(registry, keys):
+            for k in keys:
+                registry[k]
+
+        rng = random.Random(1)
+        print()
+        for n in (2, 10, 50):
+            canons = [canonical_rotation(*random_complex(n, rng))[0] for _ in range(1000)]
+            keys = [compact_complex_key(*c) for c in canons]
+            # Fresh (equal, but not identical) objects as they come from identifiers().
+            qcanons = [(tuple(list(c[0])), tuple(list(c[1]))) for c in canons]
+            qkeys = [bytes(bytearray(k)) for k in keys]
+            m1 = sum(deep_sizeof(c) for c in canons)
+            m2 = sum(sys.getsizeof(k) for k in keys)
+            t1, _ = timeit(lookups, dict(zip(canons, canons)), qcanons)
+            t2, _ = timeit(lookups, dict(zip(keys, keys)), qkeys)
+            print(f'registry keys {n:3d} strands: canonical form {m1/1000:8.0f} B {t1*1e3:6.2f} ms, ' + \
+                  f'compact key {m2/1000:6.0f} B {t2*1e3:6.2f} ms (per 1000 lookups)')
+
+class CanonRotationsComplexS(ComplexS):
+    ROTATIONS = 'canon'
+
+class HashRotationsComplexS(ComplexS):
+    ROTATIONS = 'hash'
+
+class AllRotationsFingerprintComplexS(ComplexS):
+    ROTATIONS = 'all'
+    FINGERPRINTS = True
+
+class HashRotationsFingerprintComplexS(ComplexS):
+    ROTATIONS = 'hash'
+    FINGERPRINTS = True
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkComplexRegistry(unittest.TestCase):
+    def test_rotation_modes(self):
+        def create(cls, cplxs):
+            return [cls(list(seq), list(sst), name = f'x{e}') for e, (seq, sst) in enumerate(cplxs)]
+
+        def lookup(cls, queries):
+            for seq, sst in queries:
+                try:
+                    cls(seq, sst)
+                except SingletonError as err:
+                    assert err.existing is not None
+
+        rng = random.Random(1)
+        print()
+        for n in (2, 10, 30):
+            cplxs = set()
+            while len(cplxs) < 2000:
+                seq, sst = random_complex(n, rng)
+                cplxs.add(canonical_rotation(seq, sst)[0])
+            queries = [rotate_complex(seq, sst, rng.randint(0, n - 1)) for seq, sst in cplxs]
+            for cls in (CanonRotationsComplexS, ComplexS, HashRotationsComplexS):
+                t1 = perf_counter()
+                objs = create(cls, cplxs)
+                t1 = perf_counter() - t1
+                del objs
+                clear_singletons(cls)
+                tracemalloc.start()
+                objs = create(cls, cplxs)
+                mem = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                t2, _ = timeit(lookup, cls, queries)
+                print(f'{n:3d} strands, ROTATIONS = {cls.ROTATIONS:5s} ' + \
+                      f'init {t1*1e3:7.1f} ms, memory {mem/len(objs):7.0f} B/complex, ' + \
+                      f'lookup {t2*1e3:7.1f} ms (2000 complexes)')
+                del objs
+                clear_singletons(cls)
+
+    def test_fingerprints(self):
+        def enumerate_network(cls, queries):
+            # Most complexes are new, some are rotations of known ones.
+            out = []
+            for seq, sst in queries:
+                try:
+                    out.append(cls(seq, sst))
+                except SingletonError as err:
+                    out.append(err.existing)
+            return out
+
+        rng = random.Random(1)
+        print()
+        for n in (2, 10, 30):
+            cplxs = set()
+            while len(cplxs) < 2000:
+                cplxs.add(canonical_rotation(*random_complex(n, rng))[0])
+            queries = [rotate_complex(seq, sst, rng.randint(0, n - 1)) for seq, sst in cplxs]
+            queries += rng.sample(queries, 200)
+            for cls in (ComplexS, AllRotationsFingerprintComplexS,
+                        HashRotationsComplexS, HashRotationsFingerprintComplexS):
+                t = perf_counter()
+                objs = enumerate_network(cls, queries)
+                t = perf_counter() - t
+                print(f'{n:3d} strands, ROTATIONS = {cls.ROTATIONS:5s} ' + \
+                      f'FINGERPRINTS = {cls.FINGERPRINTS!s:5s} ' + \
+                      f'enumerate {t*1e3:7.1f} ms (2000 new, 200 known complexes)')
+                del objs
+                clear_singletons(cls)
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkTableViews(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ComplexS)
+
+    def test_pair_table_access(self):
+        def copies(cplxs):
+            for c in cplxs:
+                for strand in c.pair_table:
+                    for loc in strand:
+                        pass
+
+        def views(cplxs):
+            for c in cplxs:
+                for strand in c.pair_table_view:
+                    for loc in strand:
+                        pass
+
+        rng = random.Random(1)
+        print()
+        for n in (2, 10, 30):
+            cplxs = []
+            for e in range(1000):
+                seq, sst = random_complex(n, rng)
+                try:
+                    cplxs.append(ComplexS(seq, sst, name = f'x{e}'))
+                except SingletonError:
+                    pass
+            t1, _ = timeit(copies, cplxs)
+            t2, _ = timeit(views, cplxs)
+            print(f'pair table {n:3d} strands: copying accessor {t1*1e3:7.2f} ms, ' + \
+                  f'view {t2*1e3:7.2f} ms ({len(cplxs)} complexes)')
+            cplxs.clear()
+            clear_singletons(ComplexS)
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkFlatStructure(unittest.TestCase):
+    def test_structure_memory(self):
+        def memory(func, structures):
+            tracemalloc.start()
+            out = [func(sst) for sst in structures]
+            mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return mem / len(out)
+
+        rng = random.Random(1)
+        print()
+        for n in (2, 10, 30):
+            structures = [random_complex(n, rng)[1] for _ in range(1000)]
+            m1 = memory(make_pair_table, structures)
+            m2 = memory(lambda x: tuple(map(tuple, make_pair_table(x))), structures)
+            m3 = memory(make_flat_structure, structures)
+            print(f'structure {n:3d} strands: pair table {m1:7.0f} B, ' + \
+                  f'pair table view {m2:7.0f} B, flat structure {m3:6.0f} B (per complex)')
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkSplitComplex(unittest.TestCase):
+    def test_split_aggregates(self):
+        def aggregate(ncomponents, rng):
+            # Disconnected components, each of them nested in a random location.
+            seq, sst = ['A'], ['.']
+            for _ in range(ncomponents):
+                cseq, csst = random_complex(rng.randint(1, 3), rng)
+                i = rng.choice([i for i, x in enumerate(sst) if x == '+'] + [len(sst)])
+                seq[i:i] = ['+'] + cseq
+                sst[i:i] = ['+'] + csst
+            return seq, sst
+
+        rng = random.Random(1)
+        print()
+        for n in (10, 100, 300, 1000):
+            seq, sst = aggregate(n, rng)
+            t, out = timeit(lambda: list(split_complex_db(seq, sst)))
+            print(f'split aggregate {seq.count("+") + 1:5d} strands: ' + \
+                  f'{len(out):5d} components in {t*1e3:8.2f} ms')
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkRotations(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ComplexS)
+
+    def test_complex_rotations(self):
+        def views(cplx):
+            return sum(1 for r in cplx.rotations())
+
+        def materialized(cplx):
+            return sum(1 for r in cplx.rotate())
+
+        rng = random.Random(1)
+        print()
+        for n in (10, 100, 500):
+            cplx = ComplexS(*random_complex(n, rng), name = f'x{n}')
+            t1, _ = timeit(views, cplx)
+            t2, _ = timeit(materialized, cplx)
+            print(f'all rotations {n:3d} strands: views {t1*1e3:7.2f} ms, ' + \
+                  f'materialized {t2*1e3:8.2f} ms')
+            del cplx
+
+    def test_set_turns(self):
+        def rotate(cplx, turns):
+            for t in turns:
+                cplx.turns = t
+            return cplx.turns
+
+        rng = random.Random(1)
+        print()
+        for n in (10, 100, 500):
+            cplx = ComplexS(*random_complex(n, rng), name = f'x{n}')
+            turns = [rng.randint(0, n - 1) for _ in range(1000)]
+            t, _ = timeit(rotate, cplx, turns)
+            print(f'set turns {n:3d} strands: {t*1e3:7.2f} ms (1000 times)')
+            del cplx
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkBindCandidates(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ComplexS)
+        clear_singletons(DomainS)
+
+    def test_bind21_batch(self):
+        def nested_loops(c1, others):
+            out = 0
+            for c2 in others:
+                for l1 in c1.exterior_domains:
+                    for l2 in c2.exterior_domains:
+                        if c1.get_domain(l1) == ~c2.get_domain(l2):
+                            out += 1
+            return out
+
+        def batch(c1, others):
+            return sum(1 for _ in c1.bind21_batch(others))
+
+        def uncached_index(cplx):
+            # The former exterior_domain_index(), rebuilt on every call.
+            index = dict()
+            for loop in cplx.loop_decomposition:
+                if loop.exterior:
+                    for dom, locs in cplx.domain_index[loop.index].items():
+                        index.setdefault(dom, []).extend(locs)
+            return index
+
+        def uncached_batch(c1, others):
+            out = 0
+            cindex = {~dom: locs for dom, locs in uncached_index(c1).items()}
+            for other in others:
+                for dom, olocs in uncached_index(other).items():
+                    slocs = cindex.get(dom)
+                    if slocs is not None:
+                        out += len(slocs) * len(olocs)
+            return out
+
+        def all_pairs(func, cplxs):
+            # An enumerator calls the batch once per complex.
+            return sum(func(c, cplxs) for c in cplxs)
+
+        rng = random.Random(1)
+        doms = {x: DomainS(x, 5) for x in 'abcdefgh'}
+        doms.update({f'{x}*': ~d for x, d in list(doms.items())})
+        names = iter(range(10**9))
+        def domain_complex(n):
+            while True:
+                seq, sst = random_complex(n, rng, domains = list(doms))
+                try:
+                    cplx = ComplexS([d if d == '+' else doms[d] for d in seq], sst, 
+                                    name = f'x{next(names)}')
+                except SingletonError as err:
+                    cplx = err.existing
+                if cplx.is_connected and cplx.exterior_domains:
+                    return cplx
+
+        print()
+        for n in (1, 2, 4):
+            cplx = domain_complex(n)
+            others = [domain_complex(n) for e in range(1000)]
+            for c in others:
+                _ = c.domain_index # Both methods use cached loops.
+            t1, r1 = timeit(nested_loops, cplx, others)
+            t2, r2 = timeit(batch, cplx, others)
+            assert r1 == r2
+            print(f'bind21 {n:3d} strands vs 1000 complexes: nested loops {t1*1e3:7.2f} ms, ' + \
+                  f'batch {t2*1e3:7.2f} ms ({r1} candidates)')
+            t1, r1 = timeit(all_pairs, uncached_batch, others[:300])
+            t2, r2 = timeit(all_pairs, batch, others[:300])
+            assert r1 == r2
+            print(f'bind21 {n:3d} strands, 300 x 300 complexes: uncached index {t1*1e3:7.2f} ms, ' + \
+                  f'cached index {t2*1e3:7.2f} ms ({r1} candidates)')
+            del cplx, others, c
+            clear_singletons(ComplexS)
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkStructureMoves(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ComplexS)
+        clear_singletons(DomainS)
+
+    def test_open_moves(self):
+        def constructor(cplx, locs):
+            out = []
+            for loc in locs:
+                seq = list(cplx.sequence)
+                sst = list(cplx.structure)
+                ploc = cplx.get_paired_loc(loc)
+                # Positions in the structure are shifted by one '+' per strand.
+                i = cplx.flat_index(loc) + loc[0]
+                j = cplx.flat_index(ploc) + ploc[0]
+                sst[i] = sst[j] = '.'
+                try:
+                    out.append(ComplexS(seq, sst))
+                except SingletonError as err:
+                    out.append(err.existing)
+            return out
+
+        def moves(cplx, locs):
+            return [cplx.open(loc) for loc in locs]
+
+        rng = random.Random(1)
+        doms = {x: DomainS(x, 5) for x in 'abcdefgh'}
+        doms.update({f'{x}*': ~d for x, d in list(doms.items())})
+        print()
+        for n in (2, 10, 50):
+            seq, sst = random_complex(n, rng, domains = list(doms))
+            cplx = ComplexS([d if d == '+' else doms[d] for d in seq], sst, name = f'x{n}')
+            locs = [cplx.flat_locus(i) for i, p in enumerate(cplx.flat_structure[1]) if p >= 0]
+            t1, r1 = timeit(constructor, cplx, locs)
+            t2, r2 = timeit(moves, cplx, locs)
+            assert all(a is b for a, b in zip(r1, r2))
+            print(f'open moves {n:3d} strands: constructor {t1*1e3:7.2f} ms, ' + \
+                  f'move {t2*1e3:7.2f} ms ({len(locs)} moves)')
+            del cplx, r1, r2
+            clear_singletons(ComplexS)
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkSlottedClasses(unittest.TestCase):
+    def test_object_memory(self):
+        def network(D, C, R, cplxs):
+            doms = {x: D(x, 5) for x in 'abcdefgh'}
+            doms.update({f'{x}*': ~d for x, d in list(doms.items())})
+            objs = []
+            for e, (seq, sst) in enumerate(cplxs):
+                objs.append(C([d if d == '+' else doms[d] for d in seq], sst, name = f'x{e}'))
+            for c1, c2 in zip(objs, objs[1:]):
+                objs.append(R([c1], [c2], 'open'))
+            return objs
+
+        rng = random.Random(1)
+        domains = list('abcdefgh') + [f'{x}*' for x in 'abcdefgh']
+        print()
+        for n in (1, 3, 10):
+            cplxs = set()
+            while len(cplxs) < 5000:
+                seq, sst = random_complex(n, rng, domains = domains)
+                cplxs.add(canonical_rotation(seq, sst)[0])
+            mem = []
+            for classes in ((DomainS, ComplexS, ReactionS),
+                            (SlottedDomainS, SlottedComplexS, SlottedReactionS)):
+                tracemalloc.start()
+                objs = network(*classes, cplxs)
+                mem.append(tracemalloc.get_traced_memory()[0] / len(objs))
+                tracemalloc.stop()
+                del objs
+                for cls in classes:
+                    clear_singletons(cls)
+            print(f'network {n:3d} strands: regular {mem[0]:7.0f} B, ' + \
+                  f'slotted {mem[1]:7.0f} B per object ({1 - mem[1]/mem[0]:5.1%} less)')
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkComplements(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ComplexS)
+        clear_singletons(DomainS)
+
+    def test_complement_access(self):
+        def registry(doms):
+            # The former implementation of DomainS.complement.
+            for d in doms:
+                DomainS(d.cname, d.length)
+
+        def pointers(doms):
+            for d in doms:
+                ~d
+
+        doms = [DomainS(f'x{i}', 5) for i in range(100)]
+        doms += [~d for d in doms]
+        rng = random.Random(1)
+        queries = [rng.choice(doms) for _ in range(100000)]
+        t1, _ = timeit(registry, queries)
+        t2, _ = timeit(pointers, queries)
+        print(f'\ncomplement: registry {t1*1e3:7.2f} ms, pointer {t2*1e3:7.2f} ms ' + \
+              f'({t1/t2:5.1f}x, 100000 lookups)')
+
+        cplxs = []
+        for e in range(200):
+            seq, sst = random_complex(10, rng, domains = [d.name for d in doms])
+            names = {d.name: d for d in doms}
+            cplxs.append(ComplexS([x if x == '+' else names[x] for x in seq], sst, 
+                                  name = f'x{e}'))
+        t, _ = timeit(lambda: [c.is_domainlevel_complement for c in cplxs])
+        print(f'is_domainlevel_complement: {t*1e3:7.2f} ms (200 complexes)')
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkKernelStrings(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ComplexS)
+
+    def test_kernel_strings(self):
+        def concatenation(seq, sst):
+            # The former implementation of ComplexS.kernel_string.
+            knl = ''
+            for i in range(len(seq)):
+                if sst[i] == '+':
+                    knl += str(sst[i]) + ' '
+                elif sst[i] == ')':
+                    knl += str(sst[i]) + ' '
+                elif sst[i] == '(':
+                    knl += str(seq[i]) + str(sst[i]) + ' '
+                else:
+                    knl += str(seq[i]) + ' '
+            return knl[:-1]
+
+        def pyparsing(knl):
+            [line] = parse_pil_string(f'x = {knl}')
+            return resolve_kernel_loops(line[2])
+
+        rng = random.Random(1)
+        print()
+        for n in (2, 10, 50):
+            seq, sst = random_complex(n, rng)
+            cplx = ComplexS(seq, sst, name = f'x{n}')
+            knl = cplx.kernel_string
+            t1, k1 = timeit(concatenation, seq, sst)
+            t2, k2 = timeit(dot_bracket_to_kernel, seq, sst)
+            t3, _ = timeit(lambda: cplx.kernel_string)
+            assert k1 == k2 == knl
+            print(f'render kernel {n:3d} strands: concatenation {t1*1e6:8.1f} us, ' + \
+                  f'join {t2*1e6:8.1f} us, cached {t3*1e6:5.2f} us')
+            t1, r1 = timeit(pyparsing, knl)
+            # Trailing whitespace: an equivalent string that is not in the cache.
+            t2, r2 = timeit(lambda: kernel_to_dot_bracket(knl + ' '), repeat = 1)
+            t3, r3 = timeit(kernel_to_dot_bracket, knl)
+            assert r1 == r2 == r3
+            print(f'parse kernel  {n:3d} strands: pyparsing {t1*1e6:10.1f} us, ' + \
+                  f'regex {t2*1e6:8.1f} us, cached {t3*1e6:5.2f} us')
+            del cplx
+
+@unittest.skipIf(SKIP, "skipping benchmarks")
+class BenchmarkKernelComplexes(unittest.TestCase):
+    def setUp(self):
+        set_io_objects()
+
+    def tearDown(self):
+        clear_io_objects()
+        clear_singletons(ComplexS)
+        clear_singletons(StrandS)
+        clear_singletons(DomainS)
+
+    def test_deep_nesting(self):
+        def recursive(loop):
+            # The former implementation of resolve_kernel_loops.
+            sequen, struct = [], []
+            for dom in loop:
+                if isinstance(dom, str):
+                    sequen.append(dom)
+                    struct.append('+' if dom == '+' else '.')
+                elif isinstance(dom, list):
+                    struct[-1] = '('
+                    old = sequen[-1]
+                    se, ss = recursive(dom)
+                    sequen.extend(se)
+                    struct.extend(ss)
+                    sequen.append(old + '*' if old[-1] != '*' else old[:-1])
+                    struct.append(')')
+            return sequen, struct
+
+        print()
+        for depth in (100, 500, 5000, 50000):
+            loop = inner = []
+            for e in range(depth):
+                inner.extend([f'x{e}', [f'y{e}', '+']])
+                inner = inner[-1]
+            t2, r2 = timeit(resolve_kernel_loops, loop)
+            try:
+                t1, r1 = timeit(recursive, loop)
+                assert r1 == r2
+                t1 = f'{t1*1e3:8.2f} ms'
+            except RecursionError:
+                t1 = 'RecursionError'
+            print(f'kernel loops depth {depth:6d}: recursive {t1:>14s}, stack {t2*1e3:8.2f} ms')
+
+    def test_composite_domains(self):
+        def insertion(sequence, structure):
+            # The former expansion of composite domains in read_pil_line.
+            sequence = list(sequence)
+            structure = list(structure)
+            for e, d in enumerate(sequence):
+                if isinstance(d, DomainS) or d == '+':
+                    continue
+                try:
+                    sequence[e] = DomainS(d)
+                except SingletonError:
+                    subseq = list(StrandS(None, name = d).sequence)
+                    for i, sd in enumerate(subseq):
+                        if i == 0:
+                            sequence[e] = sd
+                        else:
+                            sequence.insert(e+i, sd)
+                            structure.insert(e+i, structure[e])
+            return sequence, structure
+
+        rng = random.Random(1)
+        doms = [DomainS(f'd{i}', 5) for i in range(20)]
+        strands = [StrandS(rng.sample(doms, 5), name = f'S{i}') for i in range(20)]
+        print()
+        for n in (100, 1000, 5000):
+            names = [rng.choice(strands).name if rng.random() < 0.8 else rng.choice(doms).name 
+                        for _ in range(n)]
+            loop = [x for name in names for x in (name, '+')][:-1]
+            t1, r1 = timeit(lambda: insertion(*resolve_kernel_loops(loop)))
+            t2, r2 = timeit(resolve_kernel_complex, loop)
+            assert r1 == r2
+            print(f'composite domains {n:5d} names: insertion {t1*1e3:8.2f} ms, ' + \
+                  f'index {t2*1e3:8.2f} ms')
+
+@unittest.skipIf(SKIP, "skipping benchmarks.")
+class BenchmarkReactionNetwork(unittest.TestCase):
+    def tearDown(self):
+        clear_singletons(ReactionS)
+        clear_singletons(ComplexS)
+        clear_singletons(DomainS)
+
+    def test_species_queries(self):
+        def rescan(rxns, species):
+            # Scanning the reaction list for every query.
+            return [[r for r in rxns if sp in r.reactants] for sp in species]
+
+        def lookup(net, species):
+            return [list(net.consumers(sp)) for sp in species]
+
+        rng = random.Random(1)
+        doms = [DomainS(f'd{i}', 5) for i in range(500)]
+        allcplxs = [ComplexS([d, ~d], list('()')) for d in doms]
+        print()
+        for n in (100, 1000, 5000):
+            cplxs = allcplxs[:n // 10]
+            rxns = dict()
+            while len(rxns) < n:
+                rct = rng.sample(cplxs, rng.randint(1, 2))
+                prd = rng.sample(cplxs, rng.randint(1, 2))
+                rxns[ReactionS(rct, prd, 'condensed')] = None
+            rxns = list(rxns)
+            t0, net = timeit(ReactionNetwork, rxns)
+            t1, r1 = timeit(rescan, rxns, cplxs)
+            t2, r2 = timeit(lookup, net, cplxs)
+            assert r1 == r2
+            mem = sum(net.index_memory().values())
+            print(f'reaction network {n:5d} reactions: build {t0*1e3:8.2f} ms, ' + \
+                  f'rescan {t1*1e3:8.2f} ms, index {t2*1e3:8.2f} ms, {mem/1024:8.1f} KiB')
+
+    def test_to_arrays(self):
+        def loops(rxns, species):
+            # A dense export with rateformat() for every reaction.
+            sindex = {sp: i for i, sp in enumerate(species)}
+            S = [[0] * len(species) for _ in rxns]
+            rates = []
+            for j, r in enumerate(rxns):
+                for sp in r.reactants:
+                    S[j][sindex[sp]] -= 1
+                for sp in r.products:
+                    S[j][sindex[sp]] += 1
+                rates.append(r.rateformat('/nM' * (r.arity[0] - 1) + '/s')[0])
+            return S, rates
+
+        rng = random.Random(1)
+        doms = [DomainS(f'd{i}', 5) for i in range(500)]
+        cplxs = [ComplexS([d, ~d], list('()')) for d in doms]
+        print()
+        for n in (100, 1000, 5000):
+            rxns = dict()
+            while len(rxns) < n:
+                rct = rng.sample(cplxs, rng.randint(1, 2))
+                prd = rng.sample(cplxs, rng.randint(1, 2))
+                rxns[ReactionS(rct, prd, 'condensed')] = None
+            rxns = list(rxns)
+            for r in rxns:
+                r.rate_constant = (rng.random(), '/M' * (r.arity[0] - 1) + '/s')
+            net = ReactionNetwork(rxns)
+            t1, (S, r1) = timeit(loops, rxns, list(net.species))
+            t2, out = timeit(lambda: net.to_arrays(units = ('nM', 's')))
+            assert all(abs(x - y) <= 1e-12 * abs(x) for x, y in zip(r1, out['rates']))
+            data, idx, ptr = out['stoichiometry']
+            assert all(S[j][idx[k]] == data[k] for j in range(n) 
+                                               for k in range(ptr[j], ptr[j+1]))
+            print(f'network export {n:5d} reactions: loops {t1*1e3:8.2f} ms, ' + \
+                  f'to_arrays {t2*1e3:8.2f} ms')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,18 +6,38 @@ import logging
 logger = logging.getLogger('dsdobjects')
 logger.setLevel(logging.INFO)
 import unittest
+import random
 
 from dsdobjects.complex_utils import (SecondaryStructureError,
                                       make_pair_table,
                                       pair_table_to_dot_bracket, 
+                                      dot_bracket_to_kernel,
+                                      kernel_to_dot_bracket,
                                       make_strand_table,
                                       strand_table_to_sequence,
                                       split_complex_db,
                                       split_complex_pt,
+                                      strand_components,
                                       rotate_complex_db,
                                       rotate_complex_pt,
+                                      ComplexRotation,
                                       rotate_complex_once,
-                                      make_loop_index)
+                                      rotate_complex,
+                                      iter_rotations,
+                                      canonical_rotation,
+                                      sequence_period,
+                                      intern_domain,
+                                      compact_complex_key,
+                                      complex_fingerprint,
+                                      make_loop_index,
+                                      make_flat_structure,
+                                      flat_index,
+                                      flat_locus,
+                                      flat_to_pair_table,
+                                      flat_to_dot_bracket,
+                                      flat_loop_index,
+                                      LoopDecomposition,
+                                      rotate_flat_structure)
 
 SKIP = False
 
@@ -76,6 +96,58 @@ class TestTables(unittest.TestCase):
         assert make_strand_table(se) == [list('CCCT'), list('AAA'), list('TTGGG')]
         assert strand_table_to_sequence(make_strand_table(se), join = False) == se
 
+    def test_flat_structures(self):
+        offsets, partner = make_flat_structure('...((+))')
+        assert list(offsets) == [0, 5, 7]
+        assert list(partner) == [-1, -1, -1, 6, 5, 4, 3]
+        assert flat_index(offsets, (1, 0)) == 5
+        assert flat_locus(offsets, 5) == (1, 0)
+        assert flat_locus(offsets, 4) == (0, 4)
+
+        for inp in ['(((...)))', '(((+...)))', '((((+))).)', '.((.((...))+((...).))).',
+                    '((..((.))+(+.(..)+).+(+(...)+)))']:
+            offsets, partner = make_flat_structure(inp)
+            pt = make_pair_table(inp)
+            assert flat_to_pair_table(offsets, partner) == tuple(map(tuple, pt))
+            for si, strand in enumerate(pt):
+                for di, _ in enumerate(strand):
+                    assert flat_locus(offsets, flat_index(offsets, (si, di))) == (si, di)
+            li, ext = flat_loop_index(offsets, partner, components = True)
+            eli, eext = make_loop_index(pt, components = True)
+            assert list(li) == [x for strand in eli for x in strand]
+            assert ext == eext
+
+        with self.assertRaises(SecondaryStructureError):
+            make_flat_structure('((((+)).)')
+        with self.assertRaises(SecondaryStructureError):
+            make_flat_structure('(.))')
+        with self.assertRaises(SecondaryStructureError):
+            make_flat_structure('((((&))).)')
+        with self.assertRaises(SecondaryStructureError):
+            flat_loop_index(*make_flat_structure('(.)+.(..)'))
+
+        for inp in ['(((...)))', '(((+...)))', '((((+))).)', '.((.((...))+((...).))).']:
+            assert flat_to_dot_bracket(*make_flat_structure(inp)) == list(inp)
+        offsets, partner = make_flat_structure('(.)(.)')
+        partner[0], partner[3], partner[2], partner[5] = 3, 0, 5, 2
+        with self.assertRaises(SecondaryStructureError):
+            flat_to_dot_bracket(offsets, partner)
+
+    def test_kernel_strings(self):
+        seq = ['a', 'b^', '+', 'b^*', 'c*', 'a*']
+        sst = list('((+).)')
+        assert dot_bracket_to_kernel(seq, sst) == 'a( b^( + ) c* )'
+        assert kernel_to_dot_bracket('a( b^( + ) c* )') == (seq, sst)
+        assert kernel_to_dot_bracket('a(b^(+)c*)') == (seq, sst)
+        assert kernel_to_dot_bracket('a*( )') == (['a*', 'a'], list('()'))
+        out = kernel_to_dot_bracket('a( + )')
+        out[0].append('x') # Results are copies of the cached data.
+        assert kernel_to_dot_bracket('a( + )') == (['a', '+', 'a*'], list('(+)'))
+
+        for knl in ['a( b', 'a )', 'a ( b )', 'a( b ) )', 'a( b, c )']:
+            with self.assertRaises(SecondaryStructureError):
+                kernel_to_dot_bracket(knl)
+
 class TestLoopIndex(unittest.TestCase):
     def test_make_loop_index_00(self):
         struct = '.'
@@ -198,6 +270,42 @@ class TestLoopIndex(unittest.TestCase):
                         [5, 2], [7], [8, 8, 8, 8, 8], [7, 2, 1]],
                        [[0, 2], [2, 5], [5, 5], [5, 2], [2, 7], [7, 7], [7, 0]])
 
+    def test_loop_decomposition(self):
+        struct = '.((.((...)).+.((...).))).'
+        ld = LoopDecomposition(*make_flat_structure(struct))
+        li, ext = flat_loop_index(*make_flat_structure(struct))
+        assert ld.loop_index == li
+        assert ld.exterior == ext
+        assert len(ld) == 7
+        assert [l.kind for l in ld] == ['exterior', 'interior', 'exterior', 
+                                        'interior', 'hairpin', 'interior', 'hairpin']
+        assert ld[0].closing is None
+        assert ld[0].unpaired == [(0, 0), (1, 11)]
+        assert ld[0].stems == [((0, 1), (1, 10))]
+        assert ld[2].closing == ((0, 2), (1, 9))
+        assert ld[2].unpaired == [(0, 3), (0, 11), (1, 0)]
+        assert ld[2].stems == [((0, 4), (0, 10)), ((1, 1), (1, 8))]
+        assert ld[2].children == [3, 5]
+        assert ld[5].unpaired == [(1, 7)]
+        assert ld[6].unpaired == [(1, 3), (1, 4), (1, 5)]
+
+        ld = LoopDecomposition(*make_flat_structure('((.((.)).((.)).))'))
+        assert [l.kind for l in ld] == ['exterior', 'interior', 'multi', 
+                                        'interior', 'hairpin', 'interior', 'hairpin']
+
+        for struct in ['.', '(((...)))', '.((.((...))+((...).))).', '((((+))).)']:
+            offsets, partner = make_flat_structure(struct)
+            ld = LoopDecomposition(offsets, partner)
+            li, ext = flat_loop_index(offsets, partner)
+            assert (ld.loop_index, ld.exterior) == (li, ext)
+            # Every position is listed exactly once: unpaired or in a stem.
+            locs = [loc for l in ld for loc in l.unpaired]
+            locs += [loc for l in ld for stem in l.stems for loc in stem]
+            assert sorted(locs) == [flat_locus(offsets, i) for i in range(len(partner))]
+
+        with self.assertRaises(SecondaryStructureError):
+            LoopDecomposition(*make_flat_structure('(.)+.(..)'))
+
 class TestComplexOperations(unittest.TestCase):
     def test_split_complex_00(self):
         se = list('CCCTTTGGG')
@@ -281,6 +389,24 @@ class TestComplexOperations(unittest.TestCase):
         assert ('C', '.') in outdb
         assert ('CCCT+TG+GG', '(((.+.)+))') in outdb
 
+    def test_strand_components(self):
+        assert strand_components(3, []) == [[0], [1], [2]]
+        assert strand_components(3, [(0, 2)]) == [[1], [0, 2]]
+        assert strand_components(4, [(3, 1), (0, 2)]) == [[0, 2], [1, 3]]
+
+        se = 'CCCT+TC+GT+TG+C+GG'
+        ss = '(((.+.(+).+.)+.+))'
+        out = list(split_complex_db(se, ss, join = True))
+        assert out == [('TC+GT', '.(+).'), ('C', '.'), ('CCCT+TG+GG', '(((.+.)+))')]
+
+        # Large aggregates must not hit the recursion limit.
+        n = 3000
+        se = '+'.join('A' * n)
+        ss = '(' + '+.' * (n - 2) + '+)'
+        out = list(split_complex_db(se, ss, join = True))
+        assert len(out) == n - 1
+        assert out[-1] == ('A+A', '(+)')
+
     def test_rotate_complex_00(self):
         se = list('CCCTTTGGG')
         ss = list('(((...)))')
@@ -320,6 +446,31 @@ class TestComplexOperations(unittest.TestCase):
         assert len(out) == 10
         assert (se, ss) != out[0]
 
+    def test_complex_rotation(self):
+        se = list('CCCT+AAA+TTGGG')
+        ss = list('(((.+.(.+).)))')
+        stab = make_strand_table(se)
+        offsets, partner = make_flat_structure(ss)
+        for turns in range(-3, 4):
+            rot = ComplexRotation(stab, offsets, partner, turns)
+            rse, rss = rotate_complex(se, ss, turns)
+            assert rot.sequence() == rse
+            assert rot.structure() == rss
+            assert rot.structure(join = True) == ''.join(rss)
+            assert rot.strand_table() == make_strand_table(rse)
+            assert rot.pair_table() == make_pair_table(rss)
+            assert rot.flat_structure() == make_flat_structure(rss)
+            st = rot.strand_table()
+            for si, strand in enumerate(stab):
+                for di, dom in enumerate(strand):
+                    loc = rot.locus((si, di))
+                    assert st[loc[0]][loc[1]] == dom
+
+        # Many turns must not hit the recursion limit.
+        out = list(rotate_complex_db(se, ss, turns = 3000))
+        assert len(out) == 3000
+        assert out[-1] == rotate_complex(se, ss, -2999)
+
     def test_rotate_complex_once(self):
         se = list('CCCT+TTGGG')
         ss = list('(((.+..)))')
@@ -328,5 +479,100 @@ class TestComplexOperations(unittest.TestCase):
         out = rotate_complex_once(se, ss)
         assert out == (re, rs)
 
+    def test_rotate_complex(self):
+        se = list('CCCT+AAA+TTGGG')
+        ss = list('(((.+.(.+).)))')
+        rse, rss = se, ss
+        for turns in range(7):
+            assert rotate_complex(se, ss, turns) == (rse, rss)
+            rse, rss = rotate_complex_once(rse, rss)
+        assert rotate_complex(se, ss, -1) == rotate_complex(se, ss, 2)
+        assert list(iter_rotations(se, ss)) == [rotate_complex(se, ss, t) for t in range(3)]
+        assert rotate_complex(list('CCC'), list('(.)'), 1) == (list('CCC'), list('(.)'))
+        with self.assertRaises(SecondaryStructureError):
+            rotate_complex(list('C+C'), list('(+('), 1)
+
+    def test_rotate_flat_structure(self):
+        se = list('CCCT+AAA+TTGGG')
+        ss = list('(((.+.(.+).)))')
+        for turns in range(-3, 4):
+            rse, rss = rotate_complex(se, ss, turns)
+            assert rotate_flat_structure(*make_flat_structure(ss), turns) == \
+                    make_flat_structure(rss)
+
+    def test_canonical_rotation(self):
+        def brute_force(seq, sst):
+            # The smallest of all rotations, the last one wins ties.
+            cdict = {}
+            for e in range(seq.count('+') + 1):
+                cdict[(tuple(seq), tuple(sst))] = e
+                seq, sst = rotate_complex_once(seq, sst)
+            canon = sorted(cdict)[0]
+            return canon, cdict[canon]
+
+        assert canonical_rotation(list('a+b'), list('(+)')) == \
+                ((tuple('a+b'), tuple('(+)')), 0)
+        assert canonical_rotation(list('b+a'), list('(+)')) == \
+                ((tuple('a+b'), tuple('(+)')), 1)
+        assert canonical_rotation(list('a+a+a'), list('(+)+.')) == \
+                ((tuple('a+a+a'), tuple('(+)+.')), 0)
+        assert canonical_rotation(list('a+a'), list('(+)')) == \
+                ((tuple('a+a'), tuple('(+)')), 1)
+        with self.assertRaises(SecondaryStructureError):
+            canonical_rotation(list('a+a'), list('(+('))
+
+        rng = random.Random(42)
+        for _ in range(2000):
+            strands = [[rng.choice('abc') for _ in range(rng.randint(1, 3))] 
+                        for _ in range(rng.randint(1, 6))]
+            if rng.random() < 0.3: # periodic sequences
+                strands = strands[:1] * len(strands)
+            seq = list('+'.join(''.join(s) for s in strands))
+            sst, stack = [], []
+            for x in seq:
+                r = rng.random()
+                if x == '+':
+                    sst.append('+')
+                elif r < 0.3:
+                    stack.append(len(sst))
+                    sst.append('(')
+                elif r < 0.6 and stack:
+                    stack.pop()
+                    sst.append(')')
+                else:
+                    sst.append('.')
+            for i in stack:
+                sst[i] = '.'
+            assert canonical_rotation(seq, sst) == brute_force(seq, sst)
+            # The rotations with the least sequence, as derived from the period.
+            p = sequence_period(seq)
+            canon, r = brute_force(seq, sst)
+            cands = range(r % p, len(strands), p)
+            assert canonical_rotation(seq, sst, candidates = cands) == (canon, r)
+
+        assert sequence_period(list('ab+ab+ab')) == 1
+        assert sequence_period(list('ab+a+ab+a')) == 2
+        assert sequence_period(list('ab+a+ab')) == 3
+
+    def test_complex_fingerprint(self):
+        se = list('ab+c+ab+a')
+        ss = list('((+.+).+)')
+        fp = complex_fingerprint(se, ss)
+        for rse, rss in iter_rotations(se, ss):
+            assert complex_fingerprint(rse, rss) == fp
+        assert complex_fingerprint(se, list('(.+.+..+)')) != fp
+        assert complex_fingerprint(list('ab+c+ba+a'), ss) != fp
+
+    def test_compact_complex_key(self):
+        assert intern_domain('a') == intern_domain('a')
+        assert intern_domain('a') != intern_domain('a*')
+        k1 = compact_complex_key(tuple('ab+b'), tuple('.(+)'))
+        k2 = compact_complex_key(tuple('ab+b'), tuple('.(+)'))
+        assert isinstance(k1, bytes)
+        assert k1 == k2
+        assert k1 != compact_complex_key(tuple('ab+b'), tuple('..+.'))
+        assert k1 != compact_complex_key(tuple('ba+b'), tuple('.(+)'))
+        assert k1 != compact_complex_key(tuple('ab+a'), tuple('.(+)'))
+
 if __name__ == '__main__':
     unittest.main()
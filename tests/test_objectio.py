@@ -8,8 +8,13 @@ logger.setLevel(logging.INFO)
 import unittest
 
 import gc
+from io import StringIO
 from dsdobjects import SingletonError, clear_singletons
-from dsdobjects.objectio import read_pil, read_pil_line, set_io_objects, clear_io_objects
+from dsdobjects.objectio import (PilFormatError, read_pil, read_pil_line, iter_pil,
+                                 write_pil, set_io_objects, clear_io_objects,
+                                 resolve_kernel_loops)
+from dsdobjects.dsdparser import parse_pil_string
+from dsdobjects.complex_utils import kernel_to_dot_bracket
 from dsdobjects.base_classes import DomainS, StrandS, ComplexS, MacrostateS, ReactionS
 
 SKIP = False
@@ -38,6 +43,43 @@ class TestReadLine(unittest.TestCase):
         assert x.length == 5
         assert x.sequence == 'NCGGA'
 
+    def test_kernel_parsers(self):
+        for knl in ['a( b^( + ) c* )', 'a(b(+)c*)', 'x*( y( + ) + z )', 'a( )', 'a b + c',
+                    'a( b( c( d( + ) ) ) )', 'a1_x-2^*( + )']:
+            [line] = parse_pil_string(f'complex = {knl}')
+            assert kernel_to_dot_bracket(knl) == resolve_kernel_loops(line[2])
+
+    def test_resolve_kernel_loops(self):
+        assert resolve_kernel_loops(['a', ['b', '+', 'c*', []], 'd']) == \
+                (['a', 'b', '+', 'c*', 'c', 'a*', 'd'], list('(.+()).'))
+        # Deeper than the recursion limit.
+        depth = 5000
+        loop = inner = []
+        for e in range(depth):
+            inner.extend([f'x{e}', []])
+            inner = inner[-1]
+        seq, sst = resolve_kernel_loops(loop)
+        assert sst == ['('] * depth + [')'] * depth
+        assert seq[depth - 1] == f'x{depth - 1}' and seq[depth] == f'x{depth - 1}*'
+        assert seq[-1] == 'x0*'
+
+    def test_composite_domains(self):
+        out = read_pil("""
+        length a = 6
+        length b = 6
+        length c = 6
+        sup-sequence ab = a b
+        """)
+        x = read_pil_line('x = ab( c + ) ab* a*')
+        a, b, c = DomainS('a'), DomainS('b'), DomainS('c')
+        assert list(x.sequence) == [a, b, c, '+', ~b, ~a, ~b, ~a, ~a]
+        assert list(x.structure) == list('((.+))...')
+        with self.assertRaises(PilFormatError):
+            read_pil_line('y = ab( d + )')
+        with self.assertRaises(PilFormatError):
+            read_pil_line('y = ab( d* + )')
+        del x, a, b, c, out
+
     def test_read_pil_line_02(self):
         doms = []
         doms.append(read_pil_line("length a = 6"))
@@ -207,6 +249,118 @@ class TestReadFile(unittest.TestCase):
             """)
         pass
 
+@unittest.skipIf(SKIP, "skipping tests")
+class TestIterPil(unittest.TestCase):
+    def setUp(self):
+        set_io_objects()
+
+    def tearDown(self):
+        clear_io_objects()
+
+    def test_iter_pil(self):
+        data = """
+        # Domains
+        sequence a = NNNNNN
+        length b = 6 # comment
+        length c = 6
+
+        strand S = a b c
+        complex X : 
+          S
+          ...
+        complex Y : S .()
+        A = a( b( c( + ) ) ) @i 1e-08 M
+        B = a b( ) c
+        D = a c(
+        ) b
+        macrostate A = [A]
+        macrostate B = [B]
+        reaction [condensed      =  1.66666e+06 /M/s ] A -> B"""
+        exp = [DomainS, DomainS, DomainS, StrandS, ComplexS, ComplexS, ComplexS,
+               ComplexS, ComplexS, MacrostateS, MacrostateS, ReactionS]
+        for chunksize in [1, 7, 1 << 16]:
+            out = list(iter_pil(StringIO(data), chunksize = chunksize))
+            assert [type(o) for o in out] == exp
+            assert [o.name for o in out][:4] == ['a', 'b', 'c', 'S']
+            assert out[4].kernel_string == 'a b c'
+            assert out[5].kernel_string == 'a b( )'
+            assert out[6].kernel_string == 'a( b( c( + ) ) )'
+            assert out[8].kernel_string == 'a c( ) b'
+            assert DomainS('a*').sequence == 'NNNNNN'
+            del out
+        assert [type(o) for o in iter_pil(StringIO(data), ignore = ['reaction'])] == exp[:-1]
+
+    def test_iter_pil_lazy(self):
+        data = StringIO("""
+        length a = 6
+        A = a b
+        """)
+        objs = iter_pil(data)
+        a = next(objs)
+        assert a.name == 'a'
+        # The error occurs only after the first object has been yielded.
+        with self.assertRaises(PilFormatError):
+            next(objs)
+
+@unittest.skipIf(SKIP, "skipping tests")
+class TestWritePil(unittest.TestCase):
+    def setUp(self):
+        set_io_objects()
+
+    def tearDown(self):
+        clear_io_objects()
+
+    def test_round_trip(self):
+        out = read_pil("""
+        sequence a = ACGTAC
+        sequence b = NNNNNN 
+        length c = 6
+        length d = 15
+
+        strand S = a b c
+        A = a( b( c( + ) ) ) d @initial 1e-08 M
+        B = c* b* a* @constant 12.5 nM
+        C = a b c
+        AB = a( b( c( + ) ) ) d + c* b* a*
+        macrostate A = [A]
+        macrostate B = [B]
+        macrostate C = [C, AB]
+        reaction [condensed = 1.66666e+06 /M/s ] A + B -> C
+        reaction [bind21 = 1234567.8 /M/s ] A + B -> AB
+        reaction [open = 0.0261637 /s ] AB -> A + B
+        """)
+        txt = StringIO()
+        write_pil(out, txt)
+        first = txt.getvalue()
+        assert 'sequence a = ACGTAC' in first
+        assert 'A = a( b( c( + ) ) ) d @initial 1e-08 M' in first
+        assert 'reaction [bind21 = 1234567.8 /M/s] A + B -> AB' in first
+
+        new = read_pil(first)
+        for key in out:
+            assert new[key] == out[key]
+        txt = StringIO()
+        write_pil(new, txt)
+        assert txt.getvalue() == first
+
+    def test_dependencies(self):
+        out = read_pil("""
+        length a = 6
+        length b = 6
+        A = a( b + ) a*
+        B = a b
+        reaction [bind21 = 100 /nM/s ] A + B -> A
+        """)
+        # Writing only the reactions writes domains and complexes first.
+        txt = StringIO()
+        write_pil(out['det_reactions'], txt)
+        assert txt.getvalue().split('\n') == [
+                'length a = 6',
+                'length b = 6',
+                'B = a b',
+                'A = a( b + ) a*',
+                'reaction [bind21 = 100 /nM/s] B + A -> A', '']
+
 if __name__ == '__main__':
     unittest.main()
 
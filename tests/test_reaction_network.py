@@ -0,0 +1,258 @@
+#
+# tests/test_reaction_network.py
+#   - copy and/or modify together with dsdobjects/reaction_network.py
+#
+import logging
+logger = logging.getLogger('dsdobjects')
+logger.setLevel(logging.INFO)
+import unittest
+
+import math
+from array import array
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from dsdobjects import ReactionNetwork, clear_singletons
+from dsdobjects.objectio import read_pil, set_io_objects, clear_io_objects
+from dsdobjects.base_classes import (DomainS, ComplexS, MacrostateS, ReactionS, 
+                                     ObjectInitError)
+
+SKIP = False
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestReactionNetwork(unittest.TestCase):
+    def setUp(self):
+        a = DomainS('a', 5)
+        b = DomainS('b', 15)
+        self.A = ComplexS([a, b], list('..'), name = 'A')
+        self.B = ComplexS([~b, ~a], list('..'), name = 'B')
+        self.AB = ComplexS([a, b, '+', ~b, ~a], list('((+))'), name = 'AB')
+        self.A2 = ComplexS([a, b, '+', a, b], list('..+..'), name = 'A2')
+
+    def tearDown(self):
+        clear_singletons(ComplexS)
+        clear_singletons(DomainS)
+        clear_singletons(MacrostateS)
+        clear_singletons(ReactionS)
+
+    def test_indices(self):
+        A, B, AB, A2 = self.A, self.B, self.AB, self.A2
+        r1 = ReactionS([A, B], [AB], 'bind21')
+        r2 = ReactionS([AB], [A, B], 'open')
+        r3 = ReactionS([A, A], [A2], 'bind21')
+
+        net = ReactionNetwork([r1, r2])
+        assert len(net) == 2
+        assert r1 in net and r3 not in net
+        assert list(net) == [r1, r2]
+        assert net.add_reaction(r3) is True
+        assert net.add_reaction(r3) is False
+        assert len(net) == 3
+
+        assert list(net.consumers(A)) == [r1, r3]
+        assert list(net.producers(A)) == [r2]
+        assert list(net.consumers(AB)) == [r2]
+        assert list(net.producers(A2)) == [r3]
+        assert list(net.consumers(A2)) == []
+        assert net.degree(A) == (2, 1)
+        assert net.degree(A2) == (0, 1)
+        assert set(net.species) == {A, B, AB, A2}
+        assert list(net.rtypes) == ['bind21', 'open']
+        assert list(net.reactions_of_type('bind21')) == [r1, r3]
+        assert list(net.reactions_of_type('branch-3way')) == []
+
+        net.remove_reaction(r3) # A + A -> A2
+        assert list(net.consumers(A)) == [r1]
+        assert net.degree(A2) == (0, 0)
+        assert set(net.species) == {A, B, AB}
+        net.remove_reaction(r2)
+        assert list(net.rtypes) == ['bind21']
+        assert list(net.reactions) == [r1]
+        with self.assertRaises(KeyError):
+            net.remove_reaction(r2)
+        with self.assertRaises(TypeError):
+            net.add_reaction(A)
+
+    def test_species_order(self):
+        A, B, AB, A2 = self.A, self.B, self.AB, self.A2
+        r2 = ReactionS([AB], [A, B], 'open')
+        r3 = ReactionS([A, A], [A2], 'bind21')
+        net = ReactionNetwork([r3, r2])
+        assert list(net.species) == [A, A2, AB, B]
+        assert net.species_index() == {A: 0, A2: 1, AB: 2, B: 3}
+        net.remove_reaction(r3)
+        assert list(net.species) == [A, AB, B]
+        net.add_reaction(r3)
+        assert list(net.species) == [A, AB, B, A2]
+        net.remove_reaction(r2)
+        net.remove_reaction(r3)
+        assert list(net.species) == []
+
+    def test_macrostates(self):
+        A, B, AB, A2 = self.A, self.B, self.AB, self.A2
+        mA = MacrostateS([A, A2], name = 'A')
+        mB = MacrostateS([B], name = 'B')
+        mAB = MacrostateS([AB, A2], name = 'AB')
+        rxn = ReactionS([mA, mB], [mAB], 'condensed')
+
+        net = ReactionNetwork([rxn])
+        assert list(net.macrostates) == [mA, mB, mAB]
+        assert list(net.complexes(mA)) == [A, A2]
+        assert list(net.macrostates_of(A2)) == [mA, mAB]
+        assert list(net.consumers(mA)) == [rxn]
+
+        net.remove_reaction(rxn)
+        assert len(net) == 0
+        assert list(net.macrostates) == [mA, mB, mAB]
+        net.remove_macrostate(mA)
+        assert list(net.macrostates_of(A2)) == [mAB]
+        assert list(net.macrostates_of(A)) == []
+        with self.assertRaises(KeyError):
+            net.complexes(mA)
+        assert net.add_macrostate(mA) is True
+        assert net.add_macrostate(mA) is False
+
+    def test_index_memory(self):
+        A, B, AB = self.A, self.B, self.AB
+        net = ReactionNetwork()
+        empty = net.index_memory()
+        assert set(empty) == {'reactions', 'species', 'consumers', 'producers', 
+                              'rtypes', 'macrostates'}
+        net.add_reaction(ReactionS([A, B], [AB], 'bind21'))
+        full = net.index_memory()
+        assert all(full[k] >= empty[k] for k in empty)
+        assert full['consumers'] > empty['consumers']
+
+    def test_to_arrays(self):
+        A, B, AB, A2 = self.A, self.B, self.AB, self.A2
+        r1 = ReactionS([A, B], [AB], 'bind21')
+        r1.rate_constant = (1e6, '/M/s')
+        r2 = ReactionS([AB], [A, B], 'open')
+        r2.rate_constant = (0.1, '/s')
+        r3 = ReactionS([A, A], [A2], 'bind21')
+        r3.rate_constant = (2e6, '/M/s')
+        r4 = ReactionS([A, AB], [A, A2], 'bind21') # A is a catalyst
+        net = ReactionNetwork([r1, r2, r3, r4])
+
+        out = net.to_arrays(use_numpy = False)
+        assert out['species'] == list(net.species)
+        assert out['reactions'] == [r1, r2, r3, r4]
+        assert out['shape'] == (4, 4)
+        sindex = net.species_index()
+        assert list(sindex) == out['species'] == [A, B, AB, A2]
+        a, b, ab, a2 = (sindex[x] for x in (A, B, AB, A2))
+        def dense(data, idx, ptr):
+            mat = [[0] * 4 for _ in range(4)]
+            for r in range(len(ptr) - 1):
+                for k in range(ptr[r], ptr[r+1]):
+                    mat[r][idx[k]] = data[k]
+            return mat
+        data, idx, ptr = out['stoichiometry']
+        assert isinstance(data, array) and isinstance(ptr, array)
+        assert list(ptr) == [0, 3, 6, 8, 10]
+        S = dense(data, idx, ptr)
+        assert S[0][a] == -1 and S[0][b] == -1 and S[0][ab] == 1
+        assert S[1][a] == 1 and S[1][b] == 1 and S[1][ab] == -1
+        assert S[2][a] == -2 and S[2][a2] == 1
+        assert S[3][a] == 0 and S[3][ab] == -1 and S[3][a2] == 1
+        O = dense(*out['orders'])
+        assert O[2][a] == 2 and sum(O[2]) == 2
+        assert O[3][a] == 1 and O[3][ab] == 1
+        assert list(out['rates'])[:3] == [1e6, 0.1, 2e6]
+        assert math.isnan(out['rates'][3])
+
+        out = net.to_arrays(fmt = 'coo', units = ('nM', 'min'), use_numpy = False)
+        data, (row, col) = out['stoichiometry']
+        assert list(row) == [0, 0, 0, 1, 1, 1, 2, 2, 3, 3]
+        assert list(col) == list(idx)
+        assert list(data) == list(net.to_arrays(use_numpy = False)['stoichiometry'][0])
+        for rxn, rate in zip([r1, r2, r3], out['rates']):
+            units = '/nM/min' if rxn.arity[0] == 2 else '/min'
+            assert math.isclose(rxn.rateformat(units)[0], rate)
+        assert math.isnan(out['rates'][3])
+
+        r4.rate_constant = 5
+        with self.assertRaises(ObjectInitError):
+            net.to_arrays(units = ('nM', 's'), use_numpy = False)
+        with self.assertRaises(ValueError):
+            net.to_arrays(fmt = 'csc')
+        if np is None:
+            with self.assertRaises(ImportError):
+                net.to_arrays(use_numpy = True)
+
+    @unittest.skipUnless(np is not None, "numpy is not installed.")
+    def test_to_arrays_numpy(self):
+        A, B, AB, A2 = self.A, self.B, self.AB, self.A2
+        r1 = ReactionS([A, B], [AB], 'bind21')
+        r1.rate_constant = (1e6, '/M/s')
+        r2 = ReactionS([AB], [A, B], 'open')
+        r2.rate_constant = (0.1, '/s')
+        r3 = ReactionS([A, A], [A2], 'bind21')
+        r4 = ReactionS([A, AB], [A, A2], 'bind21')
+        r4.rate_constant = (2e6, '/M/s')
+        net = ReactionNetwork([r3, r1, r2, r4])
+        for fmt in ('csr', 'coo'):
+            ref = net.to_arrays(fmt = fmt, units = ('uM', 's'), use_numpy = False)
+            out = net.to_arrays(fmt = fmt, units = ('uM', 's'), use_numpy = True)
+            assert out['species'] == ref['species'] == [A, A2, B, AB]
+            assert out['shape'] == ref['shape']
+            assert isinstance(out['rates'], np.ndarray)
+            assert np.allclose(out['rates'], list(ref['rates']), equal_nan = True)
+            assert np.isnan(out['rates'][0])
+            for key in ('stoichiometry', 'orders'):
+                if fmt == 'csr':
+                    data, idx, ptr = out[key]
+                    rdata, ridx, rptr = ref[key]
+                    arrays, rarrays = (data, idx, ptr), (rdata, ridx, rptr)
+                else:
+                    data, (row, col) = out[key]
+                    rdata, (rrow, rcol) = ref[key]
+                    arrays, rarrays = (data, row, col), (rdata, rrow, rcol)
+                for x, y in zip(arrays, rarrays):
+                    assert isinstance(x, np.ndarray) and x.dtype == np.int64
+                    assert x.tolist() == list(y)
+        # Net change of A + A -> A2 in the first row, A is column 0.
+        data, idx, ptr = net.to_arrays(use_numpy = True)['stoichiometry']
+        assert idx[ptr[0]:ptr[1]].tolist() == [0, 1]
+        assert data[ptr[0]:ptr[1]].tolist() == [-2, 1]
+
+@unittest.skipIf(SKIP, "skipping tests.")
+class TestReactionNetworkIO(unittest.TestCase):
+    def setUp(self):
+        set_io_objects()
+
+    def tearDown(self):
+        clear_io_objects()
+
+    def test_from_pil(self):
+        out = read_pil(
+        """
+        length a = 6
+        length b = 6
+
+        A = a b
+        B = b* a*
+        AB = a( b( + ) )
+
+        macrostate A = [A]
+        macrostate B = [B]
+        macrostate AB = [AB]
+
+        reaction [bind21 = 1e6 /M/s ] A + B -> AB
+        reaction [open = 0.01 /s ] AB -> A + B
+        reaction [condensed = 1e6 /M/s ] A + B -> AB
+        """)
+        net = ReactionNetwork.from_pil(out)
+        assert len(net) == 3
+        assert set(net.rtypes) == {'bind21', 'open', 'condensed'}
+        A = out['complexes']['A']
+        mA = out['macrostates']['A']
+        assert net.degree(A) == (1, 1)
+        assert [r.rtype for r in net.consumers(mA)] == ['condensed']
+        assert list(net.macrostates_of(A)) == [mA]
+        assert len(list(net.macrostates)) == 3
+
+if __name__ == '__main__':
+    unittest.main()